@@ -0,0 +1,94 @@
+"""
+JWT authentication without a per-request user query.
+
+Tokens issued by this project carry the user's role, username and email as
+claims. ClaimsJWTAuthentication turns those claims into a User instance
+whose other columns are deferred, so permission checks, ownership filters
+and foreign-key assignments need no database access. The first time a
+deferred column is read, the whole row is loaded through a short-lived
+in-process cache (see User.refresh_from_db).
+
+Claims are fixed when a token is issued. Refreshing re-reads the account
+and stamps its current claims on the new tokens, so a change of role,
+username or email, or a deactivation, takes effect once the current access
+token expires. Tokens without the
+claims, issued before this existed, are still accepted and load the user
+from the database as before.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+USER_CLAIMS = ('role', 'username', 'email')
+USER_CACHE_TTL = 60
+USER_CACHE_SIZE = 1024
+
+
+def add_user_claims(token, user):
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+class UserRowCache:
+    """
+    Thread-safe LRU of full user rows that expire after ttl seconds.
+    """
+
+    def __init__(self, ttl=USER_CACHE_TTL, maxsize=USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, pk, using=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._rows.get(pk)
+            if entry is not None and entry[0] > now:
+                self._rows.move_to_end(pk)
+                return entry[1]
+        user = get_user_model()._default_manager.using(using).get(pk=pk)
+        with self._lock:
+            self._rows[pk] = (now + self.ttl, user)
+            self._rows.move_to_end(pk)
+            while len(self._rows) > self.maxsize:
+                self._rows.popitem(last=False)
+        return user
+
+    def evict(self, pk):
+        with self._lock:
+            self._rows.pop(pk, None)
+
+    def clear(self):
+        with self._lock:
+            self._rows.clear()
+
+
+user_rows = UserRowCache()
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            values = {claim: validated_token[claim] for claim in USER_CLAIMS}
+            values[api_settings.USER_ID_FIELD] = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            # Token issued before the claims were added
+            return super().get_user(validated_token)
+        # Only active users are issued tokens
+        values['is_active'] = True
+
+        User = get_user_model()
+        # from_db() expects the loaded values in field order
+        field_names = [field.attname for field in User._meta.concrete_fields if field.attname in values]
+        user = User.from_db(
+            router.db_for_read(User), field_names, [values[name] for name in field_names]
+        )
+        user._from_token_claims = True
+        return user
@@ -0,0 +1,52 @@
+"""
+Delete revoked refresh tokens that have expired.
+
+An expired token fails validation before the blacklist is consulted, so its
+RevokedToken row is dead weight. Rows are deleted in primary-key chunks, one
+committed transaction per chunk, so the table is never locked for long.
+Processes drop the pruned JTIs from their Bloom filters the next time they
+rebuild them.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from accounts.models import RevokedToken
+
+
+class Command(BaseCommand):
+    help = "Delete revoked refresh tokens that are past their expiry."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Rows deleted per transaction (default: 5000).")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report how many rows would be deleted.")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        leeway = api_settings.LEEWAY
+        if not isinstance(leeway, timedelta):
+            leeway = timedelta(seconds=leeway)
+        # Tokens are still accepted for LEEWAY after they expire
+        expired = RevokedToken.objects.filter(expires_at__lt=timezone.now() - leeway)
+
+        if options['dry_run']:
+            self.stdout.write(f"{expired.count()} expired revoked tokens would be deleted.")
+            return
+
+        deleted = 0
+        last_pk = 0
+        while True:
+            ids = list(expired.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            last_pk = ids[-1]
+            with transaction.atomic():
+                count, _ = RevokedToken.objects.filter(pk__in=ids).delete()
+            deleted += count
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired revoked tokens."))
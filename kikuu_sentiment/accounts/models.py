@@ -39,3 +39,30 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     def __str__(self):
         return f"{self.email} ({self.role})"
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # A user built from JWT claims fills every deferred column at once,
+        # from the short-lived row cache, the first time one is read
+        deferred = self.get_deferred_fields()
+        if getattr(self, '_from_token_claims', False) and fields and deferred.issuperset(fields):
+            from .authentication import user_rows
+
+            row = user_rows.get(self.pk, using=using or self._state.db)
+            for name in deferred:
+                setattr(self, name, getattr(row, name))
+            return
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+
+
+class RevokedToken(models.Model):
+    """
+    A refresh token that may no longer be used, by its JTI. Rows are only
+    needed until the token would have expired anyway; see
+    `manage.py prune_revoked_tokens`.
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.jti
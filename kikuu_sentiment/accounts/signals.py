@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import user_rows
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_cached_user_row(sender, instance, **kwargs):
+    # Other processes keep their copy until it expires (USER_CACHE_TTL)
+    user_rows.evict(instance.pk)
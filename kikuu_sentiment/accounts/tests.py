@@ -1,3 +1,186 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.utils import timezone
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from kikuu.models import Review
+from .authentication import ClaimsJWTAuthentication, user_rows
+from .models import RevokedToken, User
+from .tokens import BloomFilter, RevocableRefreshToken, revocations
+
+
+class ClaimsAuthenticationTests(TestCase):
+    def setUp(self):
+        user_rows.clear()
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            email='seller@test.com', username='seller', password='testpass123',
+            role='seller', first_name='Sam',
+        )
+
+    def login(self):
+        response = self.client.post(
+            reverse('login'), {'email': 'seller@test.com', 'password': 'testpass123'}, format='json'
+        )
+        return response.data['token']['access']
+
+    def user_queries(self, queries):
+        return [query['sql'] for query in queries.captured_queries if 'accounts_user' in query['sql']]
+
+    def test_login_token_carries_user_claims(self):
+        token = AccessToken(self.login())
+        self.assertEqual(
+            (token['role'], token['username'], token['email']), ('seller', 'seller', 'seller@test.com')
+        )
+
+        response = self.client.post(
+            reverse('token_obtain_pair'), {'email': 'seller@test.com', 'password': 'testpass123'}, format='json'
+        )
+        self.assertEqual(AccessToken(response.data['access'])['role'], 'seller')
+
+    def test_authenticated_requests_skip_the_user_query(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.login()}')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse('review-list-create'), {'comment': 'Great buyers', 'rating': 5}, format='json'
+            )
+            self.client.get(reverse('seller-orders'))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.user_queries(queries), [])
+        review = Review.objects.get()
+        self.assertEqual((review.user_id, review.username, review.user_role), (self.seller.pk, 'seller', 'seller'))
+
+    def test_tokens_without_claims_still_load_the_user(self):
+        token = RefreshToken.for_user(self.seller).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('user-reviews'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.user_queries(queries)), 1)
+
+    def test_other_columns_load_once_through_the_row_cache(self):
+        token = AccessToken(self.login())
+        authentication = ClaimsJWTAuthentication()
+
+        user = authentication.get_user(token)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.first_name, 'Sam')
+            self.assertEqual(user.date_joined, self.seller.date_joined)
+        with self.assertNumQueries(0):
+            self.assertEqual(authentication.get_user(token).first_name, 'Sam')
+
+        # Saving the user evicts the cached row
+        self.seller.first_name = 'Samantha'
+        self.seller.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(authentication.get_user(token).first_name, 'Samantha')
+
+    def test_claims_user_saves_only_what_it_loaded(self):
+        user = ClaimsJWTAuthentication().get_user(AccessToken(self.login()))
+        user.username = 'renamed'
+        user.save()
+        self.seller.refresh_from_db()
+        self.assertEqual((self.seller.username, self.seller.first_name), ('renamed', 'Sam'))
+        self.assertTrue(self.seller.check_password('testpass123'))
+
+
+class RefreshTokenRevocationTests(TestCase):
+    def setUp(self):
+        revocations.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='buyer@test.com', username='buyer', password='testpass123')
+
+    def refresh(self, token):
+        return self.client.post(reverse('token_refresh'), {'refresh': token}, format='json')
+
+    def test_rotation_revokes_the_old_refresh_token(self):
+        response = self.client.post(
+            reverse('login'), {'email': 'buyer@test.com', 'password': 'testpass123'}, format='json'
+        )
+        old = response.data['token']['refresh']
+
+        response = self.refresh(old)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(AccessToken(response.data['access'])['role'], 'buyer')
+        self.assertEqual(self.refresh(old).status_code, 401)
+        self.assertEqual(self.refresh(response.data['refresh']).status_code, 200)
+        self.assertEqual(RevokedToken.objects.count(), 2)
+
+    def test_refresh_restamps_claims_from_the_user_row(self):
+        self.user.role = 'seller'
+        self.user.save()
+        response = self.client.post(
+            reverse('login'), {'email': 'buyer@test.com', 'password': 'testpass123'}, format='json'
+        )
+        self.assertEqual(AccessToken(response.data['token']['access'])['role'], 'seller')
+
+        # Demoted without logging out
+        User.objects.filter(pk=self.user.pk).update(role='buyer', username='demoted')
+        response = self.refresh(response.data['token']['refresh'])
+        self.assertEqual(response.status_code, 200)
+        access = AccessToken(response.data['access'])
+        self.assertEqual((access['role'], access['username']), ('buyer', 'demoted'))
+        self.assertEqual(RevocableRefreshToken(response.data['refresh'])['role'], 'buyer')
+
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.client.get(reverse('seller-orders')).status_code, 403)
+
+    def test_refresh_is_refused_for_deactivated_or_deleted_users(self):
+        token = str(RevocableRefreshToken.for_user(self.user))
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.refresh(token).status_code, 401)
+        User.objects.filter(pk=self.user.pk).delete()
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_unrevoked_tokens_are_checked_without_the_database(self):
+        RevocableRefreshToken.for_user(self.user).blacklist()
+        token = str(RevocableRefreshToken.for_user(self.user))
+        RevocableRefreshToken(token)  # builds the filter
+        with self.assertNumQueries(0):
+            RevocableRefreshToken(token)
+
+    def test_revocations_by_other_processes_are_picked_up(self):
+        token = RevocableRefreshToken.for_user(self.user)
+        RevocableRefreshToken(str(token))
+        # Written by another process: not in this process's filter yet
+        RevokedToken.objects.create(jti=token['jti'], expires_at=timezone.now() + timedelta(days=1))
+        with mock.patch.object(revocations, 'sync_interval', 0):
+            with self.assertRaises(TokenError):
+                RevocableRefreshToken(str(token))
+
+    def test_concurrent_revocation_of_the_same_token_fails(self):
+        token = RevocableRefreshToken.for_user(self.user)
+        token.blacklist()
+        with self.assertRaises(TokenError):
+            token.blacklist()
+
+    def test_prune_deletes_only_expired_rows(self):
+        now = timezone.now()
+        RevokedToken.objects.bulk_create(
+            [RevokedToken(jti=f'old-{index}', expires_at=now - timedelta(hours=1)) for index in range(5)]
+            + [RevokedToken(jti='live', expires_at=now + timedelta(hours=1))]
+        )
+        out = StringIO()
+        call_command('prune_revoked_tokens', '--batch-size', '2', stdout=out)
+        self.assertIn('Deleted 5 expired revoked tokens', out.getvalue())
+        self.assertEqual(list(RevokedToken.objects.values_list('jti', flat=True)), ['live'])
+
 
-# Create your tests here.
+class BloomFilterTests(TestCase):
+    def test_no_false_negatives_and_bounded_false_positives(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        members = [f'member-{index}' for index in range(1000)]
+        for key in members:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in members))
+        false_positives = sum(f'other-{index}' in bloom for index in range(10000))
+        self.assertLess(false_positives, 300)
@@ -0,0 +1,153 @@
+"""
+Refresh token revocation backed by an in-memory Bloom filter.
+
+Revoked refresh tokens are stored by JTI in RevokedToken. Each process keeps
+a Bloom filter of those JTIs, so the check made on every refresh is a few
+hash probes. The database is only asked when the filter reports a probable
+hit. The filter is built from the table on first use, gets each JTI this
+process revokes straight away, and pulls rows written by other processes
+at most every SYNC_INTERVAL seconds.
+
+Rotation does not depend on that sync. blacklist() inserts the old JTI under
+a unique constraint, so a second refresh with the same token fails even when
+it reaches a process that has not synced yet.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import RevokedToken
+
+BLOOM_CAPACITY = 1_000_000
+BLOOM_ERROR_RATE = 0.001
+SYNC_INTERVAL = 1.0
+LOAD_CHUNK_SIZE = 10_000
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings, sized for capacity keys at
+    error_rate false positives. Never reports a false negative.
+    """
+
+    def __init__(self, capacity, error_rate=BLOOM_ERROR_RATE):
+        self.capacity = max(1, capacity)
+        self.size = max(64, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k probes from one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + index * step) % self.size for index in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE, sync_interval=SYNC_INTERVAL):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self._filter = None
+        self._last_id = 0
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+
+    def might_be_revoked(self, jti):
+        """
+        False means jti is certainly not revoked; True needs a database check.
+        """
+        if self._filter is None or time.monotonic() - self._synced_at >= self.sync_interval:
+            with self._lock:
+                if self._filter is None:
+                    self._rebuild()
+                elif time.monotonic() - self._synced_at >= self.sync_interval:
+                    self._sync()
+        return jti in self._filter
+
+    def add(self, jti):
+        with self._lock:
+            if self._filter is not None:
+                self._filter.add(jti)
+
+    def reset(self):
+        with self._lock:
+            self._filter = None
+
+    def _rebuild(self):
+        # Rows above last_id are picked up by the next sync
+        last_id = RevokedToken.objects.aggregate(last=Max('id'))['last'] or 0
+        live = RevokedToken.objects.filter(id__lte=last_id, expires_at__gt=timezone.now())
+        bloom = BloomFilter(max(self.capacity, 2 * live.count()), self.error_rate)
+        for jti in live.values_list('jti', flat=True).iterator(chunk_size=LOAD_CHUNK_SIZE):
+            bloom.add(jti)
+        self._filter, self._last_id = bloom, last_id
+        self._synced_at = time.monotonic()
+
+    def _sync(self):
+        rows = RevokedToken.objects.filter(id__gt=self._last_id).order_by('id').values_list('id', 'jti')
+        for row_id, jti in rows.iterator(chunk_size=LOAD_CHUNK_SIZE):
+            self._filter.add(jti)
+            self._last_id = row_id
+        self._synced_at = time.monotonic()
+        if self._filter.count > self._filter.capacity:
+            # Past its error rate: start over without the expired JTIs
+            self._rebuild()
+
+
+revocations = RevocationList()
+
+
+class RevocableRefreshToken(RefreshToken):
+    """
+    Refresh token checked against RevokedToken on every use. Only revoked
+    tokens are stored; issuing a token writes nothing.
+    """
+
+    def verify(self, *args, **kwargs):
+        # Expired tokens are rejected before the blacklist is consulted
+        super().verify(*args, **kwargs)
+        self.check_blacklist()
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if revocations.might_be_revoked(jti) and RevokedToken.objects.filter(jti=jti).exists():
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        try:
+            with transaction.atomic():
+                revoked = RevokedToken.objects.create(
+                    jti=jti, expires_at=datetime_from_epoch(self.payload['exp'])
+                )
+        except IntegrityError:
+            # Revoked concurrently, e.g. the same token refreshed twice
+            raise TokenError(_("Token is blacklisted"))
+        revocations.add(jti)
+        return revoked
+
+    def outstand(self):
+        # Issued tokens are not tracked, only revoked ones
+        return None
@@ -2,16 +2,17 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from .serializers import LoginSerializer, RegisterSerializer
+from .serializers import ClaimsTokenObtainPairSerializer, LoginSerializer, RegisterSerializer
 from .models import User
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework import generics, permissions
 from .models import User
 from .serializers import UserSerializer
+from carts.models import CartItem
+from carts.views import get_cart_id
 
 
 def get_tokens_for_user(user):
-    refresh = RefreshToken.for_user(user)
+    refresh = ClaimsTokenObtainPairSerializer.get_token(user)
     return {
         'refresh': str(refresh),
         'access': str(refresh.access_token),
@@ -54,6 +55,9 @@ class LoginView(APIView):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.validated_data
+            cart_id = get_cart_id(request)
+            if cart_id:
+                CartItem.objects.merge_guest_cart(cart_id, user)
             tokens = get_tokens_for_user(user)
             return Response({
                 "detail": "Login successful.",
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the Kikuu Sentiment API.
+
+Creates a throwaway database, fills it with synthetic users, products, reviews
+and orders, then drives the key endpoints in-process from several threads.
+Prints (or writes) a JSON report with latency percentiles, throughput and SQL
+query counts per endpoint so runs can be compared across commits.
+
+Usage:
+    python benchmark_api.py --users 200 --products 500 --reviews 20000 \
+        --orders 2000 --requests 200 --concurrency 8 --output bench.json
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kikuu_sentiment.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.hashers import make_password  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from accounts.models import User  # noqa: E402
+from accounts.serializers import ClaimsTokenObtainPairSerializer  # noqa: E402
+from kikuu.models import Review, ReviewDailyStat, ReviewStat  # noqa: E402
+from kikuu.sentiment import classify_batch  # noqa: E402
+from orders.models import Order, OrderProduct  # noqa: E402
+from store.models import Category, Product  # noqa: E402
+
+WORDS = (
+    "great fast delivery seller product quality phone case shoes bag price "
+    "terrible late broken excellent recommend cheap slow support refund "
+    "package arrived good bad okay service love size color battery"
+).split()
+
+SEARCH_TERMS = ['delivery', 'quality phone', 'refund', 'seller support']
+
+
+# --------------------------------------------------------------------------
+# Fixture generation
+# --------------------------------------------------------------------------
+
+def generate_fixtures(rng, users, products, reviews, orders, batch_size=1000):
+    """Bulk-insert a synthetic data set and return the users to benchmark as."""
+    password = make_password('benchpass123')
+    sellers = max(1, users // 10)
+    User.objects.bulk_create([
+        User(
+            email=f'user{index}@bench.local',
+            username=f'user{index}',
+            password=password,
+            role='seller' if index < sellers else 'buyer',
+        )
+        for index in range(users)
+    ], batch_size=batch_size)
+    all_users = list(User.objects.order_by('id'))
+    seller_users = [user for user in all_users if user.role == 'seller']
+    buyer_users = [user for user in all_users if user.role == 'buyer'] or seller_users
+
+    categories = Category.objects.bulk_create([
+        Category(category_name=f'Category {index}') for index in range(10)
+    ])
+    Product.objects.bulk_create([
+        Product(
+            product_name=f'Product {index}',
+            description=' '.join(rng.choices(WORDS, k=12)),
+            price=Decimal(rng.randint(100, 100000)) / 100,
+            stock=1_000_000,
+            category=rng.choice(categories),
+            user=rng.choice(seller_users),
+        )
+        for index in range(products)
+    ], batch_size=batch_size)
+    all_products = list(Product.objects.only('id', 'price'))
+
+    for start in range(0, reviews, batch_size):
+        count = min(batch_size, reviews - start)
+        comments = [' '.join(rng.choices(WORDS, k=rng.randint(5, 25))) for _ in range(count)]
+        authors = rng.choices(all_users, k=count)
+        Review.objects.bulk_create([
+            Review(
+                user=author,
+                username=author.username,
+                user_role=author.role,
+                comment=comment,
+                sentiment=sentiment,
+                rating=rng.randint(1, 5),
+            )
+            for author, comment, sentiment in zip(authors, comments, classify_batch(comments))
+        ])
+    # bulk_create skips the signal handlers that maintain the counters
+    ReviewStat.objects.rebuild()
+    ReviewDailyStat.objects.rebuild()
+
+    for start in range(0, orders, batch_size):
+        count = min(batch_size, orders - start)
+        buyers = rng.choices(buyer_users, k=count)
+        created = Order.objects.bulk_create([
+            Order(
+                user=buyer, first_name='Bench', last_name='Buyer', email=buyer.email,
+                phone='0780000000', district='Gasabo', sector='Remera', cell='Rukiri',
+                order_total=Decimal('0.00'), tax=Decimal('0.00'), ip='127.0.0.1',
+                is_ordered=True, status=rng.choice(['pending', 'completed']),
+            )
+            for buyer in buyers
+        ])
+        lines = []
+        for order in created:
+            for product in rng.sample(all_products, k=min(3, len(all_products))):
+                lines.append(OrderProduct(
+                    order=order, user=order.user, product=product,
+                    quantity=rng.randint(1, 3), product_price=product.price,
+                ))
+        OrderProduct.objects.bulk_create(lines, batch_size=batch_size)
+
+    return seller_users, buyer_users, all_products
+
+
+# --------------------------------------------------------------------------
+# Scenarios
+# --------------------------------------------------------------------------
+
+def bearer(user):
+    return f'Bearer {ClaimsTokenObtainPairSerializer.get_token(user).access_token}'
+
+
+def build_scenarios(rng, sellers, buyers, products):
+    seller_auth = bearer(sellers[0])
+    buyer_tokens = [bearer(user) for user in buyers[:20]]
+    product_ids = [product.id for product in products]
+
+    def ingest_body(rows=500):
+        return '\n'.join(
+            json.dumps({'comment': ' '.join(rng.choices(WORDS, k=12)), 'rating': rng.randint(1, 5)})
+            for _ in range(rows)
+        )
+
+    def order_payload():
+        return {
+            'first_name': 'Bench', 'last_name': 'Buyer', 'email': 'bench@bench.local',
+            'phone': '0780000000', 'district': 'Gasabo', 'sector': 'Remera', 'cell': 'Rukiri',
+            'order_items': [
+                {'product_id': product_id, 'quantity': 1}
+                for product_id in rng.sample(product_ids, k=min(2, len(product_ids)))
+            ],
+        }
+
+    # name -> callable(client) returning a response
+    return {
+        'review_list': lambda client: client.get('/api/kikuu/reviews/'),
+        'review_list_cursor': lambda client: client.get('/api/kikuu/reviews/?cursor='),
+        'review_search': lambda client: client.get(
+            '/api/kikuu/reviews/', {'search': rng.choice(SEARCH_TERMS)}
+        ),
+        'review_stats': lambda client: client.get('/api/kikuu/reviews/stats/'),
+        'review_bulk_ingest': lambda client: client.post(
+            '/api/kikuu/reviews/bulk/', ingest_body(),
+            content_type='application/x-ndjson',
+            HTTP_AUTHORIZATION=seller_auth,
+        ),
+        'product_list': lambda client: client.get('/api/store/products/'),
+        'cart_add': lambda client: client.post(
+            '/api/carts/items/add/',
+            {'product': rng.choice(product_ids), 'quantity': 1},
+            content_type='application/json',
+            HTTP_AUTHORIZATION=rng.choice(buyer_tokens),
+        ),
+        'order_create': lambda client: client.post(
+            '/api/orders/orders/', order_payload(),
+            content_type='application/json',
+            HTTP_AUTHORIZATION=rng.choice(buyer_tokens),
+        ),
+        'seller_stats': lambda client: client.get(
+            '/api/orders/orders/stats/', HTTP_AUTHORIZATION=seller_auth
+        ),
+    }
+
+
+# --------------------------------------------------------------------------
+# Driver
+# --------------------------------------------------------------------------
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    rank = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def run_scenario(call, total_requests, concurrency, warmup):
+    lock = threading.Lock()
+    latencies, query_counts, statuses = [], [], {}
+
+    def worker(count):
+        client = Client()
+        try:
+            for _ in range(warmup):
+                call(client)
+            for _ in range(count):
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = call(client)
+                    elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed * 1000)
+                    query_counts.append(len(queries))
+                    statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        finally:
+            connection.close()
+
+    shares = [total_requests // concurrency] * concurrency
+    for index in range(total_requests % concurrency):
+        shares[index] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, [share for share in shares if share]))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': sum(count for status, count in statuses.items() if status >= 400),
+        'status_codes': {str(status): count for status, count in sorted(statuses.items())},
+        'throughput_rps': round(len(latencies) / wall, 2) if wall else 0.0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'mean': round(statistics.fmean(latencies), 3) if latencies else 0.0,
+            'max': round(latencies[-1], 3) if latencies else 0.0,
+        },
+        'queries': {
+            'mean': round(statistics.fmean(query_counts), 2) if query_counts else 0.0,
+            'max': max(query_counts, default=0),
+        },
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--reviews', type=int, default=5000)
+    parser.add_argument('--orders', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=100, help="Measured requests per endpoint")
+    parser.add_argument('--concurrency', type=int, default=4, help="Client threads per endpoint")
+    parser.add_argument('--warmup', type=int, default=2, help="Unmeasured requests per thread")
+    parser.add_argument('--endpoints', nargs='*', help="Only run these scenarios")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    # Per-request logging would dominate the measurements
+    logging.disable(logging.CRITICAL)
+
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        started = time.perf_counter()
+        sellers, buyers, products = generate_fixtures(
+            rng, args.users, args.products, args.reviews, args.orders
+        )
+        fixture_seconds = time.perf_counter() - started
+
+        scenarios = build_scenarios(rng, sellers, buyers, products)
+        selected = args.endpoints or list(scenarios)
+        unknown = set(selected) - set(scenarios)
+        if unknown:
+            parser.error(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+        results = {}
+        for name in selected:
+            print(f"Benchmarking {name}...", file=sys.stderr)
+            results[name] = run_scenario(scenarios[name], args.requests, args.concurrency, args.warmup)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    report = {
+        'meta': {
+            'git_revision': git_revision(),
+            'database_engine': connection.settings_dict['ENGINE'],
+            'python': sys.version.split()[0],
+            'django': django.get_version(),
+            'fixture_seconds': round(fixture_seconds, 2),
+            'config': vars(args),
+        },
+        'endpoints': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output + '\n')
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
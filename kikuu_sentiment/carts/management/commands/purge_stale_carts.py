@@ -0,0 +1,53 @@
+"""
+Delete abandoned anonymous carts.
+
+A cart is stale when it was created more than --days ago and holds no item
+belonging to a signed-in user. Carts are deleted in primary-key chunks, one
+committed transaction per chunk, so the table is never locked for long; their
+items go with them through the foreign-key cascade.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from carts.models import Cart, CartItem
+
+
+class Command(BaseCommand):
+    help = "Delete anonymous carts (and their items) that have been abandoned."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30,
+                            help="Purge carts created more than this many days ago (default: 30).")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Carts deleted per transaction (default: 1000).")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report how many carts would be deleted.")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        cutoff = timezone.localdate() - timedelta(days=max(0, options['days']))
+        stale = Cart.objects.filter(date_added__lt=cutoff).exclude(
+            Exists(CartItem.objects.filter(cart=OuterRef('pk'), user__isnull=False))
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f"{stale.count()} stale carts would be deleted.")
+            return
+
+        carts = items = 0
+        last_pk = 0
+        while True:
+            ids = list(stale.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            last_pk = ids[-1]
+            with transaction.atomic():
+                _, deleted = Cart.objects.filter(pk__in=ids).delete()
+            carts += deleted.get(Cart._meta.label, 0)
+            items += deleted.get(CartItem._meta.label, 0)
+
+        self.stdout.write(self.style.SUCCESS(f"Deleted {carts} stale carts and {items} cart items."))
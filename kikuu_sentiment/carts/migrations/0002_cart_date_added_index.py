@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-17 22:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cart',
+            name='date_added',
+            field=models.DateField(auto_now_add=True, db_index=True),
+        ),
+    ]
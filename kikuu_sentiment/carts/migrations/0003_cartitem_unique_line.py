@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-17 22:33
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_lines(apps, schema_editor):
+    CartItem = apps.get_model('carts', 'CartItem')
+    duplicates = (
+        CartItem.objects.order_by().values('cart', 'product', 'user')
+        .annotate(lines=Count('id'), keep=Min('id'), total=Sum('quantity'))
+        .filter(lines__gt=1)
+    )
+    for row in duplicates:
+        lines = CartItem.objects.filter(cart=row['cart'], product=row['product'], user=row['user'])
+        lines.exclude(id=row['keep']).delete()
+        lines.filter(id=row['keep']).update(quantity=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carts', '0002_cart_date_added_index'),
+        ('store', '0003_category_updated_at_product_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_lines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('cart', 'product', 'user'), name='unique_cart_item_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('cart', 'product'), name='unique_cart_item_guest'),
+        ),
+    ]
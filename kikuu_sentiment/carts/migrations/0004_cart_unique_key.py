@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('carts', '0003_cartitem_unique_line'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='cart',
+            constraint=models.UniqueConstraint(condition=models.Q(('cart_id', ''), _negated=True), fields=('cart_id',), name='unique_cart_key'),
+        ),
+    ]
@@ -1,15 +1,111 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Exists, F, Min, OuterRef, Q, Subquery
 from kikuu_sentiment import settings
 from store.models import Product
 
+class CartManager(models.Manager):
+    def for_user(self, user):
+        """
+        Return the signed-in user's own cart, creating it on first use. The
+        key is unique, so concurrent first adds share one cart.
+        """
+        return self.get_or_create(cart_id=f'user:{user.pk}')[0]
+
+
 class Cart(models.Model):
     cart_id = models.CharField(max_length=250, blank=True)
-    date_added = models.DateField(auto_now_add=True)
+    date_added = models.DateField(auto_now_add=True, db_index=True)
+
+    objects = CartManager()
+
+    class Meta:
+        constraints = [
+            # Session carts have no key; user carts are keyed by user
+            models.UniqueConstraint(fields=['cart_id'], condition=~Q(cart_id=''), name='unique_cart_key'),
+        ]
 
     def __str__(self):
         return self.cart_id or "Unnamed Cart"
 
 
+class CartItemQuerySet(models.QuerySet):
+    def with_totals(self):
+        """
+        Join the product and compute line_total (price * quantity) in SQL.
+        """
+        return self.select_related('product').annotate(
+            line_total=models.ExpressionWrapper(
+                F('quantity') * F('product__price'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            )
+        )
+
+
+class CartItemManager(models.Manager.from_queryset(CartItemQuerySet)):
+    def _line(self, cart, product, user):
+        """
+        The line quantities are added to: a guest's line in the session cart,
+        or a signed-in user's line for the product in whichever cart holds it.
+        """
+        if user is None:
+            return self.filter(cart=cart, product=product, user__isnull=True)
+        # Lines merged from a guest cart stay in that cart; take the oldest
+        first = self.filter(user=user, product=product).order_by('id').values('id')[:1]
+        return self.filter(id=Subquery(first))
+
+    def add_quantity(self, cart, product, user, quantity):
+        """
+        Atomically add quantity to the caller's line for product, creating it
+        in cart if needed. Returns (item_id, new_quantity).
+        """
+        line = self._line(cart, product, user)
+        with transaction.atomic():
+            if not line.update(quantity=F('quantity') + quantity, is_active=True):
+                try:
+                    with transaction.atomic():
+                        item = self.create(cart=cart, product=product, user=user, quantity=quantity)
+                    return item.id, item.quantity
+                except IntegrityError:
+                    # A concurrent request inserted the line first
+                    line.update(quantity=F('quantity') + quantity, is_active=True)
+            return line.values_list('id', 'quantity').get()
+
+    def remove_quantity(self, cart, product, user, quantity):
+        """
+        Atomically take quantity off the caller's line, deleting it when
+        nothing would be left. cart is only used for guests. Returns
+        (item_id, new_quantity), or None if the line is gone.
+        """
+        line = self._line(cart, product, user)
+        with transaction.atomic():
+            if line.filter(quantity__gt=quantity).update(quantity=F('quantity') - quantity):
+                return line.values_list('id', 'quantity').get()
+            line.delete()
+            return None
+
+    def merge_guest_cart(self, cart_id, user):
+        """
+        Hand the guest lines of cart_id over to user in three statements,
+        whatever the cart size: quantities are added onto lines the user
+        already has for the same product, and the remaining lines are
+        re-owned. Returns the number of guest lines merged.
+        """
+        guest = self.filter(cart_id=cart_id, user__isnull=True)
+        owned = self.filter(user=user)
+        with transaction.atomic():
+            # One target per product, should the user hold it in several carts
+            targets = owned.filter(product__in=guest.values('product')).order_by().values(
+                'product'
+            ).annotate(first=Min('id')).values('first')
+            guest_quantity = guest.filter(product=OuterRef('product')).values('quantity')[:1]
+            self.filter(id__in=targets).update(
+                quantity=F('quantity') + Subquery(guest_quantity), is_active=True
+            )
+            combined, _ = guest.filter(Exists(owned.filter(product=OuterRef('product')))).delete()
+            moved = guest.update(user=user)
+        return combined + moved
+
+
 class CartItem(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='cart_items')
@@ -17,6 +113,21 @@ class CartItem(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     is_active = models.BooleanField(default=True)
 
+    objects = CartItemManager()
+
+    class Meta:
+        constraints = [
+            # NULLs never collide in a plain unique index, so guest lines get their own
+            models.UniqueConstraint(
+                fields=['cart', 'product', 'user'], condition=Q(user__isnull=False),
+                name='unique_cart_item_user',
+            ),
+            models.UniqueConstraint(
+                fields=['cart', 'product'], condition=Q(user__isnull=True),
+                name='unique_cart_item_guest',
+            ),
+        ]
+
     @property
     def sub_total(self):
         return self.product.price * self.quantity
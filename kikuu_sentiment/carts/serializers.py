@@ -1,3 +1,4 @@
+from decimal import Decimal
 from rest_framework import serializers
 from .models import Cart, CartItem
 from store.models import Product
@@ -24,7 +25,11 @@ class CartItemSerializer(serializers.ModelSerializer):
         return None
 
     def get_money(self, obj):
-        return str(obj.sub_total)
+        line_total = getattr(obj, 'line_total', None)
+        if line_total is None:
+            return str(obj.sub_total)
+        # SQLite returns computed decimals unscaled
+        return str(line_total.quantize(Decimal('0.01')))
 
 class AddCartItemSerializer(serializers.ModelSerializer):
     class Meta:
@@ -1,3 +1,290 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from kikuu_sentiment.testing import QueryCountAssertionsMixin
+from store.models import Category, Product
+from .models import Cart, CartItem
+
+
+class CartTestData:
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            email='seller@test.com', username='seller', password='testpass123', role='seller'
+        )
+        self.buyer = User.objects.create_user(
+            email='buyer@test.com', username='buyer', password='testpass123'
+        )
+        category = Category.objects.create(category_name='Phones')
+        self.product = Product.objects.create(
+            product_name='Phone', price='10.00', stock=10, category=category, user=self.seller
+        )
+
+
+class LazyCartTests(CartTestData, TestCase):
+    def test_listing_an_empty_cart_writes_nothing(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('cart-items'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+        self.assertFalse(Cart.objects.exists())
+        self.assertNotIn('sessionid', response.cookies)
+
+    def test_first_add_creates_the_cart(self):
+        response = self.client.post(
+            reverse('add-cart-item'), {'product': self.product.id, 'quantity': 2}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Cart.objects.count(), 1)
+
+        self.client.post(reverse('add-cart-item'), {'product': self.product.id}, format='json')
+        self.assertEqual(Cart.objects.count(), 1)
+        items = self.client.get(reverse('cart-items')).data['results']
+        self.assertEqual([item['quantity'] for item in items], [3])
+
+    def test_purged_cart_is_recreated(self):
+        self.client.post(reverse('add-cart-item'), {'product': self.product.id}, format='json')
+        Cart.objects.all().delete()
+        response = self.client.post(reverse('add-cart-item'), {'product': self.product.id}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Cart.objects.count(), 1)
+
+
+class CartQuantityTests(CartTestData, TestCase):
+    def update(self, action, quantity):
+        return self.client.post(reverse('update-cart-item-quantity'), {
+            'product': self.product.id, 'action': action, 'quantity': quantity,
+        }, format='json')
+
+    def test_add_and_remove_return_the_new_quantity(self):
+        self.client.force_authenticate(self.buyer)
+        self.client.post(reverse('add-cart-item'), {'product': self.product.id, 'quantity': 2}, format='json')
+        response = self.update('add', 3)
+        self.assertEqual(response.data['item']['quantity'], 5)
+        self.assertEqual(response.data['item']['product_name'], 'Phone')
+
+        response = self.update('remove', 4)
+        self.assertEqual(response.data['message'], 'Item quantity decreased.')
+        self.assertEqual(response.data['item']['quantity'], 1)
+
+        response = self.update('remove', 1)
+        self.assertEqual(response.data['message'], 'Item removed from cart because quantity reached zero.')
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_token_clients_without_a_session_share_one_line(self):
+        token = self.client.post(
+            reverse('login'), {'email': 'buyer@test.com', 'password': 'testpass123'}, format='json'
+        ).data['token']['access']
+
+        def post(url, data):
+            # A fresh client per request: no session cookie, only the token
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+            return client.post(reverse(url), {'product': self.product.id, **data}, format='json')
+
+        post('add-cart-item', {'quantity': 1})
+        response = post('add-cart-item', {'quantity': 1})
+        self.assertEqual(response.data['item']['quantity'], 2)
+        self.assertEqual(post('update-cart-item-quantity', {'action': 'add', 'quantity': 2}).data['item']['quantity'], 4)
+        self.assertEqual(Cart.objects.count(), 1)
+        self.assertEqual(list(CartItem.objects.values_list('user', 'quantity')), [(self.buyer.pk, 4)])
+
+        response = post('update-cart-item-quantity', {'action': 'remove', 'quantity': 3})
+        self.assertEqual(response.data['item']['quantity'], 1)
+        response = post('update-cart-item-quantity', {'action': 'remove', 'quantity': 1})
+        self.assertEqual(response.data['message'], 'Item removed from cart because quantity reached zero.')
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_signed_in_adds_reach_lines_merged_from_a_guest_cart(self):
+        self.client.post(reverse('add-cart-item'), {'product': self.product.id, 'quantity': 2}, format='json')
+        self.client.post(reverse('login'), {'email': 'buyer@test.com', 'password': 'testpass123'}, format='json')
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(self.update('add', 1).data['item']['quantity'], 3)
+        self.assertEqual(CartItem.objects.count(), 1)
+
+    def test_existing_line_is_one_update(self):
+        self.client.post(reverse('add-cart-item'), {'product': self.product.id}, format='json')
+        # Session, product, cart, then update + read back in one transaction
+        with self.assertNumQueries(7):
+            response = self.client.post(reverse('add-cart-item'), {'product': self.product.id}, format='json')
+        self.assertEqual(response.data['item']['quantity'], 2)
+        self.assertEqual(CartItem.objects.count(), 1)
+
+    def test_rejects_non_positive_quantity(self):
+        response = self.client.post(reverse('add-cart-item'), {'product': self.product.id, 'quantity': 0}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class CartSummaryTests(CartTestData, TestCase):
+    def add_lines(self, count):
+        cart = Cart.objects.create()
+        for index in range(count):
+            product = Product.objects.create(
+                product_name=f'Item {index}', price='19.99', stock=10,
+                category=self.product.category, user=self.seller,
+            )
+            CartItem.objects.create(cart=cart, user=self.buyer, product=product, quantity=index + 1)
+
+    def test_totals_match_order_tax(self):
+        self.add_lines(3)
+        self.client.force_authenticate(self.buyer)
+        response = self.client.get(reverse('cart-summary'))
+        self.assertEqual(response.status_code, 200)
+        # (1 + 2 + 3) * 19.99
+        self.assertEqual(response.data['subtotal'], '119.94')
+        self.assertEqual(response.data['tax'], '11.99')
+        self.assertEqual(response.data['total'], '131.93')
+        self.assertEqual(response.data['item_count'], 6)
+        self.assertEqual([item['money'] for item in response.data['items']], ['19.99', '39.98', '59.97'])
+
+    def test_one_query_whatever_the_cart_size(self):
+        self.client.force_authenticate(self.buyer)
+        for size in (1, 10):
+            CartItem.objects.all().delete()
+            self.add_lines(size)
+            with self.assertNumQueries(1):
+                response = self.client.get(reverse('cart-summary'))
+            self.assertEqual(len(response.data['items']), size)
+
+    def test_empty_guest_cart(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('cart-summary'))
+        self.assertEqual(response.data['items'], [])
+        self.assertEqual(response.data['total'], '0.00')
+
+
+class GuestCartMergeTests(QueryCountAssertionsMixin, CartTestData, TestCase):
+    def add_as_guest(self, product, quantity=1):
+        self.client.post(reverse('add-cart-item'), {'product': product.id, 'quantity': quantity}, format='json')
+
+    def login(self):
+        response = self.client.post(
+            reverse('login'), {'email': 'buyer@test.com', 'password': 'testpass123'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_login_moves_and_combines_guest_lines(self):
+        case = Product.objects.create(
+            product_name='Case', price='2.00', stock=10, category=self.product.category, user=self.seller
+        )
+        # The buyer already has two phones from an earlier session
+        CartItem.objects.create(cart=Cart.objects.create(), user=self.buyer, product=self.product, quantity=2)
+        self.add_as_guest(self.product, 3)
+        self.add_as_guest(case, 1)
+
+        self.login()
+
+        lines = dict(CartItem.objects.filter(user=self.buyer).values_list('product_id', 'quantity'))
+        self.assertEqual(lines, {self.product.id: 5, case.id: 1})
+        self.assertFalse(CartItem.objects.filter(user__isnull=True).exists())
+
+    def test_merge_cost_does_not_grow_with_the_cart(self):
+        def grow(size):
+            CartItem.objects.all().delete()
+            cart = Cart.objects.create()
+            session = self.client.session
+            session['cart_id'] = cart.id
+            session.save()
+            products = [
+                Product.objects.create(
+                    product_name=f'Item {index}', price='1.00', stock=10,
+                    category=self.product.category, user=self.seller,
+                )
+                for index in range(size)
+            ]
+            CartItem.objects.bulk_create([
+                CartItem(cart=cart, product=product, quantity=1) for product in products
+            ])
+            # Half of the products are already in the buyer's cart
+            CartItem.objects.bulk_create([
+                CartItem(cart=Cart.objects.create(), user=self.buyer, product=product)
+                for product in products[::2]
+            ])
+
+        self.assertConstantQueryCount(self.login, grow, sizes=(2, 10, 50))
+        self.assertEqual(CartItem.objects.filter(user=self.buyer).count(), 50)
+        self.assertEqual(
+            set(CartItem.objects.filter(user=self.buyer).values_list('quantity', flat=True)), {1, 2}
+        )
+
+    def test_login_without_a_guest_cart(self):
+        self.login()
+        self.assertFalse(CartItem.objects.exists())
+
+
+class ConcurrentCartUpdateTests(CartTestData, TransactionTestCase):
+    threads = 10
+
+    def add_item(self, cookies, barrier, results):
+        client = APIClient()
+        client.cookies = cookies
+        try:
+            barrier.wait()
+            for _ in range(3):
+                response = client.post(reverse('add-cart-item'), {'product': self.product.id}, format='json')
+                results.append(response.status_code)
+        finally:
+            connection.close()
+
+    def test_concurrent_adds_lose_no_increments(self):
+        # Create the session cart with another product so the first line for
+        # self.product is raced for as well
+        other = Product.objects.create(
+            product_name='Case', price='2.00', stock=10, category=self.product.category, user=self.seller
+        )
+        self.client.post(reverse('add-cart-item'), {'product': other.id}, format='json')
+
+        barrier = threading.Barrier(self.threads)
+        results = []
+        workers = [
+            threading.Thread(target=self.add_item, args=(self.client.cookies, barrier, results))
+            for _ in range(self.threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(results, [201] * self.threads * 3)
+        line = CartItem.objects.get(product=self.product)
+        self.assertEqual(line.quantity, self.threads * 3)
+        self.assertEqual(Cart.objects.count(), 1)
+
+
+class PurgeStaleCartsTests(CartTestData, TestCase):
+    def make_cart(self, days_old, user=None):
+        cart = Cart.objects.create()
+        Cart.objects.filter(pk=cart.pk).update(date_added=timezone.localdate() - timedelta(days=days_old))
+        CartItem.objects.create(cart=cart, product=self.product, user=user)
+        return cart
+
+    def test_deletes_only_abandoned_anonymous_carts(self):
+        stale = [self.make_cart(40) for _ in range(5)]
+        recent = self.make_cart(2)
+        owned = self.make_cart(40, user=self.buyer)
+        empty = Cart.objects.create()
+        Cart.objects.filter(pk=empty.pk).update(date_added=timezone.localdate() - timedelta(days=40))
+
+        out = StringIO()
+        call_command('purge_stale_carts', '--batch-size', '2', stdout=out)
+
+        self.assertIn('Deleted 6 stale carts and 5 cart items', out.getvalue())
+        self.assertFalse(Cart.objects.filter(pk__in=[cart.pk for cart in stale + [empty]]).exists())
+        self.assertEqual(set(Cart.objects.values_list('pk', flat=True)), {recent.pk, owned.pk})
+        self.assertEqual(CartItem.objects.count(), 2)
+
+    def test_dry_run(self):
+        self.make_cart(40)
+        out = StringIO()
+        call_command('purge_stale_carts', '--dry-run', stdout=out)
+        self.assertIn('1 stale carts would be deleted', out.getvalue())
+        self.assertEqual(Cart.objects.count(), 1)
@@ -1,26 +1,83 @@
+from decimal import Decimal
 from rest_framework import generics, status
 from rest_framework.response import Response
 from .models import Cart, CartItem
 from .serializers import CartItemSerializer, AddCartItemSerializer
 from store.models import Product
+from orders.models import TAX_RATE
 from django.shortcuts import get_object_or_404
 
-def get_or_create_cart_id(request):
-    cart_id = request.session.get('cart_id')
-    if not cart_id:
-        cart = Cart.objects.create()
-        request.session['cart_id'] = cart.id
-        return cart.id
-    return cart_id
+def get_cart_id(request):
+    """
+    Return the session's cart id, or None. Never writes, so read-only
+    visitors cost no Cart row and no session row.
+    """
+    return request.session.get('cart_id')
+
+def get_or_create_cart(request):
+    """
+    Return the cart new lines go into, creating it on first write. Signed-in
+    users have one cart of their own, so API clients without a session
+    cookie keep adding to the same lines. A session pointing at a purged
+    cart gets a fresh one.
+    """
+    if request.user.is_authenticated:
+        return Cart.objects.for_user(request.user)
+    cart_id = get_cart_id(request)
+    if cart_id:
+        cart = Cart.objects.filter(id=cart_id).first()
+        if cart is not None:
+            return cart
+    cart = Cart.objects.create()
+    request.session['cart_id'] = cart.id
+    return cart
+
+def get_cart_items(request):
+    """
+    Active lines of the caller's cart with product and line_total loaded.
+    """
+    if request.user.is_authenticated:
+        items = CartItem.objects.filter(user=request.user, is_active=True)
+    else:
+        cart_id = get_cart_id(request)
+        if not cart_id:
+            return CartItem.objects.none()
+        items = CartItem.objects.filter(cart_id=cart_id, is_active=True)
+    return items.with_totals().order_by('id')
 
 class CartItemListView(generics.ListAPIView):
     serializer_class = CartItemSerializer
 
     def get_queryset(self):
-        if self.request.user.is_authenticated:
-            return CartItem.objects.filter(user=self.request.user, is_active=True)
-        cart_id = get_or_create_cart_id(self.request)
-        return CartItem.objects.filter(cart_id=cart_id, is_active=True)
+        return get_cart_items(self.request)
+
+class CartSummaryView(generics.GenericAPIView):
+    serializer_class = CartItemSerializer
+
+    def get(self, request, *args, **kwargs):
+        # Totals are summed from the same rows, so the whole summary is one query
+        items = list(get_cart_items(request))
+        subtotal = sum((item.line_total for item in items), Decimal('0.00')).quantize(Decimal('0.01'))
+        tax = (subtotal * TAX_RATE).quantize(Decimal('0.01'))
+        return Response({
+            "items": self.get_serializer(items, many=True).data,
+            "item_count": sum(item.quantity for item in items),
+            "subtotal": str(subtotal),
+            "tax": str(tax),
+            "total": str(subtotal + tax),
+        }, status=status.HTTP_200_OK)
+
+def cart_item_payload(item_id, product, quantity):
+    return {
+        "id": item_id,
+        "product_name": product.product_name,
+        "product_id": product.id,
+        "product_image": product.image_url if hasattr(product, 'image_url') else None,
+        "quantity": quantity
+    }
+
+def cart_owner(request):
+    return request.user if request.user.is_authenticated else None
 
 class AddCartItemView(generics.CreateAPIView):
     serializer_class = AddCartItemSerializer
@@ -29,32 +86,15 @@ class AddCartItemView(generics.CreateAPIView):
         data = request.data
         product = get_object_or_404(Product, id=data.get("product"))
         quantity = int(data.get("quantity", 1))
+        if quantity < 1:
+            return Response({"error": "Quantity must be at least 1."}, status=status.HTTP_400_BAD_REQUEST)
 
-        cart_id = get_or_create_cart_id(request)
-        cart = get_object_or_404(Cart, id=cart_id)
-
-        if request.user.is_authenticated:
-            cart_item, created = CartItem.objects.get_or_create(
-                user=request.user, cart=cart, product=product, defaults={"quantity": quantity}
-            )
-        else:
-            cart_item, created = CartItem.objects.get_or_create(
-                cart=cart, product=product, defaults={"quantity": quantity}
-            )
-
-        if not created:
-            cart_item.quantity += quantity
-            cart_item.save()
+        cart = get_or_create_cart(request)
+        item_id, new_quantity = CartItem.objects.add_quantity(cart, product, cart_owner(request), quantity)
 
         return Response({
             "message": "Item added to cart",
-            "item": {
-                "id": cart_item.id,
-                "product_name": cart_item.product.product_name,
-                "product_id": cart_item.product.id,
-                "product_image": cart_item.product.image_url if hasattr(cart_item.product, 'image_url') else None,
-                "quantity": cart_item.quantity
-            }
+            "item": cart_item_payload(item_id, product, new_quantity)
         }, status=status.HTTP_201_CREATED)
 
 class RemoveCartItemView(generics.DestroyAPIView):
@@ -65,8 +105,8 @@ class RemoveCartItemView(generics.DestroyAPIView):
             if request.user.is_authenticated and cart_item.user == request.user:
                 cart_item.delete()
             elif not request.user.is_authenticated:
-                cart_id = get_or_create_cart_id(request)
-                if cart_item.cart_id == int(cart_id):
+                cart_id = get_cart_id(request)
+                if cart_id and cart_item.cart_id == int(cart_id):
                     cart_item.delete()
             else:
                 return Response({"error": "Unauthorized"}, status=status.HTTP_403_FORBIDDEN)
@@ -87,40 +127,27 @@ class UpdateCartItemQuantityView(generics.GenericAPIView):
         if quantity_change < 1:
             quantity_change = 1 
 
-        cart_id = get_or_create_cart_id(request)
-        cart = get_object_or_404(Cart, id=cart_id)
-
-        if request.user.is_authenticated:
-            cart_item, created = CartItem.objects.get_or_create(
-                user=request.user, cart=cart, product=product, defaults={"quantity": 0}
-            )
-        else:
-            cart_item, created = CartItem.objects.get_or_create(
-                cart=cart, product=product, defaults={"quantity": 0}
-            )
-
         if action == "add":
-            cart_item.quantity += quantity_change
-            cart_item.save()
+            cart = get_or_create_cart(request)
+            item_id, new_quantity = CartItem.objects.add_quantity(
+                cart, product, cart_owner(request), quantity_change
+            )
             message = "Item quantity increased."
         elif action == "remove":
-            cart_item.quantity -= quantity_change
-            if cart_item.quantity <= 0:
-                cart_item.delete()
+            # Removing never needs a cart to exist
+            owner = cart_owner(request)
+            cart_id = None if owner else get_cart_id(request)
+            line = (owner or cart_id) and CartItem.objects.remove_quantity(
+                cart_id, product, owner, quantity_change
+            )
+            if not line:
                 return Response({"message": "Item removed from cart because quantity reached zero."}, status=status.HTTP_200_OK)
-            else:
-                cart_item.save()
-                message = "Item quantity decreased."
+            item_id, new_quantity = line
+            message = "Item quantity decreased."
         else:
             return Response({"error": "Invalid action. Use 'add' or 'remove'."}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({
             "message": message,
-            "item": {
-                "id": cart_item.id,
-                "product_name": cart_item.product.product_name,
-                "product_id": cart_item.product.id,
-                "product_image": cart_item.product.image_url if hasattr(cart_item.product, 'image_url') else None,
-                "quantity": cart_item.quantity
-            }
+            "item": cart_item_payload(item_id, product, new_quantity)
         }, status=status.HTTP_200_OK)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class KikuuConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'kikuu'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from kikuu_sentiment.cache import register_cache_invalidation
+        register_cache_invalidation(self.get_model('Review'))
@@ -0,0 +1,320 @@
+"""
+Asynchronous import of reviews from external pages (Review.source_url).
+
+ReviewImporter keeps up to `concurrency` fetches in flight on one event loop
+with aiohttp, spaces requests to each host by a per-host rate limit, and
+re-fetches known pages conditionally (If-None-Match / If-Modified-Since)
+using the validators stored on ReviewSource. Parsed reviews are handed to a
+single writer coroutine that stores them in batches through
+kikuu.ingest.ingest_reviews, running the ORM in a worker thread via
+sync_to_async.
+
+Pages are understood if they are JSON (a list of {"comment", "rating"}
+objects, optionally under "reviews") or HTML carrying schema.org Review
+objects in <script type="application/ld+json"> blocks.
+"""
+import asyncio
+import json
+import logging
+from collections import deque, namedtuple
+from datetime import timedelta
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+import aiohttp
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .ingest import ingest_reviews
+from .models import Review, ReviewSource
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'KikuuReviewImporter/1.0'
+MAX_PAGE_BYTES = 5 * 1024 * 1024
+
+# status is None when the request failed; rows is None unless a page was parsed
+FetchedPage = namedtuple('FetchedPage', 'url status etag last_modified rows')
+
+
+class PageTooLarge(Exception):
+    pass
+
+
+class HostRateLimiter:
+    """
+    Space requests to the same host at least 1/rate seconds apart.
+    Only used from the event loop thread, so it needs no locking.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next_slot = {}
+
+    async def wait(self, host):
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class _JsonLdExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self._buffer = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'script' and (dict(attrs).get('type') or '').lower().startswith('application/ld+json'):
+            self._buffer = []
+
+    def handle_data(self, data):
+        if self._buffer is not None:
+            self._buffer.append(data)
+
+    def handle_endtag(self, tag):
+        if tag == 'script' and self._buffer is not None:
+            self.blocks.append(''.join(self._buffer))
+            self._buffer = None
+
+
+def _scale_rating(value, best=5, worst=1):
+    try:
+        value, best, worst = float(value), float(best or 5), float(worst or 1)
+    except (TypeError, ValueError):
+        return None
+    if best <= worst:
+        return None
+    return min(5, max(1, round(1 + (value - worst) * 4 / (best - worst))))
+
+
+def _review_from_node(node):
+    types = node.get('@type')
+    types = [types] if isinstance(types, str) else types or []
+    if 'Review' in types:
+        comment = node.get('reviewBody') or node.get('description')
+        rating = node.get('reviewRating')
+        rating = _scale_rating(
+            rating.get('ratingValue'), rating.get('bestRating'), rating.get('worstRating')
+        ) if isinstance(rating, dict) else None
+    elif isinstance(node.get('comment'), str):
+        comment = node['comment']
+        rating = _scale_rating(node.get('rating'))
+    else:
+        return None
+    if not isinstance(comment, str) or not comment.strip():
+        return None
+    review = {'comment': comment.strip()}
+    if rating is not None:
+        review['rating'] = rating
+    return review
+
+
+def extract_reviews(text, content_type, url):
+    """
+    Return the reviews found in a fetched page as ingest rows.
+    """
+    if 'json' in content_type:
+        documents = [json.loads(text)]
+    else:
+        parser = _JsonLdExtractor()
+        parser.feed(text)
+        parser.close()
+        documents = []
+        for block in parser.blocks:
+            try:
+                documents.append(json.loads(block))
+            except ValueError:
+                logger.debug("Skipping malformed JSON-LD block on %s", url)
+
+    reviews = []
+    stack = documents
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+        elif isinstance(node, dict):
+            review = _review_from_node(node)
+            if review is not None:
+                review['source_url'] = url
+                reviews.append(review)
+            else:
+                stack.extend(reversed(list(node.values())))
+    return reviews
+
+
+class ReviewImporter:
+    def __init__(self, user, concurrency=100, per_host_rate=2.0, batch_size=500,
+                 timeout=15.0, refresh_after=timedelta(hours=24), max_page_bytes=MAX_PAGE_BYTES):
+        self.user = user
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = HostRateLimiter(per_host_rate)
+        self.batch_size = max(1, batch_size)
+        self.timeout = timeout
+        self.refresh_after = refresh_after
+        self.max_page_bytes = max_page_bytes
+        self.sources = {}
+
+    async def run(self, urls):
+        """
+        Fetch every URL once and import the reviews found. Returns counters.
+        """
+        stats = dict.fromkeys((
+            'urls', 'duplicates', 'skipped_recent', 'fetched', 'not_modified', 'failed',
+            'reviews_created', 'reviews_existing', 'reviews_invalid',
+        ), 0)
+
+        # In-run dedup cache: each URL is fetched at most once
+        seen = set()
+        unique = []
+        for url in urls:
+            stats['urls'] += 1
+            if url in seen:
+                stats['duplicates'] += 1
+                continue
+            seen.add(url)
+            unique.append(url)
+
+        self.sources = await sync_to_async(self._load_sources)(unique)
+        queue = deque()
+        cutoff = timezone.now() - self.refresh_after if self.refresh_after else None
+        for url in unique:
+            source = self.sources.get(url)
+            if cutoff and source and source.fetched_at and source.fetched_at > cutoff:
+                stats['skipped_recent'] += 1
+            else:
+                queue.append(url)
+
+        if queue:
+            try:
+                await self._pump(queue, stats)
+            except ExceptionGroup as group:
+                raise group.exceptions[0]
+            finally:
+                await sync_to_async(close_old_connections)()
+        return stats
+
+    async def _pump(self, queue, stats):
+        pages = asyncio.Queue(maxsize=self.concurrency * 2)
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(
+            connector=connector, timeout=timeout, headers={'User-Agent': USER_AGENT}
+        ) as session:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(self._write(pages, stats))
+                workers = [
+                    group.create_task(self._fetch_worker(session, queue, pages))
+                    for _ in range(min(self.concurrency, len(queue)))
+                ]
+                await asyncio.gather(*workers)
+                await pages.put(None)
+
+    async def _fetch_worker(self, session, queue, pages):
+        while queue:
+            await pages.put(await self._fetch(session, queue.popleft()))
+
+    async def _fetch(self, session, url):
+        source = self.sources.get(url)
+        headers = {}
+        if source and source.etag:
+            headers['If-None-Match'] = source.etag
+        if source and source.last_modified:
+            headers['If-Modified-Since'] = source.last_modified
+
+        await self.rate_limiter.wait(urlsplit(url).hostname)
+        try:
+            async with session.get(url, headers=headers) as response:
+                if response.status == 304 and source:
+                    return FetchedPage(url, 304, source.etag, source.last_modified, None)
+                if response.status != 200:
+                    logger.warning("Fetching %s returned HTTP %d", url, response.status)
+                    return FetchedPage(url, response.status, '', '', None)
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    body.extend(chunk)
+                    if len(body) > self.max_page_bytes:
+                        raise PageTooLarge(f"larger than {self.max_page_bytes} bytes")
+                text = body.decode(response.charset or 'utf-8', errors='replace')
+                rows = extract_reviews(text, response.content_type, url)
+                return FetchedPage(
+                    url, 200, response.headers.get('ETag', ''),
+                    response.headers.get('Last-Modified', ''), rows,
+                )
+        except (aiohttp.ClientError, asyncio.TimeoutError, PageTooLarge, ValueError) as exc:
+            logger.warning("Fetching %s failed: %s", url, exc or exc.__class__.__name__)
+            return FetchedPage(url, None, '', '', None)
+
+    async def _write(self, pages, stats):
+        pending = []
+        pending_rows = 0
+        while True:
+            page = await pages.get()
+            if page is None:
+                break
+            if page.status == 200:
+                stats['fetched'] += 1
+            elif page.status == 304:
+                stats['not_modified'] += 1
+            else:
+                stats['failed'] += 1
+            if page.status in (200, 304):
+                pending.append(page)
+                pending_rows += len(page.rows or ())
+            if len(pending) >= self.batch_size or pending_rows >= self.batch_size:
+                self._add(stats, await sync_to_async(self._store)(pending))
+                pending, pending_rows = [], 0
+        if pending:
+            self._add(stats, await sync_to_async(self._store)(pending))
+
+    @staticmethod
+    def _add(stats, counts):
+        for key, value in counts.items():
+            stats[key] += value
+
+    def _load_sources(self, urls, chunk_size=500):
+        sources = {}
+        for start in range(0, len(urls), chunk_size):
+            for source in ReviewSource.objects.filter(url__in=urls[start:start + chunk_size]):
+                sources[source.url] = source
+        return sources
+
+    def _store(self, pages):
+        now = timezone.now()
+        ReviewSource.objects.bulk_create(
+            [
+                ReviewSource(
+                    url=page.url, etag=page.etag[:255], last_modified=page.last_modified[:64],
+                    last_status=page.status, fetched_at=now,
+                )
+                for page in pages
+            ],
+            update_conflicts=True, unique_fields=['url'],
+            update_fields=['etag', 'last_modified', 'last_status', 'fetched_at'],
+        )
+
+        parsed = [page for page in pages if page.rows]
+        if not parsed:
+            return {}
+        # Pages that changed still repeat the reviews imported last time
+        existing = set(
+            Review.objects.filter(source_url__in=[page.url for page in parsed])
+            .order_by().values_list('source_url', 'comment')
+        )
+        rows = []
+        for page in parsed:
+            for row in page.rows:
+                key = (page.url, row['comment'])
+                if key not in existing:
+                    existing.add(key)
+                    rows.append(row)
+        result = ingest_reviews(rows, self.user, batch_size=self.batch_size)
+        return {
+            'reviews_created': result['created'],
+            'reviews_existing': sum(len(page.rows) for page in parsed) - len(rows),
+            'reviews_invalid': len(result['errors']),
+        }
@@ -0,0 +1,230 @@
+"""
+Bulk review ingestion.
+
+Rows are parsed incrementally from a file-like body (NDJSON, or a JSON array
+of objects), validated one at a time with a single ReviewIngestSerializer,
+and inserted with bulk_create in committed batches. Product ids are checked
+once per batch rather than once per row. Only one batch of rows is
+held in memory at a time, whatever the size of the body.
+
+bulk_create skips the Review signal handlers, so each batch bumps the
+ReviewStat and ReviewDailyStat counters, the review counters of linked
+products and the response-cache generations itself. The search
+index is maintained by database triggers and needs nothing.
+"""
+import codecs
+import json
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ParseError, ValidationError
+
+from kikuu_sentiment.cache import bump_generation_on_commit
+from store.models import Product
+from .models import Review, ReviewDailyStat, ReviewStat
+from .sentiment import classify_batch
+from .serializers import ReviewCreateSerializer, ReviewIngestSerializer
+
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-seq')
+DEFAULT_BATCH_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = _WHITESPACE + ',]'
+
+
+def iter_ndjson(stream):
+    """
+    Yield one decoded value per non-blank line. A malformed line yields a
+    ParseError in its place so the remaining lines are still ingested.
+    """
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            yield ParseError(f"Malformed JSON: {exc}")
+
+
+def iter_json_array(stream, chunk_size=CHUNK_SIZE):
+    """
+    Yield the elements of a top-level JSON array, reading chunk_size bytes at
+    a time. Raises ParseError when the body is not a well-formed array.
+    """
+    decode = codecs.getincrementaldecoder('utf-8')().decode
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+    # start -> first -> (element) -> after -> ',' -> element ... -> done
+    state = 'start'
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+
+        if pos == len(buffer):
+            if eof:
+                if state != 'done':
+                    raise ParseError("Unexpected end of JSON array.")
+                return
+            buffer, pos, eof = _fill(stream, decode, buffer, pos, chunk_size)
+            continue
+
+        char = buffer[pos]
+        if state == 'done':
+            raise ParseError("Unexpected data after JSON array.")
+        if state == 'start':
+            if char != '[':
+                raise ParseError("Expected a JSON array.")
+            pos += 1
+            state = 'first'
+        elif char == ']' and state in ('first', 'after'):
+            pos += 1
+            state = 'done'
+        elif state == 'after':
+            if char != ',':
+                raise ParseError("Expected ',' or ']' in JSON array.")
+            pos += 1
+            state = 'element'
+        else:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as exc:
+                if eof:
+                    raise ParseError(f"Malformed JSON: {exc}")
+                buffer, pos, eof = _fill(stream, decode, buffer, pos, chunk_size)
+                continue
+            if not eof and (end == len(buffer) or buffer[end] not in _DELIMITERS):
+                # A bare number may continue in the next chunk ("12." + "5")
+                buffer, pos, eof = _fill(stream, decode, buffer, pos, chunk_size)
+                continue
+            pos = end
+            state = 'after'
+            yield value
+
+
+def _fill(stream, decode, buffer, pos, chunk_size):
+    chunk = stream.read(chunk_size)
+    try:
+        text = decode(chunk, final=not chunk)
+    except UnicodeDecodeError as exc:
+        raise ParseError(f"Request body is not valid UTF-8: {exc}")
+    # Drop what has been consumed so the buffer never holds more than one element
+    return buffer[pos:] + text, 0, not chunk
+
+
+def ingest_reviews(rows, user, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Validate rows and insert the valid ones as reviews by user.
+
+    Returns {'received', 'created', 'errors'}; errors lists the zero-based
+    index and validation errors of every rejected row. If the body itself is
+    malformed, rows read so far are still committed and 'detail' describes
+    the problem.
+    """
+    serializer = ReviewIngestSerializer()
+    product_field = ReviewCreateSerializer().fields['product']
+    result = {'received': 0, 'created': 0, 'errors': []}
+    pending = []
+
+    try:
+        for index, row in enumerate(rows):
+            result['received'] += 1
+            if isinstance(row, ParseError):
+                result['errors'].append({'index': index, 'errors': [row.detail]})
+                continue
+            errors = {}
+            try:
+                product_id = _product_id(product_field, row.get('product') if isinstance(row, dict) else None)
+            except ValidationError as exc:
+                errors['product'] = exc.detail
+            try:
+                data = serializer.run_validation(row)
+            except ValidationError as exc:
+                errors = {**exc.detail, **errors}
+            if errors:
+                result['errors'].append({'index': index, 'errors': errors})
+                continue
+            pending.append((index, data, product_id))
+            if len(pending) >= batch_size:
+                result['created'] += _insert_batch(_link_products(pending, product_field, result), user)
+                pending = []
+    except ParseError as exc:
+        result['detail'] = exc.detail
+
+    if pending:
+        result['created'] += _insert_batch(_link_products(pending, product_field, result), user)
+    # Unknown products are only found when their batch is flushed
+    result['errors'].sort(key=lambda error: error['index'])
+    return result
+
+
+def _product_id(field, value):
+    """
+    Return the product pk named by a row, or None. Raises the product
+    field's ValidationError for values that cannot be a pk.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    field.fail('incorrect_type', data_type=type(value).__name__)
+
+
+def _link_products(pending, field, result):
+    """
+    Check the batch's product ids with one query. Returns the validated rows
+    whose product exists; the others are reported in result['errors'].
+    """
+    ids = {product_id for _, _, product_id in pending if product_id is not None}
+    products = Product.objects.only('pk').in_bulk(ids) if ids else {}
+    rows = []
+    for index, data, product_id in pending:
+        if product_id is not None:
+            if product_id not in products:
+                try:
+                    field.fail('does_not_exist', pk_value=product_id)
+                except ValidationError as exc:
+                    result['errors'].append({'index': index, 'errors': {'product': exc.detail}})
+                continue
+            data['product_id'] = product_id
+        rows.append(data)
+    return rows
+
+
+def _insert_batch(rows, user):
+    if not rows:
+        return 0
+    sentiments = classify_batch([row['comment'] for row in rows])
+    reviews = [
+        Review(user=user, username=user.username, user_role=user.role, sentiment=sentiment, **row)
+        for row, sentiment in zip(rows, sentiments)
+    ]
+    stat_deltas = Counter((review.sentiment, review.user_role, review.rating) for review in reviews)
+    with transaction.atomic():
+        Review.objects.bulk_create(reviews)
+        for key, delta in stat_deltas.items():
+            ReviewStat.objects.bump(*key, delta=delta)
+        # created_at is only set by bulk_create; a batch may straddle midnight
+        daily_deltas = Counter(
+            (timezone.localdate(review.created_at), review.sentiment, review.user_role, review.rating)
+            for review in reviews
+        )
+        for key, delta in daily_deltas.items():
+            ReviewDailyStat.objects.bump(*key, delta=delta)
+        product_deltas = defaultdict(Counter)
+        for review in reviews:
+            if review.product_id is not None:
+                product_deltas[review.product_id].update(
+                    {'count': 1, 'rating_sum': review.rating, review.sentiment: 1}
+                )
+        for product_id, deltas in product_deltas.items():
+            Product.objects.filter(pk=product_id).bump_review_counters(**deltas)
+        bump_generation_on_commit(Review)
+        if product_deltas:
+            bump_generation_on_commit(Product)
+    return len(reviews)
@@ -0,0 +1,67 @@
+"""
+Recompute the daily review rollups (ReviewDailyStat) from the Review table.
+
+Days are processed in windows of --days-per-batch, each in its own
+transaction, so a backfill over years of reviews never holds one long lock
+and can be re-run over any range to repair drift.
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from kikuu.models import Review, ReviewDailyStat
+
+
+def _parse_day(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}; use YYYY-MM-DD.")
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily review rollups used by the trends endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=_parse_day,
+                            help="First day to rebuild, YYYY-MM-DD (default: the oldest review).")
+        parser.add_argument('--end', type=_parse_day,
+                            help="Last day to rebuild, YYYY-MM-DD (default: the newest review).")
+        parser.add_argument('--days-per-batch', type=int, default=31,
+                            help="Days rebuilt per transaction (default: 31).")
+
+    def handle(self, *args, **options):
+        if options['days_per_batch'] < 1:
+            raise CommandError("--days-per-batch must be at least 1.")
+        start, end = options['start'], options['end']
+        if start is None or end is None:
+            # Cover every review and every existing rollup row, so stale rows
+            # outside the reviews' range are cleared as well
+            reviews = Review.objects.aggregate(first=Min('created_at'), last=Max('created_at'))
+            rollups = ReviewDailyStat.objects.aggregate(first=Min('day'), last=Max('day'))
+            days = [rollups['first'], rollups['last']]
+            if reviews['first'] is not None:
+                days += [timezone.localdate(reviews['first']), timezone.localdate(reviews['last'])]
+            days = [day for day in days if day is not None]
+            if not days:
+                self.stdout.write(self.style.SUCCESS("No reviews to roll up."))
+                return
+            start = start or min(days)
+            end = end or max(days)
+        if start > end:
+            raise CommandError("--start must not be after --end.")
+
+        step = timedelta(days=options['days_per_batch'])
+        rows = 0
+        window_start = start
+        while window_start <= end:
+            window_end = min(window_start + step - timedelta(days=1), end)
+            rows += ReviewDailyStat.objects.rebuild(window_start, window_end)
+            self.stdout.write(f"Rolled up {window_start} to {window_end}.")
+            window_start = window_end + timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {rows} rollup rows for {start} to {end}."
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from kikuu.models import Review
+from kikuu.serializers import REVIEW_EXPORT_COLUMNS
+from kikuu_sentiment.export import EXPORT_FORMATS, iter_export
+
+
+class Command(BaseCommand):
+    help = "Stream reviews to CSV or NDJSON using the same filters as the review list endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', dest='export_format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', help="File to write (default: stdout).")
+        parser.add_argument('--user-role', choices=['buyer', 'seller'])
+        parser.add_argument('--sentiment', choices=['positive', 'negative', 'neutral'])
+        parser.add_argument('--rating', type=int, choices=range(1, 6))
+        parser.add_argument('--product', type=int, help="Only reviews of this product id.")
+        parser.add_argument('--search')
+
+    def handle(self, *args, **options):
+        queryset = Review.objects.apply_filters({
+            'user_role': options['user_role'],
+            'sentiment': options['sentiment'],
+            'rating': options['rating'],
+            'product': options['product'],
+            'search': options['search'],
+        })
+        chunks = iter_export(queryset, REVIEW_EXPORT_COLUMNS, options['export_format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as handle:
+                handle.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,99 @@
+"""
+Fetch external review pages and import the reviews they contain.
+
+URLs come from the command line, a file (one per line) and/or, with
+--refresh-existing, every source_url already stored on a review. Fetching is
+asynchronous; see kikuu.importer for the details.
+"""
+import asyncio
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import URLValidator
+from django.contrib.auth import get_user_model
+
+from kikuu.importer import ReviewImporter
+from kikuu.models import Review, ReviewSource
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Fetch external review pages (Review.source_url) and import their reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='*', help="Review page URLs to import.")
+        parser.add_argument('--file', help="File with one URL per line.")
+        parser.add_argument('--refresh-existing', action='store_true',
+                            help="Also re-fetch every source_url already stored on a review.")
+        parser.add_argument('--user', required=True,
+                            help="Email of the account the imported reviews are attributed to.")
+        parser.add_argument('--concurrency', type=int, default=100,
+                            help="Maximum fetches in flight (default: 100).")
+        parser.add_argument('--per-host-rate', type=float, default=2.0,
+                            help="Maximum requests per second to one host; 0 disables (default: 2).")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Reviews written per transaction (default: 500).")
+        parser.add_argument('--timeout', type=float, default=15.0,
+                            help="Per-request timeout in seconds (default: 15).")
+        parser.add_argument('--refresh-after', type=float, default=24.0,
+                            help="Skip pages fetched less than this many hours ago; 0 always fetches (default: 24).")
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['user']}.")
+        if getattr(user, 'role', None) not in ('seller', 'buyer'):
+            raise CommandError("Imported reviews must belong to a seller or buyer account.")
+
+        urls = list(options['urls'])
+        if options['file']:
+            with open(options['file']) as handle:
+                urls.extend(line.strip() for line in handle if line.strip())
+        if options['refresh_existing']:
+            urls.extend(
+                Review.objects.exclude(source_url__isnull=True).exclude(source_url='')
+                .order_by().values_list('source_url', flat=True).distinct()
+            )
+
+        valid_urls = self._valid_urls(urls)
+        if not valid_urls:
+            raise CommandError("No URLs to import.")
+
+        importer = ReviewImporter(
+            user,
+            concurrency=options['concurrency'],
+            per_host_rate=options['per_host_rate'],
+            batch_size=options['batch_size'],
+            timeout=options['timeout'],
+            refresh_after=timedelta(hours=options['refresh_after']),
+        )
+        stats = asyncio.run(importer.run(valid_urls))
+
+        self.stdout.write(
+            f"Pages: {stats['fetched']} fetched, {stats['not_modified']} not modified, "
+            f"{stats['failed']} failed, {stats['skipped_recent']} fetched recently, "
+            f"{stats['duplicates']} duplicate URLs."
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Reviews: {stats['reviews_created']} imported, {stats['reviews_existing']} already present, "
+            f"{stats['reviews_invalid']} invalid."
+        ))
+
+    def _valid_urls(self, urls):
+        validate = URLValidator(schemes=['http', 'https'])
+        max_length = ReviewSource._meta.get_field('url').max_length
+        valid = []
+        for url in urls:
+            try:
+                validate(url)
+            except ValidationError:
+                self.stderr.write(f"Skipping invalid URL: {url}")
+                continue
+            if len(url) > max_length:
+                self.stderr.write(f"Skipping URL longer than {max_length} characters: {url}")
+                continue
+            valid.append(url)
+        return valid
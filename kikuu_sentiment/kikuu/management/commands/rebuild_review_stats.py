@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from kikuu.models import ReviewDailyStat, ReviewStat
+from kikuu_sentiment.cache import bump_generation
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = "Rebuild the pre-aggregated review statistics and product review counters from the Review table."
+
+    def handle(self, *args, **options):
+        ReviewStat.objects.rebuild()
+        ReviewDailyStat.objects.rebuild()
+        Product.objects.rebuild_review_counters()
+        bump_generation(Product)
+        total = sum(ReviewStat.objects.values_list('count', flat=True))
+        self.stdout.write(self.style.SUCCESS(f"Review stats rebuilt from {total} reviews."))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from kikuu.search import install_search_index
+
+
+class Command(BaseCommand):
+    help = "Recreate the review full-text search index and repopulate it from the Review table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help="Database alias to rebuild (default: 'default').")
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        install_search_index(connection)
+        self.stdout.write(self.style.SUCCESS(
+            f"Review search index rebuilt on '{options['database']}' ({connection.vendor})."
+        ))
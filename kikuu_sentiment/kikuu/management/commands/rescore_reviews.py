@@ -0,0 +1,132 @@
+"""
+Recompute Review.sentiment for the whole table.
+
+Reviews are read in primary-key ranges, classified in a process pool and
+written back with bulk_update, one committed transaction per range. The last
+committed primary key is stored in a checkpoint file so an interrupted run
+can be resumed; a run that finishes deletes it, so the next one starts over.
+"""
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from kikuu.models import Review, ReviewDailyStat, ReviewStat
+from kikuu.sentiment import classify_batch
+from kikuu_sentiment.cache import bump_generation
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = "Recompute the sentiment of every review using the current sentiment engine."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help="Primary-key range processed per batch (default: 2000).")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Number of worker processes (default: CPU count).")
+        parser.add_argument('--checkpoint', default='rescore_reviews.checkpoint',
+                            help="File storing the last committed primary key.")
+        parser.add_argument('--reset', action='store_true',
+                            help="Ignore any existing checkpoint and start from the beginning.")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        workers = max(1, options['workers'])
+        checkpoint = options['checkpoint']
+
+        if options['reset'] and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        start_pk = self._load_checkpoint(checkpoint)
+        max_pk = Review.objects.aggregate(max_pk=Max('pk'))['max_pk'] or 0
+        if start_pk:
+            self.stdout.write(f"Resuming after review #{start_pk}")
+
+        self.scanned = 0
+        self.updated = 0
+        self.started = time.monotonic()
+        self.last_report = self.started
+
+        queryset = Review.objects.order_by('pk').values_list('pk', 'comment', 'sentiment')
+        # Keep a bounded number of batches in flight so memory stays flat
+        max_pending = workers * 2
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for low in range(start_pk, max_pk, batch_size):
+                high = low + batch_size
+                rows = list(
+                    queryset.filter(pk__gt=low, pk__lte=high).iterator(chunk_size=batch_size)
+                )
+                if not rows:
+                    continue
+                future = executor.submit(classify_batch, [row[1] for row in rows])
+                pending.append((high, rows, future))
+                while len(pending) >= max_pending:
+                    self._write_batch(checkpoint, *pending.popleft())
+            while pending:
+                self._write_batch(checkpoint, *pending.popleft())
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        # bulk_update bypasses the Review signals, so refresh the counters once.
+        # A resumed run also covers batches committed before the interruption.
+        if start_pk or self.updated:
+            ReviewStat.objects.rebuild()
+            ReviewDailyStat.objects.rebuild()
+            Product.objects.rebuild_review_counters()
+            bump_generation(Product)
+            bump_generation(Review)
+        self._report(final=True)
+
+    def _write_batch(self, checkpoint, high, rows, future):
+        labels = future.result()
+        # bulk_update skips auto_now; updated_at versions the review ETags
+        now = timezone.now()
+        changed = [
+            Review(pk=pk, sentiment=label, updated_at=now)
+            for (pk, _, current), label in zip(rows, labels)
+            if label != current
+        ]
+        with transaction.atomic():
+            Review.objects.bulk_update(changed, ['sentiment', 'updated_at'], batch_size=500)
+        self._save_checkpoint(checkpoint, high)
+
+        self.scanned += len(rows)
+        self.updated += len(changed)
+        if time.monotonic() - self.last_report >= 1:
+            self._report()
+
+    def _report(self, final=False):
+        now = time.monotonic()
+        elapsed = max(now - self.started, 1e-9)
+        self.last_report = now
+        message = (
+            f"{self.scanned} reviews scanned, {self.updated} updated "
+            f"({self.scanned / elapsed:.0f} rows/sec)"
+        )
+        if final:
+            self.stdout.write(self.style.SUCCESS(f"Done: {message} in {elapsed:.1f}s"))
+        else:
+            self.stdout.write(message)
+
+    def _load_checkpoint(self, path):
+        try:
+            with open(path) as handle:
+                return int(json.load(handle)['last_pk'])
+        except (OSError, ValueError, KeyError):
+            return 0
+
+    def _save_checkpoint(self, path, last_pk):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as handle:
+            json.dump({'last_pk': last_pk}, handle)
+        os.replace(tmp_path, path)
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.7 on 2026-10-17 22:18
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_review_stats(apps, schema_editor):
+    Review = apps.get_model('kikuu', 'Review')
+    ReviewStat = apps.get_model('kikuu', 'ReviewStat')
+    rows = Review.objects.order_by().values('sentiment', 'user_role', 'rating').annotate(total=Count('id'))
+    ReviewStat.objects.bulk_create([
+        ReviewStat(sentiment=row['sentiment'], user_role=row['user_role'],
+                   rating=row['rating'], count=row['total'])
+        for row in rows
+    ])
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kikuu', '0003_alter_review_rating'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sentiment', models.CharField(choices=[('positive', 'Positive'), ('negative', 'Negative'), ('neutral', 'Neutral')], max_length=20)),
+                ('user_role', models.CharField(choices=[('buyer', 'Buyer'), ('seller', 'Seller')], max_length=10)),
+                ('rating', models.IntegerField()),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('sentiment', 'user_role', 'rating'), name='unique_review_stat_key')],
+            },
+        ),
+        migrations.RunPython(populate_review_stats, migrations.RunPython.noop),
+    ]
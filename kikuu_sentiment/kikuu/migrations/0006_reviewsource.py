@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-17 22:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kikuu', '0005_review_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewSource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(unique=True)),
+                ('etag', models.CharField(blank=True, max_length=255)),
+                ('last_modified', models.CharField(blank=True, help_text='HTTP-date as sent by the server', max_length=64)),
+                ('last_status', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('fetched_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
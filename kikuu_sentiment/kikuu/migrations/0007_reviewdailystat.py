@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-17 22:49
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def populate_review_daily_stats(apps, schema_editor):
+    Review = apps.get_model('kikuu', 'Review')
+    ReviewDailyStat = apps.get_model('kikuu', 'ReviewDailyStat')
+    rows = Review.objects.order_by().annotate(day=TruncDate('created_at')).values(
+        'day', 'sentiment', 'user_role', 'rating'
+    ).annotate(total=Count('id'))
+    ReviewDailyStat.objects.bulk_create([
+        ReviewDailyStat(day=row['day'], sentiment=row['sentiment'], user_role=row['user_role'],
+                        rating=row['rating'], count=row['total'])
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kikuu', '0006_reviewsource'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('sentiment', models.CharField(choices=[('positive', 'Positive'), ('negative', 'Negative'), ('neutral', 'Neutral')], max_length=20)),
+                ('user_role', models.CharField(choices=[('buyer', 'Buyer'), ('seller', 'Seller')], max_length=10)),
+                ('rating', models.IntegerField()),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'sentiment', 'user_role', 'rating'), name='unique_review_daily_stat_key')],
+            },
+        ),
+        migrations.RunPython(populate_review_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-17 22:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kikuu', '0007_reviewdailystat'),
+        ('store', '0004_product_review_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='product',
+            field=models.ForeignKey(blank=True, help_text='Product this review is about, if any', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviews', to='store.product'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['product', '-created_at', '-id'], name='kikuu_review_product_idx'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kikuu', '0008_review_product'),
+        ('store', '0004_product_review_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='review',
+            name='kikuu_revie_sentime_dd1d43_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='review',
+            name='kikuu_revie_user_ro_5109c3_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='review',
+            name='kikuu_revie_rating_607978_idx',
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user_role', '-created_at', '-id'], name='kikuu_review_role_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['sentiment', '-created_at', '-id'], name='kikuu_review_sentiment_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['rating', '-created_at', '-id'], name='kikuu_review_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user_role', 'sentiment', '-created_at', '-id'], name='kikuu_review_role_sent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user_role', 'rating', '-created_at', '-id'], name='kikuu_review_role_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['sentiment', 'rating', '-created_at', '-id'], name='kikuu_review_sent_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user_role', 'sentiment', 'rating', '-created_at', '-id'], name='kikuu_review_role_sent_rat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='kikuu_review_user_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kikuu', '0009_review_list_indexes'),
+        ('store', '0004_product_review_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['source_url'], name='kikuu_review_source_url_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kikuu', '0010_review_source_url_index'),
+        ('store', '0004_product_review_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='review',
+            name='kikuu_revie_created_4fb5e6_idx',
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['-created_at', '-id'], name='kikuu_review_created_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:42
+
+import kikuu.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('kikuu', '0011_review_created_index'),
+        ('store', '0004_product_review_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='review',
+            name='product',
+            field=models.ForeignKey(blank=True, help_text='Product this review is about, if any', null=True, on_delete=kikuu.models.SET_NULL_AND_TOUCH, related_name='reviews', to='store.product'),
+        ),
+    ]
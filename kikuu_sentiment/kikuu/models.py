@@ -1,9 +1,145 @@
-from django.db import models
+from datetime import datetime, time, timedelta
+
+from django.db import models, transaction, IntegrityError
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+from .search import search_reviews
+
 User = get_user_model()
 
+
+def SET_NULL_AND_TOUCH(collector, field, sub_objs, using):
+    """
+    SET_NULL that also bumps updated_at, which the review ETags are built
+    from. The deletion collector writes both in one UPDATE per batch.
+    """
+    collector.add_field_update(field, None, sub_objs)
+    collector.add_field_update(field.model._meta.get_field('updated_at'), timezone.now(), sub_objs)
+
+
+class ReviewQuerySet(models.QuerySet):
+    def apply_filters(self, params):
+        """
+        Apply the public review list filters (user_role, sentiment, rating,
+        product, search) from a QueryDict or dict, ordered like the list views.
+        """
+        queryset = self
+
+        # Filter by user role if specified
+        user_role = params.get('user_role', None)
+        if user_role in ['seller', 'buyer']:
+            queryset = queryset.filter(user_role=user_role)
+
+        # Filter by sentiment if specified
+        sentiment = params.get('sentiment', None)
+        if sentiment in ['positive', 'negative', 'neutral']:
+            queryset = queryset.filter(sentiment=sentiment)
+
+        # Filter by rating if specified
+        rating = str(params.get('rating', None) or '')
+        if rating.isdigit() and 1 <= int(rating) <= 5:
+            queryset = queryset.filter(rating=int(rating))
+
+        # Filter by product if specified
+        product = str(params.get('product', None) or '')
+        if product.isdigit():
+            queryset = queryset.filter(product_id=int(product))
+
+        # Full-text search in comments and usernames, ranked by relevance
+        search = params.get('search', None)
+        if search:
+            return search_reviews(queryset, search)
+
+        return queryset.order_by('-created_at', '-id')
+
+class ReviewStatManager(models.Manager):
+    def bump(self, sentiment, user_role, rating, delta):
+        """
+        Atomically add delta to the counter for one (sentiment, role, rating) key.
+        """
+        key = {'sentiment': sentiment, 'user_role': user_role, 'rating': rating}
+        if self.filter(**key).update(count=F('count') + delta):
+            return
+        try:
+            with transaction.atomic():
+                self.create(count=delta, **key)
+        except IntegrityError:
+            # Another writer created the row first
+            self.filter(**key).update(count=F('count') + delta)
+
+    def rebuild(self):
+        """
+        Recompute every counter from the Review table.
+        """
+        rows = Review.objects.order_by().values('sentiment', 'user_role', 'rating').annotate(
+            total=Count('id')
+        )
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create([
+                ReviewStat(
+                    sentiment=row['sentiment'],
+                    user_role=row['user_role'],
+                    rating=row['rating'],
+                    count=row['total'],
+                )
+                for row in rows
+            ])
+
+class ReviewDailyStatManager(models.Manager):
+    def bump(self, day, sentiment, user_role, rating, delta):
+        """
+        Atomically add delta to the counter for one (day, sentiment, role, rating) key.
+        """
+        key = {'day': day, 'sentiment': sentiment, 'user_role': user_role, 'rating': rating}
+        if self.filter(**key).update(count=F('count') + delta):
+            return
+        try:
+            with transaction.atomic():
+                self.create(count=delta, **key)
+        except IntegrityError:
+            # Another writer created the row first
+            self.filter(**key).update(count=F('count') + delta)
+
+    def rebuild(self, start=None, end=None):
+        """
+        Recompute the counters for the days from start to end (inclusive,
+        either bound optional) from the Review table. Returns the number of
+        rows written.
+        """
+        reviews = Review.objects.order_by()
+        stale = self.all()
+        if start is not None:
+            reviews = reviews.filter(created_at__gte=_start_of_day(start))
+            stale = stale.filter(day__gte=start)
+        if end is not None:
+            reviews = reviews.filter(created_at__lt=_start_of_day(end + timedelta(days=1)))
+            stale = stale.filter(day__lte=end)
+        rows = reviews.annotate(day=TruncDate('created_at')).values(
+            'day', 'sentiment', 'user_role', 'rating'
+        ).annotate(total=Count('id'))
+        with transaction.atomic():
+            stale.delete()
+            created = self.bulk_create([
+                ReviewDailyStat(
+                    day=row['day'],
+                    sentiment=row['sentiment'],
+                    user_role=row['user_role'],
+                    rating=row['rating'],
+                    count=row['total'],
+                )
+                for row in rows
+            ], batch_size=1000)
+        return len(created)
+
+def _start_of_day(day):
+    # Days are calendar days in the current time zone, matching TruncDate
+    return timezone.make_aware(datetime.combine(day, time.min))
+
 class Review(models.Model):
     SENTIMENT_CHOICES = [
         ('positive', 'Positive'),
@@ -17,6 +153,10 @@ class Review(models.Model):
     ]
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reviews')
+    product = models.ForeignKey(
+        'store.Product', on_delete=SET_NULL_AND_TOUCH, null=True, blank=True, related_name='reviews',
+        help_text="Product this review is about, if any"
+    )
     username = models.CharField(max_length=100)
     user_role = models.CharField(max_length=10, choices=USER_ROLE_CHOICES, default='buyer')
     comment = models.TextField()
@@ -31,18 +171,47 @@ class Review(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ReviewQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        # Every list filter combination is an equality prefix followed by the
+        # list order, so filtered pages are read straight off one index with
+        # no sort step. kikuu/test_query_plans.py checks the plans.
         indexes = [
-            models.Index(fields=['sentiment']),
-            models.Index(fields=['user_role']),
-            models.Index(fields=['rating']),
-            models.Index(fields=['created_at']),
+            models.Index(fields=['-created_at', '-id'], name='kikuu_review_created_idx'),
+            models.Index(fields=['user_role', '-created_at', '-id'], name='kikuu_review_role_idx'),
+            models.Index(fields=['sentiment', '-created_at', '-id'], name='kikuu_review_sentiment_idx'),
+            models.Index(fields=['rating', '-created_at', '-id'], name='kikuu_review_rating_idx'),
+            models.Index(
+                fields=['user_role', 'sentiment', '-created_at', '-id'], name='kikuu_review_role_sent_idx'
+            ),
+            models.Index(
+                fields=['user_role', 'rating', '-created_at', '-id'], name='kikuu_review_role_rating_idx'
+            ),
+            models.Index(
+                fields=['sentiment', 'rating', '-created_at', '-id'], name='kikuu_review_sent_rating_idx'
+            ),
+            models.Index(
+                fields=['user_role', 'sentiment', 'rating', '-created_at', '-id'], name='kikuu_review_role_sent_rat_idx'
+            ),
+            models.Index(fields=['user', '-created_at', '-id'], name='kikuu_review_user_idx'),
+            # A product's reviews, newest first
+            models.Index(fields=['product', '-created_at', '-id'], name='kikuu_review_product_idx'),
+            # Importer dedup looks up each batch's pages by URL
+            models.Index(fields=['source_url'], name='kikuu_review_source_url_idx'),
         ]
 
     def __str__(self):
         return f"{self.username} ({self.user_role}) - {self.sentiment} - {self.rating}★"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded values so signal handlers can tell what changed
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def save(self, *args, **kwargs):
         # Automatically set user_role based on the user's role
         if self.user and hasattr(self.user, 'role'):
@@ -51,3 +220,67 @@ class Review(models.Model):
         if self.user and not self.username:
             self.username = self.user.username
         super().save(*args, **kwargs)
+
+
+class ReviewStat(models.Model):
+    """
+    Pre-aggregated review counters keyed by sentiment, role and rating.
+    Kept current by the Review signal handlers in kikuu/signals.py.
+    """
+    sentiment = models.CharField(max_length=20, choices=Review.SENTIMENT_CHOICES)
+    user_role = models.CharField(max_length=10, choices=Review.USER_ROLE_CHOICES)
+    rating = models.IntegerField()
+    count = models.BigIntegerField(default=0)
+
+    objects = ReviewStatManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['sentiment', 'user_role', 'rating'], name='unique_review_stat_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.sentiment}/{self.user_role}/{self.rating}★: {self.count}"
+
+
+class ReviewSource(models.Model):
+    """
+    An external review page fetched by `manage.py import_reviews`, with the
+    validators needed to re-fetch it conditionally.
+    """
+    url = models.URLField(unique=True)
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True, help_text="HTTP-date as sent by the server")
+    last_status = models.PositiveSmallIntegerField(null=True, blank=True)
+    fetched_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.url
+
+
+class ReviewDailyStat(models.Model):
+    """
+    Per-day review counters keyed by sentiment, role and rating, for trend
+    queries. Kept current by the Review signal handlers in kikuu/signals.py;
+    `manage.py backfill_review_rollups` recomputes them.
+    """
+    day = models.DateField()
+    sentiment = models.CharField(max_length=20, choices=Review.SENTIMENT_CHOICES)
+    user_role = models.CharField(max_length=10, choices=Review.USER_ROLE_CHOICES)
+    rating = models.IntegerField()
+    count = models.BigIntegerField(default=0)
+
+    objects = ReviewDailyStatManager()
+
+    class Meta:
+        constraints = [
+            # Leads with day, so it also serves date-range scans
+            models.UniqueConstraint(
+                fields=['day', 'sentiment', 'user_role', 'rating'], name='unique_review_daily_stat_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.sentiment}/{self.user_role}/{self.rating}★: {self.count}"
@@ -0,0 +1,135 @@
+"""
+Full-text search over review comments and usernames.
+
+SQLite uses an external-content FTS5 table kept in sync by triggers. PostgreSQL
+uses a generated tsvector column with a GIN index. Both are maintained by the
+database itself, so every write path (ORM saves, bulk operations, raw SQL)
+keeps the index current. Other backends fall back to icontains filtering.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+REVIEW_TABLE = 'kikuu_review'
+FTS_TABLE = 'kikuu_review_fts'
+SEARCH_VECTOR_COLUMN = 'search_vector'
+SEARCH_VECTOR_INDEX = 'kikuu_review_search_vector_idx'
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+SQLITE_INSTALL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        comment, username,
+        content='{REVIEW_TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {REVIEW_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, comment, username)
+        VALUES (new.id, new.comment, new.username);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {REVIEW_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, comment, username)
+        VALUES ('delete', old.id, old.comment, old.username);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF comment, username ON {REVIEW_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, comment, username)
+        VALUES ('delete', old.id, old.comment, old.username);
+        INSERT INTO {FTS_TABLE}(rowid, comment, username)
+        VALUES (new.id, new.comment, new.username);
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+SQLITE_UNINSTALL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+POSTGRES_INSTALL = [
+    f"""
+    ALTER TABLE {REVIEW_TABLE} ADD COLUMN IF NOT EXISTS {SEARCH_VECTOR_COLUMN} tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(comment, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(username, '')), 'B')
+    ) STORED
+    """,
+    f"""
+    CREATE INDEX IF NOT EXISTS {SEARCH_VECTOR_INDEX}
+    ON {REVIEW_TABLE} USING GIN ({SEARCH_VECTOR_COLUMN})
+    """,
+]
+
+POSTGRES_UNINSTALL = [
+    f"DROP INDEX IF EXISTS {SEARCH_VECTOR_INDEX}",
+    f"ALTER TABLE {REVIEW_TABLE} DROP COLUMN IF EXISTS {SEARCH_VECTOR_COLUMN}",
+]
+
+
+def _run(connection, statements):
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def install_search_index(connection):
+    """
+    Create (or repair) the search index for the given connection and
+    populate it from the current rows. Safe to run repeatedly.
+    """
+    if connection.vendor == 'sqlite':
+        _run(connection, SQLITE_INSTALL)
+    elif connection.vendor == 'postgresql':
+        _run(connection, POSTGRES_INSTALL)
+
+
+def uninstall_search_index(connection):
+    if connection.vendor == 'sqlite':
+        _run(connection, SQLITE_UNINSTALL)
+    elif connection.vendor == 'postgresql':
+        _run(connection, POSTGRES_UNINSTALL)
+
+
+def search_reviews(queryset, query):
+    """
+    Restrict a Review queryset to rows matching the search query, ordered by
+    relevance (most relevant first, newest first among ties).
+    """
+    terms = _TERM_RE.findall(query)
+    if not terms:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        # Every term must match; each term also matches as a prefix
+        match = ' '.join('"{}"*'.format(term) for term in terms)
+        return queryset.extra(
+            select={'search_rank': f'{FTS_TABLE}.rank'},
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = {REVIEW_TABLE}.id', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+        ).order_by('search_rank', '-created_at', '-id')
+
+    if vendor == 'postgresql':
+        tsquery = ' & '.join(f'{term}:*' for term in terms)
+        vector = f'{REVIEW_TABLE}.{SEARCH_VECTOR_COLUMN}'
+        return queryset.extra(
+            select={'search_rank': f"ts_rank({vector}, to_tsquery('english', %s))"},
+            select_params=[tsquery],
+            where=[f"{vector} @@ to_tsquery('english', %s)"],
+            params=[tsquery],
+        ).order_by('-search_rank', '-created_at', '-id')
+
+    return queryset.filter(
+        Q(comment__icontains=query) | Q(username__icontains=query)
+    ).order_by('-created_at', '-id')
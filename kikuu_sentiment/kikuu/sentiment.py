@@ -0,0 +1,137 @@
+"""
+Lexicon-based sentiment engine for review comments.
+
+The lexicon is compiled once at import time into a plain dict so that scoring
+a comment is a single regex pass plus dictionary lookups. Batch helpers bind
+everything to locals and score a whole list in one loop, which keeps throughput
+well above thousands of comments per second on a single core.
+"""
+import math
+import re
+
+POSITIVE = 'positive'
+NEGATIVE = 'negative'
+NEUTRAL = 'neutral'
+
+# Word -> valence weight. Tuned for e-commerce reviews (delivery, sellers, products).
+LEXICON = {
+    # Positive
+    'amazing': 3.0, 'awesome': 3.0, 'excellent': 3.0, 'outstanding': 3.0,
+    'perfect': 3.0, 'fantastic': 3.0, 'superb': 3.0, 'love': 3.0, 'loved': 3.0,
+    'best': 2.5, 'wonderful': 2.5, 'brilliant': 2.5, 'great': 2.0, 'happy': 2.0,
+    'recommend': 2.0, 'recommended': 2.0, 'satisfied': 2.0, 'reliable': 2.0,
+    'fast': 1.5, 'quick': 1.5, 'quickly': 1.5, 'good': 1.5, 'nice': 1.5,
+    'easy': 1.5, 'helpful': 1.5, 'friendly': 1.5, 'quality': 1.0, 'affordable': 1.5,
+    'cheap': 1.0, 'genuine': 1.5, 'authentic': 1.5, 'smooth': 1.5, 'works': 1.0,
+    'worth': 1.5, 'like': 1.0, 'liked': 1.0, 'thanks': 1.0, 'thank': 1.0,
+    'fine': 0.5, 'ok': 0.5, 'okay': 0.5, 'decent': 1.0, 'pleased': 2.0,
+    'beautiful': 2.0, 'comfortable': 1.5, 'durable': 1.5, 'efficient': 1.5,
+    'professional': 1.5, 'secure': 1.0, 'safe': 1.0, 'convenient': 1.5,
+    # Negative
+    'terrible': -3.0, 'horrible': -3.0, 'awful': -3.0, 'worst': -3.0,
+    'scam': -3.0, 'fraud': -3.0, 'fake': -2.5, 'hate': -3.0, 'hated': -3.0,
+    'useless': -2.5, 'disappointed': -2.0, 'disappointing': -2.0, 'bad': -2.0,
+    'poor': -2.0, 'broken': -2.0, 'damaged': -2.0, 'defective': -2.0,
+    'rude': -2.0, 'slow': -1.5, 'late': -1.5, 'delayed': -1.5, 'delay': -1.5,
+    'expensive': -1.0, 'overpriced': -2.0, 'wrong': -1.5, 'missing': -1.5,
+    'problem': -1.5, 'problems': -1.5, 'issue': -1.0,
+    'issues': -1.0, 'refund': -1.0, 'return': -0.5, 'cancelled': -1.0,
+    'canceled': -1.0, 'unhappy': -2.0, 'unreliable': -2.0, 'difficult': -1.5,
+    'complicated': -1.0, 'waste': -2.5, 'cheaply': -1.0, 'flimsy': -1.5,
+    'lost': -1.5, 'stolen': -2.5, 'annoying': -1.5, 'confusing': -1.5,
+    'unresponsive': -2.0, 'ignored': -1.5, 'fail': -2.0, 'failed': -2.0,
+}
+
+# Words that flip the polarity of the next few scored tokens.
+NEGATORS = frozenset([
+    'not', 'no', 'nor', 'never', 'none', 'nothing', 'neither', 'without',
+    'hardly', 'barely', 'cannot', 'cant', 'dont', 'doesnt', 'didnt', 'isnt',
+    'wasnt', 'arent', 'werent', 'wont', 'wouldnt', 'shouldnt', 'couldnt',
+])
+
+# Multipliers applied to the next scored token.
+INTENSIFIERS = {
+    'very': 1.5, 'really': 1.5, 'extremely': 2.0, 'so': 1.3, 'super': 1.5,
+    'totally': 1.5, 'absolutely': 1.8, 'highly': 1.5, 'too': 1.3,
+    'slightly': 0.5, 'somewhat': 0.6, 'bit': 0.6,
+}
+
+NEGATION_WINDOW = 3
+NEGATION_FACTOR = -0.75
+NORMALIZATION_ALPHA = 15.0
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+
+_TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+
+def _raw_score(text, lexicon=LEXICON, negators=NEGATORS, intensifiers=INTENSIFIERS,
+               findall=_TOKEN_RE.findall):
+    total = 0.0
+    negate_for = 0
+    boost = 1.0
+    for token in findall(text.lower()):
+        if "'" in token:
+            token = token.replace("'", '')
+        if token in negators:
+            negate_for = NEGATION_WINDOW
+            continue
+        multiplier = intensifiers.get(token)
+        if multiplier is not None:
+            boost *= multiplier
+            continue
+        weight = lexicon.get(token)
+        if weight is not None:
+            weight *= boost
+            if negate_for:
+                weight *= NEGATION_FACTOR
+            total += weight
+            boost = 1.0
+        if negate_for:
+            negate_for -= 1
+    return total
+
+
+def _normalize(total):
+    return total / math.sqrt(total * total + NORMALIZATION_ALPHA)
+
+
+def _label(score):
+    if score >= POSITIVE_THRESHOLD:
+        return POSITIVE
+    if score <= NEGATIVE_THRESHOLD:
+        return NEGATIVE
+    return NEUTRAL
+
+
+def score_text(text):
+    """
+    Return a compound score in [-1, 1] for a single comment.
+    """
+    if not text:
+        return 0.0
+    return _normalize(_raw_score(text))
+
+
+def classify_text(text):
+    """
+    Return 'positive', 'negative' or 'neutral' for a single comment.
+    """
+    return _label(score_text(text))
+
+
+def score_batch(texts):
+    """
+    Score a list of comments in one pass. Returns a list of floats.
+    """
+    raw = _raw_score
+    normalize = _normalize
+    return [normalize(raw(text)) if text else 0.0 for text in texts]
+
+
+def classify_batch(texts):
+    """
+    Classify a list of comments in one pass. Returns a list of labels.
+    """
+    label = _label
+    return [label(score) for score in score_batch(texts)]
@@ -1,9 +1,29 @@
+from datetime import timedelta
+
 from rest_framework import serializers
 from .models import Review
+from .sentiment import classify_text
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 User = get_user_model()
 
+# (values_list lookup, column name) pairs for CSV / NDJSON exports
+REVIEW_EXPORT_COLUMNS = [
+    ('id', 'id'),
+    ('username', 'username'),
+    ('user__email', 'user_email'),
+    ('user_role', 'user_role'),
+    ('comment', 'comment'),
+    ('sentiment', 'sentiment'),
+    ('rating', 'rating'),
+    ('product_id', 'product'),
+    ('source_url', 'source_url'),
+    ('is_verified', 'is_verified'),
+    ('created_at', 'created_at'),
+    ('updated_at', 'updated_at'),
+]
+
 class ReviewSerializer(serializers.ModelSerializer):
     user_email = serializers.EmailField(source='user.email', read_only=True)
     user_role = serializers.CharField(read_only=True)
@@ -12,7 +32,7 @@ class ReviewSerializer(serializers.ModelSerializer):
         model = Review
         fields = [
             'id', 'username', 'user_email', 'user_role', 'comment',
-            'sentiment', 'rating', 'source_url', 'is_verified',
+            'sentiment', 'rating', 'product', 'source_url', 'is_verified',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'user_email', 'user_role', 'username', 'is_verified', 'created_at', 'updated_at']
@@ -31,31 +51,63 @@ class ReviewSerializer(serializers.ModelSerializer):
 class ReviewCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
-        fields = ['comment', 'sentiment', 'rating', 'source_url']
+        fields = ['comment', 'sentiment', 'rating', 'product', 'source_url']
+        read_only_fields = ['sentiment']
+
+    def create(self, validated_data):
+        # Sentiment is always derived server-side from the comment
+        validated_data['sentiment'] = classify_text(validated_data.get('comment', ''))
+        return super().create(validated_data)
 
     def validate_rating(self, value):
         if value < 1 or value > 5:
             raise serializers.ValidationError("Rating must be between 1 and 5.")
         return value
 
-    def validate_sentiment(self, value):
-        valid_sentiments = ['positive', 'negative', 'neutral']
-        if value not in valid_sentiments:
-            raise serializers.ValidationError(f"Sentiment must be one of: {', '.join(valid_sentiments)}")
-        return value
+class ReviewIngestSerializer(ReviewCreateSerializer):
+    """
+    ReviewCreateSerializer without the product field. Bulk ingest checks a
+    whole batch's product ids in one query instead of one per row.
+    """
+    class Meta(ReviewCreateSerializer.Meta):
+        fields = ['comment', 'sentiment', 'rating', 'source_url']
 
 class ReviewUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
-        fields = ['comment', 'sentiment', 'rating', 'source_url']
+        fields = ['comment', 'sentiment', 'rating', 'product', 'source_url']
+        read_only_fields = ['sentiment']
+
+    def update(self, instance, validated_data):
+        # Re-score only when the comment actually changes
+        if 'comment' in validated_data and validated_data['comment'] != instance.comment:
+            validated_data['sentiment'] = classify_text(validated_data['comment'])
+        return super().update(instance, validated_data)
 
     def validate_rating(self, value):
         if value < 1 or value > 5:
             raise serializers.ValidationError("Rating must be between 1 and 5.")
         return value
 
-    def validate_sentiment(self, value):
-        valid_sentiments = ['positive', 'negative', 'neutral']
-        if value not in valid_sentiments:
-            raise serializers.ValidationError(f"Sentiment must be one of: {', '.join(valid_sentiments)}")
-        return value
+class ReviewTrendQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of the trends endpoint. The range defaults to the last
+    30 days and is capped so one request cannot ask for decades of buckets.
+    """
+    MAX_DAYS = 3660
+    DEFAULT_DAYS = 30
+
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    bucket = serializers.ChoiceField(choices=['day', 'week', 'month'], default='day')
+    user_role = serializers.ChoiceField(choices=Review.USER_ROLE_CHOICES, required=False)
+    sentiment = serializers.ChoiceField(choices=Review.SENTIMENT_CHOICES, required=False)
+
+    def validate(self, data):
+        data.setdefault('end', timezone.localdate())
+        data.setdefault('start', data['end'] - timedelta(days=self.DEFAULT_DAYS - 1))
+        if data['start'] > data['end']:
+            raise serializers.ValidationError("start must not be after end.")
+        if (data['end'] - data['start']).days >= self.MAX_DAYS:
+            raise serializers.ValidationError(f"The range may cover at most {self.MAX_DAYS} days.")
+        return data
@@ -0,0 +1,68 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from kikuu_sentiment.cache import bump_generation_on_commit
+from store.models import Product
+from .models import Review, ReviewDailyStat, ReviewStat
+
+STAT_FIELDS = ('sentiment', 'user_role', 'rating')
+TRACKED_FIELDS = STAT_FIELDS + ('product_id',)
+
+
+def _tracked_values(values):
+    return tuple(values[field] for field in TRACKED_FIELDS)
+
+
+def _bump_stats(day, tracked, delta):
+    key = tracked[:len(STAT_FIELDS)]
+    ReviewStat.objects.bump(*key, delta=delta)
+    ReviewDailyStat.objects.bump(day, *key, delta=delta)
+
+
+def _bump_product(tracked, delta):
+    sentiment, _, rating, product_id = tracked
+    if product_id is None:
+        return
+    Product.objects.filter(pk=product_id).bump_review_counters(
+        count=delta, rating_sum=rating * delta, **{sentiment: delta}
+    )
+    bump_generation_on_commit(Product)
+
+
+@receiver(pre_save, sender=Review)
+def capture_previous_stat_key(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded is not None and all(field in loaded for field in TRACKED_FIELDS):
+        instance._previous_tracked = _tracked_values(loaded)
+        return
+    # Instance was not loaded from the database (or fields were deferred)
+    row = Review.objects.filter(pk=instance.pk).values(*TRACKED_FIELDS).first()
+    instance._previous_tracked = _tracked_values(row) if row else None
+
+
+@receiver(post_save, sender=Review)
+def update_review_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current = _tracked_values(instance.__dict__)
+    previous = None if created else getattr(instance, '_previous_tracked', None)
+    if previous is None or previous[:len(STAT_FIELDS)] != current[:len(STAT_FIELDS)]:
+        # created_at never changes, so both keys fall on the same day
+        day = timezone.localdate(instance.created_at)
+        if previous is not None:
+            _bump_stats(day, previous, -1)
+        _bump_stats(day, current, 1)
+    if previous != current:
+        if previous is not None:
+            _bump_product(previous, -1)
+        _bump_product(current, 1)
+    instance._loaded_values = {field: instance.__dict__[field] for field in TRACKED_FIELDS}
+
+
+@receiver(post_delete, sender=Review)
+def update_review_stats_on_delete(sender, instance, **kwargs):
+    tracked = _tracked_values(instance.__dict__)
+    _bump_stats(timezone.localdate(instance.created_at), tracked, -1)
+    _bump_product(tracked, -1)
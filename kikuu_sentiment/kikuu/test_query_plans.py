@@ -0,0 +1,103 @@
+"""
+Query-plan regression tests for the review list endpoints.
+
+Every filter combination the list views can produce is EXPLAINed, both as a
+page-number page and as a keyset page. A shape fails when the plan reads the
+whole review table or sorts rows in a temporary structure, which means no
+index matches its filters and order.
+
+On PostgreSQL sequential scans and explicit sorts are disabled for the
+session first. The planner then only picks them when no index can do the
+job, so the tiny test tables do not hide a missing index.
+"""
+import re
+from itertools import combinations
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import User
+from kikuu_sentiment.pagination import KeysetPagination
+from .models import Review
+from .views import ReviewListCreateAPIView, ReviewsByRoleAPIView, UserReviewsAPIView
+
+LIST_FILTERS = {'user_role': 'buyer', 'sentiment': 'positive', 'rating': '5'}
+PAGE_SIZE = 20
+
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN kikuu_review\b(?! USING (COVERING )?INDEX)')
+SQLITE_TEMP_SORT = re.compile(r'USE TEMP B-TREE')
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan on kikuu_review\b')
+POSTGRES_SORT = re.compile(r'(^|->)\s*(Incremental )?Sort\b', re.MULTILINE)
+
+
+def _filter_combinations(names):
+    for size in range(len(names) + 1):
+        for combo in combinations(names, size):
+            yield {name: LIST_FILTERS[name] for name in combo}
+
+
+class ReviewListQueryPlanTests(TestCase):
+    def setUp(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest("Query plans are only checked on SQLite and PostgreSQL.")
+        self.user = User.objects.create_user(
+            email='buyer@test.com', username='buyer', password='testpass123', role='buyer'
+        )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+                cursor.execute('SET enable_sort = off')
+
+    def view_queryset(self, view_class, params=None, **kwargs):
+        request = Request(APIRequestFactory().get('/', params or {}))
+        request.user = self.user
+        view = view_class(request=request, kwargs=kwargs, format_kwarg=None)
+        return view.get_queryset()
+
+    def shapes(self):
+        for params in _filter_combinations(list(LIST_FILTERS)):
+            yield f'reviews {sorted(params)}', self.view_queryset(ReviewListCreateAPIView, params)
+        for params in _filter_combinations(list(LIST_FILTERS)):
+            params['product'] = '1'
+            yield f'reviews {sorted(params)}', self.view_queryset(ReviewListCreateAPIView, params)
+        for params in _filter_combinations(['sentiment', 'rating']):
+            yield f'role {sorted(params)}', self.view_queryset(ReviewsByRoleAPIView, params, role='seller')
+        yield 'my-reviews', self.view_queryset(UserReviewsAPIView)
+
+    def assertIndexedPlan(self, queryset, shape):
+        plan = queryset.explain()
+        if connection.vendor == 'sqlite':
+            full_scan, sort = SQLITE_FULL_SCAN, SQLITE_TEMP_SORT
+        else:
+            full_scan, sort = POSTGRES_FULL_SCAN, POSTGRES_SORT
+        self.assertIsNone(full_scan.search(plan), f"{shape} scans the whole table:\n{plan}")
+        self.assertIsNone(sort.search(plan), f"{shape} sorts outside an index:\n{plan}")
+
+    def test_page_queries_use_an_index_for_filter_and_order(self):
+        for shape, queryset in self.shapes():
+            with self.subTest(shape=shape):
+                self.assertIndexedPlan(queryset[PAGE_SIZE:PAGE_SIZE * 2], shape)
+
+    def test_keyset_queries_use_an_index_for_filter_and_order(self):
+        ordering = ('-created_at', '-id')
+        seek = KeysetPagination()._seek_filter(ordering, [timezone.now(), 1000])
+        for shape, queryset in self.shapes():
+            with self.subTest(shape=shape):
+                self.assertEqual(tuple(queryset.query.order_by), ordering)
+                self.assertIndexedPlan(queryset.filter(seek)[:PAGE_SIZE + 1], shape)
+
+    def test_importer_dedup_uses_an_index(self):
+        # Same query as ReviewImporter._store
+        queryset = Review.objects.filter(
+            source_url__in=['https://example.com/a', 'https://example.com/b']
+        ).order_by().values_list('source_url', 'comment')
+        self.assertIndexedPlan(queryset, 'importer dedup')
+
+    def test_detects_a_missing_index(self):
+        # Ordering on a column no index covers must be reported
+        queryset = self.view_queryset(ReviewListCreateAPIView, {'sentiment': 'positive'}).order_by('comment')
+        with self.assertRaises(AssertionError):
+            self.assertIndexedPlan(queryset[:PAGE_SIZE], 'unindexed order')
@@ -1,3 +1,761 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APIClient
+from accounts.models import User
+from .importer import HostRateLimiter, extract_reviews
+from .ingest import ingest_reviews, iter_json_array
+from .models import Review, ReviewDailyStat, ReviewSource, ReviewStat
+from .search import search_reviews
+from .sentiment import classify_text, classify_batch, score_text
+from .views import ReviewBulkIngestAPIView
+from store.models import Category, Product
 
-# Create your tests here.
+
+class SentimentEngineTests(TestCase):
+    def test_classify_polarity(self):
+        self.assertEqual(classify_text("Excellent service and fast delivery!"), 'positive')
+        self.assertEqual(classify_text("Terrible seller, the item arrived broken."), 'negative')
+        self.assertEqual(classify_text("The package arrived on Tuesday."), 'neutral')
+        self.assertEqual(classify_text(""), 'neutral')
+
+    def test_negation_flips_polarity(self):
+        self.assertEqual(classify_text("This was not good at all"), 'negative')
+        self.assertEqual(classify_text("I don't hate it"), 'positive')
+
+    def test_intensifier_increases_magnitude(self):
+        self.assertGreater(score_text("very good"), score_text("good"))
+
+    def test_batch_matches_single(self):
+        texts = ["great product", "awful support", "", "it is a phone"]
+        self.assertEqual(classify_batch(texts), [classify_text(t) for t in texts])
+
+
+class ReviewSentimentAPITests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='buyer@test.com', username='buyer', password='testpass123', role='buyer'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_create_ignores_client_sentiment(self):
+        response = self.client.post(reverse('review-list-create'), {
+            'comment': 'Awful experience, the product was fake.',
+            'sentiment': 'positive',
+            'rating': 1,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Review.objects.get().sentiment, 'negative')
+
+    def test_update_rescores_changed_comment(self):
+        review = Review.objects.create(user=self.user, comment='Bad packaging', sentiment='negative')
+        response = self.client.patch(
+            reverse('review-detail', args=[review.pk]),
+            {'comment': 'Amazing quality, highly recommend'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        review.refresh_from_db()
+        self.assertEqual(review.sentiment, 'positive')
+
+
+class RescoreReviewsCommandTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='seller@test.com', username='seller', password='testpass123', role='seller'
+        )
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), 'rescore.checkpoint')
+
+    def rescore(self, **options):
+        call_command('rescore_reviews', batch_size=1, workers=2,
+                     checkpoint=self.checkpoint, stdout=StringIO(), **options)
+
+    def test_rescores_and_resumes_from_checkpoint(self):
+        good = Review.objects.create(user=self.user, comment='Excellent seller', sentiment='negative')
+        bad = Review.objects.create(user=self.user, comment='Awful, broken item', sentiment='positive')
+
+        self.rescore()
+        good.refresh_from_db()
+        bad.refresh_from_db()
+        self.assertEqual((good.sentiment, bad.sentiment), ('positive', 'negative'))
+        # A finished run leaves no checkpoint behind
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+        # Interrupted after committing the first batch: that batch's rows
+        # were rewritten without signals, so the counters are stale
+        Review.objects.filter(pk=good.pk).update(sentiment='neutral')
+        with open(self.checkpoint, 'w') as handle:
+            json.dump({'last_pk': good.pk}, handle)
+        self.rescore()
+        good.refresh_from_db()
+        self.assertEqual(good.sentiment, 'neutral')
+        stats = {stat.sentiment: stat.count for stat in ReviewStat.objects.filter(count__gt=0)}
+        self.assertEqual(stats, {'neutral': 1, 'negative': 1})
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+        self.rescore()
+        good.refresh_from_db()
+        self.assertEqual(good.sentiment, 'positive')
+
+    def test_rescored_reviews_get_new_etags(self):
+        review = Review.objects.create(user=self.user, comment='Excellent seller', sentiment='negative')
+        client = APIClient()
+        client.force_authenticate(self.user)
+        urls = [reverse('review-detail', args=[review.pk]), reverse('user-reviews')]
+        etags = [client.get(url)['ETag'] for url in urls]
+
+        self.rescore()
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(client.get(urls[0]).data['sentiment'], 'positive')
+
+    def test_reset_ignores_the_checkpoint(self):
+        review = Review.objects.create(user=self.user, comment='Excellent seller', sentiment='negative')
+        with open(self.checkpoint, 'w') as handle:
+            json.dump({'last_pk': review.pk}, handle)
+        self.rescore(reset=True)
+        review.refresh_from_db()
+        self.assertEqual(review.sentiment, 'positive')
+
+
+class ReviewStatsTests(TestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(
+            email='buyer@test.com', username='buyer', password='testpass123', role='buyer'
+        )
+        self.seller = User.objects.create_user(
+            email='seller@test.com', username='seller', password='testpass123', role='seller'
+        )
+
+    def counters(self):
+        return {
+            (stat.sentiment, stat.user_role, stat.rating): stat.count
+            for stat in ReviewStat.objects.filter(count__gt=0)
+        }
+
+    def test_counters_follow_create_update_delete(self):
+        review = Review.objects.create(user=self.buyer, comment='ok', sentiment='positive', rating=5)
+        Review.objects.create(user=self.seller, comment='ok', sentiment='positive', rating=5)
+        self.assertEqual(self.counters(), {
+            ('positive', 'buyer', 5): 1,
+            ('positive', 'seller', 5): 1,
+        })
+
+        review = Review.objects.get(pk=review.pk)
+        review.sentiment = 'negative'
+        review.rating = 2
+        review.save()
+        self.assertEqual(self.counters(), {
+            ('negative', 'buyer', 2): 1,
+            ('positive', 'seller', 5): 1,
+        })
+
+        review.delete()
+        self.assertEqual(self.counters(), {('positive', 'seller', 5): 1})
+
+    def test_rebuild_matches_incremental_counters(self):
+        for rating in (1, 3, 3, 5):
+            Review.objects.create(user=self.buyer, comment='x', sentiment='neutral', rating=rating)
+        incremental = self.counters()
+        ReviewStat.objects.all().update(count=0)
+        call_command('rebuild_review_stats', stdout=StringIO())
+        self.assertEqual(self.counters(), incremental)
+
+    def test_stats_endpoint_uses_single_query(self):
+        Review.objects.create(user=self.buyer, comment='x', sentiment='positive', rating=4)
+        Review.objects.create(user=self.buyer, comment='x', sentiment='negative', rating=1)
+        Review.objects.create(user=self.seller, comment='x', sentiment='positive', rating=5)
+        with self.assertNumQueries(1):
+            response = APIClient().get(reverse('review-stats'))
+        self.assertEqual(response.data, {
+            'total_reviews': 3,
+            'average_rating': 3.33,
+            'sentiment_distribution': [
+                {'sentiment': 'negative', 'count': 1},
+                {'sentiment': 'positive', 'count': 2},
+            ],
+            'role_distribution': [
+                {'user_role': 'buyer', 'count': 2},
+                {'user_role': 'seller', 'count': 1},
+            ],
+            'rating_distribution': [
+                {'rating': 1, 'count': 1},
+                {'rating': 4, 'count': 1},
+                {'rating': 5, 'count': 1},
+            ],
+        })
+
+
+class ReviewTrendsTests(TestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(
+            email='buyer@test.com', username='buyer', password='testpass123', role='buyer'
+        )
+        self.seller = User.objects.create_user(
+            email='seller@test.com', username='seller', password='testpass123', role='seller'
+        )
+
+    def rollups(self):
+        return {
+            (stat.day, stat.sentiment, stat.user_role, stat.rating): stat.count
+            for stat in ReviewDailyStat.objects.filter(count__gt=0)
+        }
+
+    def review_on(self, day, user, sentiment, rating):
+        review = Review.objects.create(user=user, comment='x', sentiment=sentiment, rating=rating)
+        # update() bypasses the signals, like a bulk import of historic data
+        Review.objects.filter(pk=review.pk).update(
+            created_at=timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        )
+
+    def test_rollups_follow_create_update_delete(self):
+        today = timezone.localdate()
+        review = Review.objects.create(user=self.buyer, comment='ok', sentiment='positive', rating=5)
+        Review.objects.create(user=self.seller, comment='ok', sentiment='positive', rating=5)
+
+        review = Review.objects.get(pk=review.pk)
+        review.sentiment = 'negative'
+        review.save()
+        self.assertEqual(self.rollups(), {
+            (today, 'negative', 'buyer', 5): 1,
+            (today, 'positive', 'seller', 5): 1,
+        })
+
+        review.delete()
+        self.assertEqual(self.rollups(), {(today, 'positive', 'seller', 5): 1})
+
+    def test_bulk_ingest_is_rolled_up(self):
+        ingest_reviews([{'comment': 'Excellent', 'rating': 5}, {'comment': 'Terrible', 'rating': 1}], self.seller)
+        incremental = self.rollups()
+        self.assertEqual(sum(incremental.values()), 2)
+        ReviewDailyStat.objects.rebuild()
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_backfill_rolls_up_backdated_reviews_in_windows(self):
+        for offset in range(5):
+            self.review_on(date(2024, 3, 1) + timedelta(days=offset), self.buyer, 'neutral', 3)
+        self.review_on(date(2024, 3, 1), self.seller, 'positive', 4)
+
+        out = StringIO()
+        call_command('backfill_review_rollups', '--days-per-batch', '2', stdout=out)
+
+        self.assertIn('Rolled up 2024-03-01 to 2024-03-02.', out.getvalue())
+        self.assertIn('Rolled up 2024-03-05 to 2024-03-06.', out.getvalue())
+        rollups = self.rollups()
+        self.assertEqual(rollups[(date(2024, 3, 1), 'positive', 'seller', 4)], 1)
+        self.assertEqual(
+            [rollups[(date(2024, 3, 1) + timedelta(days=offset), 'neutral', 'buyer', 3)] for offset in range(5)],
+            [1] * 5,
+        )
+        # Rows created today by the signals belong to no review any more
+        self.assertFalse(ReviewDailyStat.objects.filter(day=timezone.localdate()).exists())
+
+    def test_weekly_trend_in_one_query(self):
+        # 2024-03-04 is a Monday
+        self.review_on(date(2024, 3, 4), self.buyer, 'positive', 5)
+        self.review_on(date(2024, 3, 10), self.buyer, 'negative', 2)
+        self.review_on(date(2024, 3, 12), self.seller, 'positive', 4)
+        call_command('backfill_review_rollups', stdout=StringIO())
+
+        with self.assertNumQueries(1):
+            response = APIClient().get(
+                reverse('review-trends'), {'start': '2024-03-01', 'end': '2024-03-20', 'bucket': 'week'}
+            )
+        self.assertEqual(response.status_code, 200)
+        buyer, seller = response.data['series']['buyer'], response.data['series']['seller']
+        self.assertEqual(
+            [entry['period'] for entry in buyer], ['2024-02-26', '2024-03-04', '2024-03-11', '2024-03-18']
+        )
+        self.assertEqual(buyer[0]['total'], 0)
+        self.assertIsNone(buyer[0]['average_rating'])
+        self.assertEqual(buyer[1], {
+            'period': '2024-03-04', 'total': 2, 'positive': 1, 'negative': 1, 'neutral': 0,
+            'average_rating': 3.5,
+        })
+        self.assertEqual([entry['total'] for entry in seller], [0, 0, 1, 0])
+
+    def test_filters_and_monthly_buckets(self):
+        self.review_on(date(2024, 1, 31), self.buyer, 'positive', 5)
+        self.review_on(date(2024, 2, 1), self.buyer, 'negative', 1)
+        self.review_on(date(2024, 2, 2), self.seller, 'negative', 1)
+        call_command('backfill_review_rollups', stdout=StringIO())
+
+        response = APIClient().get(reverse('review-trends'), {
+            'start': '2024-01-15', 'end': '2024-03-15', 'bucket': 'month',
+            'user_role': 'buyer', 'sentiment': 'negative',
+        })
+        self.assertEqual(list(response.data['series']), ['buyer'])
+        self.assertEqual(
+            [(entry['period'], entry['total']) for entry in response.data['series']['buyer']],
+            [('2024-01-01', 0), ('2024-02-01', 1), ('2024-03-01', 0)],
+        )
+
+    def test_defaults_to_the_last_30_days(self):
+        response = APIClient().get(reverse('review-trends'))
+        self.assertEqual(response.data['end'], timezone.localdate().isoformat())
+        self.assertEqual(len(response.data['series']['buyer']), 30)
+
+    def test_rejects_invalid_parameters(self):
+        url = reverse('review-trends')
+        for params in (
+            {'start': '2024-03-10', 'end': '2024-03-01'},
+            {'start': 'yesterday'},
+            {'bucket': 'hour'},
+            {'user_role': 'admin'},
+            {'start': '2000-01-01', 'end': '2024-01-01'},
+        ):
+            self.assertEqual(APIClient().get(url, params).status_code, 400, params)
+
+
+class ProductReviewCounterTests(TestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user(
+            email='buyer@test.com', username='buyer', password='testpass123', role='buyer'
+        )
+        self.seller = User.objects.create_user(
+            email='seller@test.com', username='seller', password='testpass123', role='seller'
+        )
+        category = Category.objects.create(category_name='Phones')
+        self.phone, self.case = [
+            Product.objects.create(product_name=name, price='10.00', stock=1, category=category, user=self.seller)
+            for name in ('Phone', 'Case')
+        ]
+
+    def counters(self, product):
+        product.refresh_from_db()
+        return (
+            product.review_count, product.positive_count, product.neutral_count,
+            product.negative_count, product.avg_rating, product.positive_ratio,
+        )
+
+    def test_counters_follow_create_update_delete(self):
+        review = Review.objects.create(
+            user=self.buyer, product=self.phone, comment='x', sentiment='positive', rating=5
+        )
+        Review.objects.create(user=self.buyer, product=self.phone, comment='x', sentiment='negative', rating=2)
+        Review.objects.create(user=self.buyer, comment='not about a product', sentiment='positive', rating=1)
+        self.assertEqual(self.counters(self.phone), (2, 1, 0, 1, 3.5, 0.5))
+
+        review = Review.objects.get(pk=review.pk)
+        review.product = self.case
+        review.sentiment = 'neutral'
+        review.save()
+        self.assertEqual(self.counters(self.phone), (1, 0, 0, 1, 2.0, 0.0))
+        self.assertEqual(self.counters(self.case), (1, 0, 1, 0, 5.0, 0.0))
+
+        review.delete()
+        self.assertEqual(self.counters(self.case), (0, 0, 0, 0, 0.0, 0.0))
+
+    def test_api_and_bulk_ingest_link_products(self):
+        client = APIClient()
+        client.force_authenticate(self.buyer)
+        response = client.post(reverse('review-list-create'), {
+            'comment': 'Excellent phone, works great', 'rating': 4, 'product': self.phone.id,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        result = ingest_reviews([
+            {'comment': 'Excellent', 'rating': 5, 'product': self.phone.id},
+            {'comment': 'Terrible', 'rating': 1, 'product': self.phone.id},
+            {'comment': 'Missing product', 'rating': 1, 'product': 999999},
+        ], self.buyer)
+        self.assertEqual(result['created'], 2)
+        self.assertEqual(result['errors'][0]['index'], 2)
+
+        incremental = self.counters(self.phone)
+        self.assertEqual(incremental[0], 3)
+        self.assertAlmostEqual(incremental[4], 10 / 3)
+        Product.objects.rebuild_review_counters()
+        self.assertEqual(self.counters(self.phone), incremental)
+
+    def test_bulk_ingest_checks_products_once_per_batch(self):
+        rows = [
+            {'comment': f'review {index}', 'rating': 4, 'product': (self.phone.id, self.case.id)[index % 2]}
+            for index in range(200)
+        ]
+        rows[50]['product'] = 999999
+        rows[120]['product'] = 'phone'
+        with CaptureQueriesContext(connection) as queries:
+            result = ingest_reviews(rows, self.buyer, batch_size=100)
+        self.assertEqual(result['created'], 198)
+        self.assertEqual([error['index'] for error in result['errors']], [50, 120])
+        self.assertEqual(
+            [code.code for error in result['errors'] for code in error['errors']['product']],
+            ['does_not_exist', 'incorrect_type'],
+        )
+        product_lookups = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith('SELECT') and 'FROM "store_product"' in query['sql']
+        ]
+        self.assertEqual(len(product_lookups), 2)
+        self.assertEqual((self.counters(self.phone)[0], self.counters(self.case)[0]), (98, 100))
+
+    def test_deleting_a_product_keeps_its_reviews(self):
+        review = Review.objects.create(user=self.buyer, product=self.phone, comment='x', rating=4)
+        before = review.updated_at
+        self.phone.delete()
+        review.refresh_from_db()
+        self.assertIsNone(review.product_id)
+        # The unlinked review gets a new ETag
+        self.assertGreater(review.updated_at, before)
+
+
+class ReviewSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='buyer@test.com', username='buyer', password='testpass123', role='buyer'
+        )
+
+    def search(self, query):
+        response = APIClient().get(reverse('review-list-create'), {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_results_ranked_by_relevance(self):
+        once = Review.objects.create(user=self.user, comment='Delivery was late, packaging fine')
+        twice = Review.objects.create(user=self.user, comment='Late delivery again, delivery always late')
+        Review.objects.create(user=self.user, comment='Great product')
+        self.assertEqual(self.search('late delivery'), [twice.pk, once.pk])
+        self.assertEqual(self.search('deliv'), [twice.pk, once.pk])
+
+    def test_index_follows_updates_and_deletes(self):
+        review = Review.objects.create(user=self.user, comment='Phone case cracked')
+        self.assertEqual(self.search('cracked'), [review.pk])
+
+        review.comment = 'Phone case is sturdy'
+        review.save()
+        self.assertEqual(self.search('cracked'), [])
+        self.assertEqual(self.search('sturdy'), [review.pk])
+
+        review.delete()
+        self.assertEqual(self.search('sturdy'), [])
+
+    def test_matches_username_and_ignores_query_syntax(self):
+        review = Review.objects.create(user=self.user, comment='Nice')
+        self.assertEqual(self.search('buyer'), [review.pk])
+        self.assertEqual(self.search('"nice*'), [review.pk])
+        self.assertEqual(self.search('***'), [])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(
+            email='buyer@test.com', username='buyer', password='testpass123', role='buyer'
+        )
+        for index in range(45):
+            Review.objects.create(user=user, comment=f'review {index}')
+        # Force ties on created_at so the id tie-breaker matters
+        Review.objects.filter(pk__in=range(15, 26)).update(created_at=timezone.now())
+        self.expected = list(Review.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def test_walks_forward_and_back_without_count(self):
+        client = APIClient()
+        url = reverse('review-list-create') + '?cursor='
+        seen, pages = [], []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+            self.assertNotIn('count', response.data)
+            for query in queries.captured_queries:
+                self.assertNotIn('COUNT(', query['sql'])
+                self.assertNotIn('OFFSET', query['sql'])
+            page = [row['id'] for row in response.data['results']]
+            pages.append(page)
+            seen.extend(page)
+            url = response.data['next']
+        self.assertEqual(seen, self.expected)
+        self.assertEqual([len(page) for page in pages], [20, 20, 5])
+
+        url = response.data['previous']
+        for page in reversed(pages[:-1]):
+            response = client.get(url)
+            self.assertEqual([row['id'] for row in response.data['results']], page)
+            url = response.data['previous']
+        self.assertIsNone(url)
+
+    def test_page_numbers_remain_the_default(self):
+        response = APIClient().get(reverse('review-list-create'))
+        self.assertEqual(response.data['count'], 45)
+
+    def test_invalid_cursor(self):
+        response = APIClient().get(reverse('review-list-create'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+
+class ReviewBulkIngestTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            email='seller@test.com', username='seller', password='testpass123', role='seller'
+        )
+        self.client.force_authenticate(self.seller)
+        self.url = reverse('review-bulk-ingest')
+
+    def post(self, body, content_type):
+        return self.client.generic('POST', self.url, body, content_type=content_type)
+
+    def test_ndjson_rows_are_created_and_errors_reported(self):
+        body = '\n'.join([
+            json.dumps({'comment': 'Excellent seller', 'rating': 5, 'source_url': 'https://shop.test/1'}),
+            '{"comment": "broken',
+            json.dumps({'comment': 'Terrible delivery', 'rating': 9}),
+            '',
+            json.dumps({'comment': 'Arrived on time'}),
+        ])
+        response = self.post(body, 'application/x-ndjson')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['received'], 4)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2])
+        self.assertIn('rating', response.data['errors'][1]['errors'])
+
+        review = Review.objects.get(source_url='https://shop.test/1')
+        self.assertEqual((review.sentiment, review.user_role, review.username), ('positive', 'seller', 'seller'))
+        stats = self.client.get(reverse('review-stats')).data
+        self.assertEqual(stats['total_reviews'], 2)
+        self.assertEqual(len(search_reviews(Review.objects.all(), 'excellent')), 1)
+
+    def test_json_array_in_batches(self):
+        view = ReviewBulkIngestAPIView
+        rows = [{'comment': f'review number {index}', 'rating': 4} for index in range(25)]
+        with mock.patch.object(view, 'batch_size', 10):
+            response = self.post(json.dumps(rows), 'application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 25)
+        self.assertEqual(Review.objects.count(), 25)
+
+    def test_malformed_array_keeps_rows_read_so_far(self):
+        response = self.post('[{"comment": "good"}, {"comment": "fine"} {"comment": "lost"}]', 'application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['created'], 2)
+        self.assertIn('detail', response.data)
+
+    def test_rejects_other_media_types_and_anonymous_users(self):
+        self.assertEqual(self.post('comment=hi', 'application/x-www-form-urlencoded').status_code, 415)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.post('[]', 'application/json').status_code, 401)
+
+    def test_array_parser_handles_chunk_boundaries(self):
+        rows = [{'comment': 'naïve «quote» ' * index, 'rating': index} for index in range(1, 6)] + [7, 12.5]
+        body = json.dumps(rows, ensure_ascii=False).encode()
+        for chunk_size in (1, 3, 7, 64):
+            self.assertEqual(list(iter_json_array(BytesIO(body), chunk_size=chunk_size)), rows)
+        self.assertEqual(list(iter_json_array(BytesIO(b' [ ] '))), [])
+        for bad in (b'{"comment": "x"}', b'[1, 2', b'[1] 2', b'[1,, 2]'):
+            with self.assertRaises(ParseError):
+                list(iter_json_array(BytesIO(bad), chunk_size=2))
+
+
+class StubReviewServer:
+    """
+    Threaded local HTTP server standing in for external review sites.
+    """
+    delay = 0.0
+
+    def __init__(self):
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub.lock:
+                    stub.requests.append((self.path, dict(self.headers)))
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.delay)
+                    status, headers, body = stub.respond(self.path, self.headers)
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+            request_queue_size = 512
+
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, path):
+        return f'http://127.0.0.1:{self.server.server_port}{path}'
+
+    def respond(self, path, headers):
+        if path == '/shop/phone':
+            if headers.get('If-None-Match') == '"v1"':
+                return 304, {'ETag': '"v1"'}, b''
+            document = {
+                '@context': 'https://schema.org', '@type': 'Product', 'name': 'Phone',
+                'review': [
+                    {'@type': 'Review', 'reviewBody': 'Excellent phone, fast delivery',
+                     'reviewRating': {'@type': 'Rating', 'ratingValue': 10, 'bestRating': 10}},
+                    {'@type': 'Review', 'reviewBody': 'Terrible battery',
+                     'reviewRating': {'@type': 'Rating', 'ratingValue': '1'}},
+                ],
+            }
+            html = f'<html><script type="application/ld+json">{json.dumps(document)}</script></html>'
+            return 200, {'Content-Type': 'text/html; charset=utf-8', 'ETag': '"v1"'}, html.encode()
+        if path.startswith('/api/'):
+            body = json.dumps({'reviews': [{'comment': f'Good seller {path}', 'rating': 4}]})
+            return 200, {'Content-Type': 'application/json'}, body.encode()
+        return 404, {'Content-Type': 'text/plain'}, b'not found'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ImportReviewsCommandTests(TransactionTestCase):
+    def setUp(self):
+        self.importer = User.objects.create_user(
+            email='scraper@test.com', username='scraper', password='testpass123', role='buyer'
+        )
+
+    def run_import(self, *args):
+        out = StringIO()
+        call_command('import_reviews', *args, '--user', 'scraper@test.com', stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_imports_then_refetches_conditionally(self):
+        with StubReviewServer() as server:
+            urls = [server.url('/shop/phone'), server.url('/api/seller'), server.url('/missing')]
+            with self.assertLogs('kikuu.importer', level='WARNING'):
+                output = self.run_import(*urls, urls[0])
+
+            self.assertIn('2 fetched, 0 not modified, 1 failed, 0 fetched recently, 1 duplicate URLs', output)
+            self.assertIn('3 imported', output)
+            phone = dict(Review.objects.filter(source_url=urls[0]).values_list('comment', 'rating'))
+            self.assertEqual(phone, {'Excellent phone, fast delivery': 5, 'Terrible battery': 1})
+            self.assertEqual(ReviewSource.objects.get(url=urls[0]).etag, '"v1"')
+            self.assertEqual(ReviewStat.objects.get(sentiment='negative', user_role='buyer', rating=1).count, 1)
+
+            # Fetched moments ago, so skipped by default
+            self.assertIn('2 fetched recently', self.run_import(*urls[:2], '--refresh-after', '24'))
+
+            server.requests.clear()
+            output = self.run_import(*urls[:2], '--refresh-after', '0')
+            self.assertIn('1 fetched, 1 not modified', output)
+            self.assertIn('0 imported, 1 already present', output)
+            phone_request = next(headers for path, headers in server.requests if path == '/shop/phone')
+            self.assertEqual(phone_request['If-None-Match'], '"v1"')
+        self.assertEqual(Review.objects.count(), 3)
+
+    def test_keeps_many_fetches_in_flight(self):
+        with StubReviewServer() as server:
+            server.delay = 0.2
+            urls = [server.url(f'/api/{index}') for index in range(150)]
+            started = time.monotonic()
+            self.run_import(*urls, '--per-host-rate', '0', '--concurrency', '100')
+            elapsed = time.monotonic() - started
+        self.assertEqual(Review.objects.count(), 150)
+        self.assertGreaterEqual(server.max_in_flight, 50)
+        # Serially this would take 30 seconds
+        self.assertLess(elapsed, 10)
+
+
+class ReviewImporterUnitTests(TestCase):
+    def test_extracts_plain_json_and_json_ld(self):
+        rows = extract_reviews('[{"comment": "Nice", "rating": 5}, {"rating": 2}]', 'application/json', 'https://a.test/1')
+        self.assertEqual(rows, [{'comment': 'Nice', 'rating': 5, 'source_url': 'https://a.test/1'}])
+        html = '<script type="application/ld+json">{"@type": "Review", "reviewBody": "Meh"}</script>' \
+               '<script type="application/ld+json">{broken</script>'
+        self.assertEqual(extract_reviews(html, 'text/html', 'https://a.test/2'),
+                         [{'comment': 'Meh', 'source_url': 'https://a.test/2'}])
+
+    def test_rate_limiter_spaces_requests_per_host(self):
+        async def timed():
+            limiter = HostRateLimiter(20)
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await asyncio.gather(*(limiter.wait('a.test') for _ in range(5)), limiter.wait('b.test'))
+            return loop.time() - started
+
+        self.assertGreaterEqual(asyncio.run(timed()), 0.19)
+
+
+class ReviewExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.buyer = User.objects.create_user(
+            email='buyer@test.com', username='buyer', password='testpass123', role='buyer'
+        )
+        self.client.force_authenticate(self.buyer)
+        Review.objects.create(user=self.buyer, comment='Excellent delivery', sentiment='positive', rating=5)
+        Review.objects.create(user=self.buyer, comment='=HYPERLINK("http://evil")', sentiment='neutral', rating=3)
+        Review.objects.create(user=self.buyer, comment='Broken on arrival', sentiment='negative', rating=1)
+
+    def export(self, export_format, **params):
+        response = self.client.get(reverse('review-export', args=[export_format]), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_applies_list_filters(self):
+        rows = list(csv.DictReader(StringIO(self.export('csv', sentiment='positive'))))
+        self.assertEqual([row['comment'] for row in rows], ['Excellent delivery'])
+        self.assertEqual(rows[0]['user_email'], 'buyer@test.com')
+
+        rows = list(csv.DictReader(StringIO(self.export('csv', search='broken'))))
+        self.assertEqual([row['rating'] for row in rows], ['1'])
+
+    def test_csv_neutralizes_formulas(self):
+        rows = list(csv.DictReader(StringIO(self.export('csv', rating=3))))
+        self.assertEqual(rows[0]['comment'], '\'=HYPERLINK("http://evil")')
+
+    def test_ndjson_and_command_match(self):
+        lines = [json.loads(line) for line in self.export('ndjson').splitlines()]
+        self.assertEqual([line['rating'] for line in lines], [1, 3, 5])
+        out = StringIO()
+        call_command('export_reviews', '--format', 'ndjson', stdout=out)
+        self.assertEqual([json.loads(line) for line in out.getvalue().splitlines()], lines)
+
+    def test_command_filters_by_product(self):
+        category = Category.objects.create(category_name='Kitchen')
+        product = Product.objects.create(
+            product_name='Kettle', price='10.00', stock=1, category=category, user=self.buyer
+        )
+        Review.objects.filter(rating=1).update(product=product)
+        lines = [json.loads(line) for line in self.export('ndjson', product=product.pk).splitlines()]
+        self.assertEqual([line['comment'] for line in lines], ['Broken on arrival'])
+        out = StringIO()
+        call_command('export_reviews', '--format', 'ndjson', '--product', str(product.pk), stdout=out)
+        self.assertEqual([json.loads(line) for line in out.getvalue().splitlines()], lines)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(reverse('review-export', args=['csv'])).status_code, 401)
@@ -1,16 +1,21 @@
 from django.urls import path
 from .views import (
     ReviewListCreateAPIView,
+    ReviewBulkIngestAPIView,
+    ReviewExportAPIView,
     ReviewDetailAPIView,
     UserReviewsAPIView,
     ReviewsByRoleAPIView,
-    ReviewStatsAPIView
+    ReviewStatsAPIView,
+    ReviewTrendsAPIView,
 )
 
 urlpatterns = [
     # CRUD operations for reviews
     path('reviews/', ReviewListCreateAPIView.as_view(), name='review-list-create'),
     path('reviews/<int:pk>/', ReviewDetailAPIView.as_view(), name='review-detail'),
+    path('reviews/bulk/', ReviewBulkIngestAPIView.as_view(), name='review-bulk-ingest'),
+    path('reviews/export/<str:export_format>/', ReviewExportAPIView.as_view(), name='review-export'),
 
     # User-specific reviews
     path('my-reviews/', UserReviewsAPIView.as_view(), name='user-reviews'),
@@ -20,4 +25,5 @@ urlpatterns = [
 
     # Review statistics
     path('reviews/stats/', ReviewStatsAPIView.as_view(), name='review-stats'),
+    path('reviews/trends/', ReviewTrendsAPIView.as_view(), name='review-trends'),
 ]
@@ -1,10 +1,21 @@
+from datetime import timedelta
+
+from django.db import models
+from django.db.models import F, Sum
+from django.db.models.functions import Trunc
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import permissions, generics
-from rest_framework.exceptions import PermissionDenied, NotFound
-from django.db.models import Q
-from .models import Review
-from .serializers import ReviewSerializer, ReviewCreateSerializer, ReviewUpdateSerializer
+from rest_framework import permissions, generics, status
+from rest_framework.exceptions import PermissionDenied, NotFound, UnsupportedMediaType
+from .ingest import NDJSON_CONTENT_TYPES, ingest_reviews, iter_json_array, iter_ndjson
+from .models import Review, ReviewDailyStat, ReviewStat
+from kikuu_sentiment.cache import CachedListMixin
+from kikuu_sentiment.etags import ConditionalListMixin, ConditionalRetrieveMixin
+from kikuu_sentiment.export import EXPORT_FORMATS, streaming_export_response
+from .serializers import (
+    REVIEW_EXPORT_COLUMNS, ReviewSerializer, ReviewCreateSerializer, ReviewTrendQuerySerializer,
+    ReviewUpdateSerializer,
+)
 
 class ReviewPermission(permissions.BasePermission):
     """
@@ -35,7 +46,7 @@ class ReviewPermission(permissions.BasePermission):
         # Write permissions only to the owner of the review
         return obj.user == request.user
 
-class ReviewListCreateAPIView(generics.ListCreateAPIView):
+class ReviewListCreateAPIView(ConditionalListMixin, CachedListMixin, generics.ListCreateAPIView):
     """
     List all reviews or create a new review.
     GET: Anyone can view reviews
@@ -43,33 +54,11 @@ class ReviewListCreateAPIView(generics.ListCreateAPIView):
     """
     serializer_class = ReviewSerializer
     permission_classes = [ReviewPermission]
+    keyset_ordering = ('-created_at', '-id')
+    cache_models = (Review,)
 
     def get_queryset(self):
-        queryset = Review.objects.all()
-
-        # Filter by user role if specified
-        user_role = self.request.query_params.get('user_role', None)
-        if user_role in ['seller', 'buyer']:
-            queryset = queryset.filter(user_role=user_role)
-
-        # Filter by sentiment if specified
-        sentiment = self.request.query_params.get('sentiment', None)
-        if sentiment in ['positive', 'negative', 'neutral']:
-            queryset = queryset.filter(sentiment=sentiment)
-
-        # Filter by rating if specified
-        rating = self.request.query_params.get('rating', None)
-        if rating and rating.isdigit() and 1 <= int(rating) <= 5:
-            queryset = queryset.filter(rating=int(rating))
-
-        # Search in comments
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(comment__icontains=search) | Q(username__icontains=search)
-            )
-
-        return queryset.order_by('-created_at')
+        return Review.objects.apply_filters(self.request.query_params)
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -89,7 +78,51 @@ class ReviewListCreateAPIView(generics.ListCreateAPIView):
             user_role=user.role
         )
 
-class ReviewDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class ReviewBulkIngestAPIView(APIView):
+    """
+    Create many reviews from one streamed request body.
+    POST: NDJSON (application/x-ndjson) or a JSON array (application/json)
+    of review objects. Invalid rows are reported, valid ones are created.
+    """
+    permission_classes = [ReviewPermission]
+    batch_size = 1000
+
+    def post(self, request):
+        user = request.user
+        if not hasattr(user, 'role') or user.role not in ['seller', 'buyer']:
+            raise PermissionDenied("Only sellers and buyers can create reviews.")
+
+        # Read the body as a stream; request.data would buffer all of it
+        content_type = request.content_type.split(';')[0].strip().lower()
+        stream = request.stream
+        if stream is None:
+            rows = iter(())
+        elif content_type in NDJSON_CONTENT_TYPES:
+            rows = iter_ndjson(stream)
+        elif content_type == 'application/json':
+            rows = iter_json_array(stream)
+        else:
+            raise UnsupportedMediaType(content_type)
+
+        result = ingest_reviews(rows, user, batch_size=self.batch_size)
+        if 'detail' in result or (result['errors'] and not result['created']):
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+class ReviewExportAPIView(APIView):
+    """
+    Stream every review matching the list filters as CSV or NDJSON.
+    Only accessible by authenticated users.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, export_format):
+        if export_format not in EXPORT_FORMATS:
+            raise NotFound("Unknown export format.")
+        queryset = Review.objects.apply_filters(request.query_params)
+        return streaming_export_response(queryset, REVIEW_EXPORT_COLUMNS, export_format, 'reviews')
+
+class ReviewDetailAPIView(ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update or delete a review instance.
     GET: Anyone can view a specific review
@@ -110,24 +143,27 @@ class ReviewDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
         except Review.DoesNotExist:
             raise NotFound("Review not found.")
 
-class UserReviewsAPIView(generics.ListAPIView):
+class UserReviewsAPIView(ConditionalListMixin, generics.ListAPIView):
     """
     List all reviews by the authenticated user.
     Only accessible by authenticated users.
     """
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticated]
+    keyset_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
-        return Review.objects.filter(user=self.request.user).order_by('-created_at')
+        return Review.objects.filter(user=self.request.user).order_by('-created_at', '-id')
 
-class ReviewsByRoleAPIView(generics.ListAPIView):
+class ReviewsByRoleAPIView(ConditionalListMixin, CachedListMixin, generics.ListAPIView):
     """
     List reviews filtered by user role (seller or buyer).
     Anyone can access this endpoint.
     """
     serializer_class = ReviewSerializer
     permission_classes = [permissions.AllowAny]
+    keyset_ordering = ('-created_at', '-id')
+    cache_models = (Review,)
 
     def get_queryset(self):
         role = self.kwargs.get('role')
@@ -145,7 +181,7 @@ class ReviewsByRoleAPIView(generics.ListAPIView):
         if rating and rating.isdigit() and 1 <= int(rating) <= 5:
             queryset = queryset.filter(rating=int(rating))
 
-        return queryset.order_by('-created_at')
+        return queryset.order_by('-created_at', '-id')
 
 class ReviewStatsAPIView(APIView):
     """
@@ -155,32 +191,118 @@ class ReviewStatsAPIView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def get(self, request):
-        from django.db.models import Count, Avg
-
-        total_reviews = Review.objects.count()
+        # Answered from the pre-aggregated counters in a single query
+        sentiment_counts = {}
+        role_counts = {}
+        rating_counts = {}
+        total_reviews = 0
+        rating_sum = 0
+
+        stats = ReviewStat.objects.filter(count__gt=0).values_list(
+            'sentiment', 'user_role', 'rating', 'count'
+        )
+        for sentiment, user_role, rating, count in stats:
+            sentiment_counts[sentiment] = sentiment_counts.get(sentiment, 0) + count
+            role_counts[user_role] = role_counts.get(user_role, 0) + count
+            rating_counts[rating] = rating_counts.get(rating, 0) + count
+            total_reviews += count
+            rating_sum += rating * count
 
-        # Count by sentiment
-        sentiment_stats = Review.objects.values('sentiment').annotate(
-            count=Count('sentiment')
-        ).order_by('sentiment')
+        avg_rating = rating_sum / total_reviews if total_reviews else None
 
-        # Count by user role
-        role_stats = Review.objects.values('user_role').annotate(
-            count=Count('user_role')
-        ).order_by('user_role')
+        return Response({
+            'total_reviews': total_reviews,
+            'average_rating': round(avg_rating, 2) if avg_rating else 0,
+            'sentiment_distribution': [
+                {'sentiment': key, 'count': sentiment_counts[key]} for key in sorted(sentiment_counts)
+            ],
+            'role_distribution': [
+                {'user_role': key, 'count': role_counts[key]} for key in sorted(role_counts)
+            ],
+            'rating_distribution': [
+                {'rating': key, 'count': rating_counts[key]} for key in sorted(rating_counts)
+            ]
+        })
+
+def _bucket_periods(start, end, bucket):
+    """
+    Return the first day of every bucket overlapping start..end, matching
+    Trunc(): weeks start on Monday, months on the 1st.
+    """
+    if bucket == 'week':
+        period = start - timedelta(days=start.weekday())
+    elif bucket == 'month':
+        period = start.replace(day=1)
+    else:
+        period = start
+    periods = []
+    while period <= end:
+        periods.append(period)
+        if bucket == 'week':
+            period += timedelta(days=7)
+        elif bucket == 'month':
+            period = (period + timedelta(days=31)).replace(day=1)
+        else:
+            period += timedelta(days=1)
+    return periods
+
+class ReviewTrendsAPIView(APIView):
+    """
+    Review counts per day, week or month for each user role, broken down by
+    sentiment, with the average rating. Anyone can access this endpoint.
 
-        # Average rating
-        avg_rating = Review.objects.aggregate(avg_rating=Avg('rating'))['avg_rating']
+    Answered with one grouped query over the daily rollups (ReviewDailyStat),
+    so the cost depends on the number of days asked for, not on the number
+    of reviews. Buckets are labelled with their first day; the first and last
+    bucket only count the days inside the range.
+    """
+    permission_classes = [permissions.AllowAny]
 
-        # Rating distribution
-        rating_stats = Review.objects.values('rating').annotate(
-            count=Count('rating')
-        ).order_by('rating')
+    def get(self, request):
+        query = ReviewTrendQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        start, end, bucket = params['start'], params['end'], params['bucket']
+
+        rollups = ReviewDailyStat.objects.filter(day__range=(start, end))
+        if 'user_role' in params:
+            rollups = rollups.filter(user_role=params['user_role'])
+        if 'sentiment' in params:
+            rollups = rollups.filter(sentiment=params['sentiment'])
+        rows = rollups.annotate(
+            period=Trunc('day', bucket, output_field=models.DateField())
+        ).values('period', 'user_role', 'sentiment').annotate(
+            total=Sum('count'), rating_sum=Sum(F('rating') * F('count'))
+        ).order_by()
+
+        roles = [params['user_role']] if 'user_role' in params else [role for role, _ in Review.USER_ROLE_CHOICES]
+        sentiments = [sentiment for sentiment, _ in Review.SENTIMENT_CHOICES]
+        periods = _bucket_periods(start, end, bucket)
+        buckets = {
+            role: {
+                period: {'total': 0, 'rating_sum': 0, **dict.fromkeys(sentiments, 0)}
+                for period in periods
+            }
+            for role in roles
+        }
+        for row in rows:
+            entry = buckets[row['user_role']][row['period']]
+            entry[row['sentiment']] += row['total']
+            entry['total'] += row['total']
+            entry['rating_sum'] += row['rating_sum']
+
+        series = {}
+        for role in roles:
+            series[role] = []
+            for period in periods:
+                entry = buckets[role][period]
+                rating_sum = entry.pop('rating_sum')
+                entry['average_rating'] = round(rating_sum / entry['total'], 2) if entry['total'] else None
+                series[role].append({'period': period.isoformat(), **entry})
 
         return Response({
-            'total_reviews': total_reviews,
-            'average_rating': round(avg_rating, 2) if avg_rating else 0,
-            'sentiment_distribution': list(sentiment_stats),
-            'role_distribution': list(role_stats),
-            'rating_distribution': list(rating_stats)
-        })
\ No newline at end of file
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'bucket': bucket,
+            'series': series,
+        })
@@ -0,0 +1,121 @@
+"""
+Versioned response cache for read-heavy list endpoints.
+
+Each cached model has a generation counter in the cache. Response keys embed
+the current generations of the models a view depends on, so bumping a
+counter (one cache write on post_save/post_delete) invalidates every cached
+page for that model at once; stale entries simply age out.
+
+Works with any Django cache backend that supports incr (local memory,
+Redis, Memcached).
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from rest_framework.response import Response
+
+from .db_router import primary_reads
+
+CACHE_ALIAS = getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')
+CACHE_TIMEOUT = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _generation_key(model):
+    return f'gen:{model._meta.label_lower}'
+
+
+def get_generations(models):
+    """
+    Return the current generation of each model, creating missing counters.
+    """
+    cache = _cache()
+    keys = [_generation_key(model) for model in models]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            # Seed from the clock so a counter lost to eviction never reuses old keys
+            cache.add(key, time.time_ns(), timeout=None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def bump_generation(model):
+    """
+    Invalidate every cached response that depends on model. O(1).
+    """
+    cache = _cache()
+    key = _generation_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def bump_generation_on_commit(model):
+    """
+    Bump now, so this process stops serving the old pages immediately, and
+    again after commit, so pages a concurrent reader cached from pre-commit
+    rows are not served under the new generation.
+    """
+    bump_generation(model)
+    transaction.on_commit(lambda: bump_generation(model))
+
+
+def _invalidate_handler(sender, **kwargs):
+    bump_generation_on_commit(sender)
+
+
+def register_cache_invalidation(*models):
+    for model in models:
+        post_save.connect(_invalidate_handler, sender=model, dispatch_uid=f'cache-gen-save-{model._meta.label_lower}')
+        post_delete.connect(_invalidate_handler, sender=model, dispatch_uid=f'cache-gen-delete-{model._meta.label_lower}')
+
+
+class CachedListMixin:
+    """
+    Cache list() responses keyed on the normalized URL and the generations of
+    `cache_models`. Responses are identical for every user, so only views whose
+    output does not depend on request.user should use this.
+
+    Misses are built from the primary database: a page read from a lagging
+    replica would be stored under the new generation and served to the user
+    whose write bumped it.
+    """
+    cache_models = ()
+    cache_timeout = CACHE_TIMEOUT
+
+    def get_response_cache_key(self, request):
+        params = sorted(
+            (key, value) for key, values in request.query_params.lists() for value in values
+        )
+        raw = '|'.join([
+            request.scheme, request.get_host(), request.path,
+            '&'.join(f'{key}={value}' for key, value in params),
+        ])
+        generations = '.'.join(str(value) for value in get_generations(self.cache_models))
+        digest = hashlib.sha1(raw.encode()).hexdigest()
+        return f'resp:{self.__class__.__name__}:{generations}:{digest}'
+
+    def list(self, request, *args, **kwargs):
+        cache = _cache()
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        with primary_reads():
+            response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, self.cache_timeout)
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,232 @@
+"""
+Read-replica routing for safe-method requests.
+
+ReplicaRoutingMiddleware marks GET, HEAD and OPTIONS requests as allowed to
+read from a replica. While such a request runs, ReplicaRouter sends reads of
+the kikuu, store and carts models to one of the aliases in DATABASE_REPLICAS,
+picked round-robin or by lowest observed query latency
+(DATABASE_REPLICA_SELECTION). A request keeps the replica it was given, so
+all its reads see the same point in time. Everything else, including every
+write and every read inside a transaction, stays on the primary, and so do
+reads wrapped in primary_reads(): the response cache fills its misses that
+way, because a page it stores is served to writers too.
+
+A request that writes pins its user (or anonymous session) to the primary
+for DATABASE_PRIMARY_PIN_SECONDS, so the next pages they load see their own
+changes even when the replicas lag. Pins live in the default cache; use a
+shared backend (REDIS_URL) when several processes serve traffic.
+
+With DATABASE_REPLICAS empty the router never picks a replica.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.utils.functional import LazyObject, empty
+
+REPLICA_APPS = frozenset({'kikuu', 'store', 'carts'})
+ROUND_ROBIN = 'round_robin'
+LEAST_LATENCY = 'least_latency'
+PIN_KEY_PREFIX = 'db-pin:'
+# Weight of the newest query in a replica's moving average latency
+LATENCY_SMOOTHING = 0.2
+
+_current = ContextVar('replica_routing', default=None)
+
+
+def _replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+def _pin_seconds():
+    return getattr(settings, 'DATABASE_PRIMARY_PIN_SECONDS', 5)
+
+
+def _identity(request):
+    """
+    Key for read-your-writes pinning: the user, else the anonymous session.
+    """
+    user = getattr(request, 'user', None)
+    if isinstance(user, LazyObject) and user._wrapped is empty:
+        # Resolving the session user costs queries; DRF sets request.user
+        # before the view runs, so an unresolved one means no API user
+        user = None
+    if user is not None and user.is_authenticated:
+        return f'user:{user.pk}'
+    session = getattr(request, 'session', None)
+    if session is not None and session.session_key:
+        return f'session:{session.session_key}'
+    return None
+
+
+class RoutingState:
+    __slots__ = ('request', 'safe', 'use_replicas', 'replica', 'wrote', '_pinned')
+
+    def __init__(self, request):
+        self.request = request
+        self.safe = request.method in ('GET', 'HEAD', 'OPTIONS')
+        self.use_replicas = self.safe
+        self.replica = None
+        self.wrote = False
+        self._pinned = None
+
+    def pinned(self):
+        # Checked on the first routed read, after authentication has run
+        identity = _identity(self.request)
+        if self._pinned is None or self._pinned[0] != identity:
+            pinned = identity is not None and cache.get(PIN_KEY_PREFIX + identity) is not None
+            self._pinned = (identity, pinned)
+        return self._pinned[1]
+
+
+class ReplicaSelector:
+    """
+    Picks a replica alias; tracks per-alias latency for least-latency mode.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._turn = 0
+        self._latency = {}
+
+    def choose(self, replicas, mode=ROUND_ROBIN):
+        if len(replicas) == 1:
+            return replicas[0]
+        if mode == LEAST_LATENCY:
+            # Unmeasured replicas count as fastest so each gets sampled
+            return min(replicas, key=lambda alias: self._latency.get(alias, 0.0))
+        with self._lock:
+            self._turn += 1
+            return replicas[self._turn % len(replicas)]
+
+    def observe(self, alias, seconds):
+        with self._lock:
+            previous = self._latency.get(alias)
+            self._latency[alias] = seconds if previous is None else (
+                previous + LATENCY_SMOOTHING * (seconds - previous)
+            )
+
+    def latency(self, alias):
+        return self._latency.get(alias)
+
+    def reset(self):
+        with self._lock:
+            self._turn = 0
+            self._latency.clear()
+
+
+selector = ReplicaSelector()
+
+
+@contextmanager
+def primary_reads():
+    """
+    Route the current request's reads to the primary inside the block.
+    """
+    state = _current.get()
+    if state is None:
+        yield
+        return
+    previous, state.use_replicas = state.use_replicas, False
+    try:
+        yield
+    finally:
+        state.use_replicas = previous
+
+
+class LatencyRecorder:
+    """
+    Execute wrapper feeding a replica connection's query times to selector.
+    """
+    __slots__ = ('alias',)
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            selector.observe(self.alias, time.perf_counter() - started)
+
+
+def _record_replica_latency(sender, connection, **kwargs):
+    # Fires on every reconnect of the same wrapper; attach the recorder once
+    if connection.alias in _replicas() and not any(
+        isinstance(wrapper, LatencyRecorder) for wrapper in connection.execute_wrappers
+    ):
+        connection.execute_wrappers.append(LatencyRecorder(connection.alias))
+
+
+connection_created.connect(_record_replica_latency)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if state is None or not state.use_replicas or state.wrote:
+            return None
+        replicas = _replicas()
+        if not replicas or model._meta.app_label not in REPLICA_APPS:
+            return None
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Related lookups stay on the database the instance came from
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block or state.pinned():
+            return None
+        if state.replica not in replicas:
+            state.replica = selector.choose(
+                replicas, getattr(settings, 'DATABASE_REPLICA_SELECTION', ROUND_ROBIN)
+            )
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _current.get()
+        if state is not None and model._meta.app_label in REPLICA_APPS:
+            # Later reads in this request must see the write
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive schema changes from the primary
+        if db in _replicas():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Scopes ReplicaRouter to a request and pins writers to the primary.
+
+    Sits before SessionMiddleware so a session created by this request is
+    saved, and has its key, by the time the pin is written.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RoutingState(request)
+        token = _current.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        if state.wrote or (not state.safe and response.status_code < 400):
+            identity = _identity(request)
+            if identity is not None:
+                cache.set(PIN_KEY_PREFIX + identity, 1, _pin_seconds())
+        return response
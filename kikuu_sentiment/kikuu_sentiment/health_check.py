@@ -1,10 +1,11 @@
 """
 Health check views for monitoring system status
 """
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.db import connection
 from django.conf import settings
 import logging
+from .metrics import registry
 
 logger = logging.getLogger(__name__)
 
@@ -91,3 +92,12 @@ def detailed_health_check(request):
             "status": "unhealthy",
             "error": str(e)
         }, status=503)
+
+def metrics(request):
+    """
+    Per-view request metrics in Prometheus text format
+    """
+    return HttpResponse(
+        registry.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
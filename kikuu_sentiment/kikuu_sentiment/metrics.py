@@ -0,0 +1,247 @@
+"""
+Per-view request metrics.
+
+RequestMetricsMiddleware records latency, SQL query count, DB time and
+response size for every request, keyed by the resolved URL name and method,
+into in-process histograms. The registry is rendered in Prometheus text
+format by health_check.metrics. Queries are observed through database
+execute wrappers, so this works with DEBUG off and costs a couple of
+perf_counter() calls per query.
+
+Requests that run the same SQL template many times are counted as likely
+N+1 patterns and logged once per (view, template).
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# A template repeated this many times in one request is reported as N+1
+N_PLUS_ONE_THRESHOLD = getattr(settings, 'METRICS_N_PLUS_ONE_THRESHOLD', 10)
+UNRESOLVED_VIEW = '<unresolved>'
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+
+class ViewMetrics:
+    __slots__ = ('latency', 'queries', 'db_time', 'response_size', 'statuses', 'n_plus_one')
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.db_time = Histogram(LATENCY_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+        self.statuses = {}
+        self.n_plus_one = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+        self._reported_templates = set()
+
+    def record(self, view, method, status, latency, queries, db_time, size, repeated):
+        key = (view, method)
+        with self._lock:
+            metrics = self._views.get(key)
+            if metrics is None:
+                metrics = self._views[key] = ViewMetrics()
+            metrics.latency.observe(latency)
+            metrics.queries.observe(queries)
+            metrics.db_time.observe(db_time)
+            if size is not None:
+                metrics.response_size.observe(size)
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            if repeated:
+                metrics.n_plus_one += 1
+                new_templates = [sql for sql, _ in repeated if (view, sql) not in self._reported_templates]
+                self._reported_templates.update((view, sql) for sql in new_templates)
+            else:
+                new_templates = ()
+        for sql in new_templates:
+            count = dict(repeated)[sql]
+            logger.warning("Possible N+1 in %s %s: query ran %d times: %s", method, view, count, sql)
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+            self._reported_templates.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {key: _copy_metrics(metrics) for key, metrics in self._views.items()}
+
+    def render_prometheus(self):
+        views = self.snapshot()
+        lines = []
+
+        def histogram(name, help_text, attribute):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for (view, method), metrics in sorted(views.items()):
+                hist = getattr(metrics, attribute)
+                labels = _labels(view=view, method=method)
+                for bound, total in hist.cumulative():
+                    le = '+Inf' if bound == float('inf') else _format_number(bound)
+                    lines.append(f'{name}_bucket{_labels(view=view, method=method, le=le)} {total}')
+                lines.append(f'{name}_sum{labels} {_format_number(hist.sum)}')
+                lines.append(f'{name}_count{labels} {hist.count}')
+
+        lines.append('# HELP kikuu_http_requests_total Requests by view, method and status.')
+        lines.append('# TYPE kikuu_http_requests_total counter')
+        for (view, method), metrics in sorted(views.items()):
+            for status, count in sorted(metrics.statuses.items()):
+                lines.append(
+                    f'kikuu_http_requests_total{_labels(view=view, method=method, status=status)} {count}'
+                )
+
+        histogram('kikuu_http_request_duration_seconds', 'Request latency.', 'latency')
+        histogram('kikuu_http_request_queries', 'SQL queries per request.', 'queries')
+        histogram('kikuu_http_request_db_seconds', 'Time spent in SQL per request.', 'db_time')
+        histogram('kikuu_http_response_size_bytes', 'Response body size.', 'response_size')
+
+        lines.append('# HELP kikuu_http_n_plus_one_total Requests that repeated one SQL template '
+                     f'at least {N_PLUS_ONE_THRESHOLD} times.')
+        lines.append('# TYPE kikuu_http_n_plus_one_total counter')
+        for (view, method), metrics in sorted(views.items()):
+            lines.append(f'kikuu_http_n_plus_one_total{_labels(view=view, method=method)} {metrics.n_plus_one}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _copy_metrics(metrics):
+    copy = ViewMetrics()
+    for attribute in ('latency', 'queries', 'db_time', 'response_size'):
+        source, target = getattr(metrics, attribute), getattr(copy, attribute)
+        target.counts = list(source.counts)
+        target.sum = source.sum
+        target.count = source.count
+    copy.statuses = dict(metrics.statuses)
+    copy.n_plus_one = metrics.n_plus_one
+    return copy
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(**labels):
+    escaped = (
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in labels.items()
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+registry = MetricsRegistry()
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper counting queries, DB time and SQL templates.
+    """
+    __slots__ = ('count', 'duration', 'templates')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.templates = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.templates[sql] = self.templates.get(sql, 0) + 1
+
+    def repeated(self, threshold):
+        return [(sql, count) for sql, count in self.templates.items() if count >= threshold]
+
+
+def _recording(recorder):
+    stack = ExitStack()
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(recorder))
+    return stack
+
+
+class RequestMetricsMiddleware:
+    """
+    Streaming responses run their queries while the body is iterated, so
+    they are recorded when the stream is closed rather than on return.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with _recording(recorder):
+            response = self.get_response(request)
+
+        if response.streaming and not response.is_async:
+            response.streaming_content = self._stream(
+                request, response, recorder, started, response.streaming_content
+            )
+        else:
+            size = None if response.streaming else len(response.content)
+            self._record(request, response, recorder, started, size)
+        return response
+
+    def _stream(self, request, response, recorder, started, content):
+        chunks = iter(content)
+        size = 0
+        try:
+            while True:
+                # Only the work of producing a chunk is attributed to the request
+                with _recording(recorder):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                size += len(chunk)
+                yield chunk
+        finally:
+            self._record(request, response, recorder, started, size)
+
+    def _record(self, request, response, recorder, started, size):
+        latency = time.perf_counter() - started
+        match = request.resolver_match
+        view = (match.view_name or UNRESOLVED_VIEW) if match else UNRESOLVED_VIEW
+        registry.record(
+            view, request.method, response.status_code, latency,
+            recorder.count, recorder.duration, size,
+            recorder.repeated(N_PLUS_ONE_THRESHOLD),
+        )
@@ -0,0 +1,129 @@
+"""
+Project-wide pagination.
+
+Lists are page-numbered by default. Clients can opt into keyset (cursor)
+pagination by sending a `cursor` query parameter (empty for the first page)
+on views that declare a `keyset_ordering`. Keyset pages seek directly to the
+last row seen, so they cost the same at any depth and never run COUNT(*).
+"""
+import base64
+import binascii
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset_ordering = None
+        ordering = tuple(getattr(view, 'keyset_ordering', None) or ())
+        # Keyset mode only applies when the queryset is ordered exactly on the keyset
+        if (
+            self.cursor_query_param in request.query_params
+            and ordering
+            and tuple(queryset.query.order_by) == ordering
+        ):
+            self.keyset_ordering = ordering
+            return self.paginate_keyset(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset_ordering is None:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.next_link,
+            'previous': self.previous_link,
+            'results': data,
+        })
+
+    def paginate_keyset(self, queryset, request):
+        self.request = request
+        page_size = self.get_page_size(request)
+        fields = [name.lstrip('-') for name in self.keyset_ordering]
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = self.keyset_ordering
+        if reverse:
+            ordering = tuple(self._flip(name) for name in ordering)
+        if position is not None:
+            queryset = queryset.filter(self._seek_filter(ordering, position))
+
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        has_next = has_more if not reverse else True
+        has_previous = has_more if reverse else position is not None
+
+        self.next_link = None
+        self.previous_link = None
+        if rows and has_next:
+            self.next_link = self.encode_cursor(rows[-1], fields, reverse=False)
+        if rows and has_previous:
+            self.previous_link = self.encode_cursor(rows[0], fields, reverse=True)
+        elif not rows and position is not None:
+            # Walked past either end; let the client step back the way it came
+            self.previous_link = self.encode_raw(position, reverse=not reverse)
+        return rows
+
+    def _flip(self, name):
+        return name[1:] if name.startswith('-') else f'-{name}'
+
+    def _seek_filter(self, ordering, position):
+        # (a, b) after (x, y) == a > x OR (a = x AND b > y), per-field direction aware
+        clauses = []
+        for index, name in enumerate(ordering):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            equal = {
+                ordering[prev].lstrip('-'): position[prev] for prev in range(index)
+            }
+            clauses.append(Q(**equal, **{f'{field}__{lookup}': position[index]}))
+        return reduce(or_, clauses)
+
+    def encode_cursor(self, row, fields, reverse):
+        values = [getattr(row, field) for field in fields]
+        return self.encode_raw(values, reverse)
+
+    def encode_raw(self, values, reverse):
+        payload = {
+            'p': [value.isoformat() if hasattr(value, 'isoformat') else value for value in values],
+            'r': int(reverse),
+        }
+        token = base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(',', ':')).encode()
+        ).decode().rstrip('=')
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            raw_values = payload['p']
+            fields = [name.lstrip('-') for name in self.keyset_ordering]
+            if len(raw_values) != len(fields):
+                raise ValueError
+            position = [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(fields, raw_values)
+            ]
+            return position, bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, binascii.Error, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
@@ -50,9 +50,9 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.ClaimsJWTAuthentication',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'kikuu_sentiment.pagination.KeysetPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
@@ -65,8 +65,10 @@ REST_FRAMEWORK = {
 AUTH_USER_MODEL = 'accounts.User'
 
 MIDDLEWARE = [
+    'kikuu_sentiment.metrics.RequestMetricsMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.security.SecurityMiddleware',
+    'kikuu_sentiment.db_router.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -103,9 +105,65 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'OPTIONS': {
+            # Take the write lock when a transaction starts so concurrent
+            # writers queue on the busy timeout instead of failing mid-transaction
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        'TEST': {
+            # File-backed so threaded tests get real locking between connections
+            'NAME': os.path.join(BASE_DIR, 'test_db.sqlite3'),
+        },
     }
 }
 
+# Read replicas
+# Safe-method requests read kikuu, store and carts models from these aliases
+# (see kikuu_sentiment.db_router). SQLITE_REPLICAS takes comma-separated
+# SQLite files for local testing; for PostgreSQL add the replica aliases to
+# DATABASES and list them here.
+
+for index, path in enumerate(filter(None, os.environ.get('SQLITE_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{index}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, path.strip()),
+        'OPTIONS': {'timeout': 20},
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# 'round_robin' or 'least_latency'
+DATABASE_REPLICA_SELECTION = os.environ.get('DATABASE_REPLICA_SELECTION', 'round_robin')
+# Seconds a user reads from the primary after writing
+DATABASE_PRIMARY_PIN_SECONDS = 5
+DATABASE_ROUTERS = ['kikuu_sentiment.db_router.ReplicaRouter']
+
+
+# Cache
+# Without REDIS_URL the cache lives in each process's memory. That is only
+# correct for a single process (runserver, one worker): the response cache
+# generations and replica pins are per-process, so a write only
+# invalidates cached pages in the worker that handled it. Set REDIS_URL
+# whenever more than one worker or server serves traffic.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'kikuu-sentiment',
+        }
+    }
+
+RESPONSE_CACHE_TIMEOUT = 300
+
 
 # Password validation
 # https://docs.djangoproject.com/en/1.11/ref/settings/#auth-password-validators
@@ -152,6 +210,11 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    # Embeds role/username/email so requests authenticate without a user query
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.serializers.ClaimsTokenObtainPairSerializer',
+    # Re-reads the user's claims; rotated refresh tokens are revoked in
+    # accounts.RevokedToken (see accounts/tokens.py)
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.RevocableTokenRefreshSerializer',
 }
 
 
@@ -0,0 +1,33 @@
+"""
+Shared helpers for the app test suites.
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountAssertionsMixin:
+    """
+    TestCase mixin for catching N+1 queries on list endpoints.
+    """
+
+    def assertConstantQueryCount(self, fetch, grow, sizes=(1, 5, 20)):
+        """
+        Call grow(n) to bring the data set up to n rows, then fetch(), for each
+        n in sizes. Fails unless every fetch ran the same number of queries.
+        """
+        counts = {}
+        captured = {}
+        for size in sizes:
+            grow(size)
+            with CaptureQueriesContext(connection) as queries:
+                fetch()
+            counts[size] = len(queries)
+            captured[size] = [query['sql'] for query in queries.captured_queries]
+
+        if len(set(counts.values())) > 1:
+            largest = max(sizes)
+            self.fail(
+                f"Query count grows with page size: {counts}\n"
+                f"Queries for {largest} rows:\n" + '\n'.join(captured[largest])
+            )
+        return counts[sizes[0]]
@@ -0,0 +1,342 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import User
+from kikuu.models import Review
+from carts.models import Cart
+from store.models import Category, Product
+from .db_router import LEAST_LATENCY, ReplicaRoutingMiddleware, primary_reads, selector
+from .metrics import N_PLUS_ONE_THRESHOLD, registry
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.client = APIClient()
+
+    def test_records_per_view_metrics(self):
+        self.client.get(reverse('review-stats'))
+        self.client.get(reverse('review-stats'))
+        self.client.get('/does-not-exist/')
+
+        snapshot = registry.snapshot()
+        stats = snapshot[('review-stats', 'GET')]
+        self.assertEqual(stats.latency.count, 2)
+        self.assertEqual(stats.queries.sum, 2)
+        self.assertEqual(stats.statuses, {200: 2})
+        self.assertGreater(stats.response_size.sum, 0)
+        self.assertEqual(snapshot[('<unresolved>', 'GET')].statuses, {404: 1})
+
+    def test_flags_repeated_query_templates(self):
+        # Each review author is a distinct user, loaded one query at a time
+        for index in range(N_PLUS_ONE_THRESHOLD + 1):
+            user = User.objects.create_user(
+                email=f'user{index}@test.com', username=f'user{index}', password='testpass123'
+            )
+            Review.objects.create(user=user, comment='ok')
+
+        with self.assertLogs('kikuu_sentiment.metrics', level='WARNING'):
+            self.client.get(reverse('review-list-create'))
+        self.assertEqual(registry.snapshot()[('review-list-create', 'GET')].n_plus_one, 1)
+
+    def test_streamed_responses_are_recorded_when_the_body_is_read(self):
+        user = User.objects.create_user(email='seller@test.com', username='seller', password='testpass123')
+        Review.objects.bulk_create([Review(user=user, comment=f'review {index}') for index in range(3)])
+        self.client.force_authenticate(user)
+
+        response = self.client.get(reverse('review-export', args=['csv']))
+        self.assertNotIn(('review-export', 'GET'), registry.snapshot())
+        body = b''.join(response.streaming_content)
+        response.close()
+
+        stats = registry.snapshot()[('review-export', 'GET')]
+        self.assertEqual(stats.statuses, {200: 1})
+        self.assertGreater(stats.queries.sum, 0)
+        self.assertEqual(stats.response_size.sum, len(body))
+
+    def test_prometheus_endpoint(self):
+        self.client.get(reverse('review-stats'))
+        response = self.client.get(reverse('health-metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        body = response.content.decode()
+        self.assertIn('# TYPE kikuu_http_request_duration_seconds histogram', body)
+        self.assertIn('kikuu_http_requests_total{view="review-stats",method="GET",status="200"} 1', body)
+        self.assertIn('kikuu_http_request_queries_bucket{view="review-stats",method="GET",le="+Inf"} 1', body)
+        self.assertIn('kikuu_http_n_plus_one_total{view="review-stats",method="GET"} 0', body)
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            email='seller@test.com', username='seller', password='testpass123', role='seller'
+        )
+
+    def test_hits_skip_the_database(self):
+        Review.objects.create(user=self.seller, comment='Great buyers', sentiment='positive')
+        url = reverse('review-list-create')
+        self.assertEqual(self.client.get(url, {'sentiment': 'positive', 'rating': 3})['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            # Same parameters in a different order map to the same entry
+            response = self.client.get(url, {'rating': 3, 'sentiment': 'positive'})
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['count'], 1)
+
+    def test_writes_invalidate_dependent_pages(self):
+        url = reverse('reviews-by-role', args=['seller'])
+        self.assertEqual(self.client.get(url).data['count'], 0)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            review = Review.objects.create(user=self.seller, comment='Fast payouts')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 1)
+
+        review.delete()
+        self.assertEqual(self.client.get(url).data['count'], 0)
+
+    def test_generations_are_per_model(self):
+        category = Category.objects.create(category_name='Phones')
+        url = reverse('category-list-create')
+        self.client.get(url)
+        Product.objects.create(
+            product_name='Phone', price='10.00', stock=1, category=category, user=self.seller
+        )
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        self.assertEqual(self.client.get(reverse('product-list-create')).data['count'], 1)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.seller = User.objects.create_user(
+            email='seller@test.com', username='seller', password='testpass123', role='seller'
+        )
+        self.category = Category.objects.create(category_name='Phones')
+        self.product = Product.objects.create(
+            product_name='Phone', price='10.00', stock=1, category=self.category, user=self.seller
+        )
+
+    def test_detail_not_modified_costs_one_query(self):
+        url = reverse('product-detail', args=[self.product.pk])
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+        self.product.stock = 5
+        self.product.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_category_detail(self):
+        url = reverse('category-detail', args=[self.category.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_cached_list_etag_follows_generations(self):
+        review = Review.objects.create(user=self.seller, comment='Quick delivery')
+        url = reverse('review-list-create')
+        for params in ({}, {'search': 'delivery'}):
+            etag = self.client.get(url, params)['ETag']
+            with self.assertNumQueries(0):
+                response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+        etag = self.client.get(url)['ETag']
+        review.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_uncached_list_etag_tracks_rows(self):
+        review = Review.objects.create(user=self.seller, comment='Quick delivery')
+        url = reverse('user-reviews')
+        self.client.force_authenticate(self.seller)
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        review.comment = 'Slow delivery'
+        review.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_missing_object_still_404s(self):
+        url = reverse('product-detail', args=[self.product.pk + 100])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, 404)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        selector.reset()
+        self.factory = RequestFactory()
+        self.user = User(pk=7, role='buyer')
+
+    def serve(self, method, models=(Product,), user=None, session_key=None, status=200, write=None, **hints):
+        """
+        Run a request through the middleware and return where each model was read.
+        """
+        request = getattr(self.factory, method)('/')
+        request.user = user or AnonymousUser()
+        if session_key:
+            request.session = mock.Mock(session_key=session_key)
+        chosen = []
+
+        def view(request):
+            if write is not None:
+                router.db_for_write(write)
+            chosen.extend(router.db_for_read(model, **hints) for model in models)
+            return HttpResponse(status=status)
+
+        ReplicaRoutingMiddleware(view)(request)
+        return chosen
+
+    def test_safe_requests_read_routed_apps_from_replicas(self):
+        # One replica per request, alternating between requests
+        self.assertEqual(self.serve('get', [Product, Review, Cart]), ['replica2'] * 3)
+        self.assertEqual(self.serve('get', [Product, Review]), ['replica1'] * 2)
+        self.assertEqual(self.serve('head', [User]), ['default'])
+        self.assertEqual(self.serve('post'), ['default'])
+        # Outside a request everything stays on the primary
+        self.assertEqual(router.db_for_read(Product), 'default')
+
+    def test_writers_are_pinned_to_the_primary(self):
+        self.serve('post', user=self.user)
+        self.assertEqual(self.serve('get', user=self.user), ['default'])
+        self.assertEqual(self.serve('get', user=User(pk=8)), ['replica2'])
+
+        cache.clear()  # pin expired
+        self.assertEqual(self.serve('get', user=self.user), ['replica1'])
+
+    def test_failed_writes_do_not_pin(self):
+        self.serve('post', user=self.user, status=400)
+        self.assertEqual(self.serve('get', user=self.user), ['replica2'])
+
+    def test_reads_after_a_write_in_the_same_request_use_the_primary(self):
+        self.assertEqual(self.serve('get', [Product], user=self.user, write=Cart), ['default'])
+        self.assertEqual(self.serve('get', user=self.user), ['default'])
+
+    def test_anonymous_sessions_are_pinned(self):
+        self.serve('post', session_key='abc')
+        self.assertEqual(self.serve('get', session_key='abc'), ['default'])
+        self.assertEqual(self.serve('get', session_key='xyz'), ['replica2'])
+
+    def test_transactions_and_loaded_instances_stay_on_their_database(self):
+        with mock.patch.object(connections['default'], 'in_atomic_block', True):
+            self.assertEqual(self.serve('get'), ['default'])
+
+        product = Product(pk=1)
+        product._state.db = 'default'
+        self.assertEqual(self.serve('get', [Review], instance=product), ['default'])
+
+    def test_primary_reads_block(self):
+        request = self.factory.get('/')
+        request.user = AnonymousUser()
+        chosen = []
+
+        def view(request):
+            with primary_reads():
+                chosen.append(router.db_for_read(Product))
+            chosen.append(router.db_for_read(Product))
+            return HttpResponse()
+
+        ReplicaRoutingMiddleware(view)(request)
+        self.assertEqual(chosen, ['default', 'replica2'])
+
+    @override_settings(DATABASE_REPLICA_SELECTION=LEAST_LATENCY)
+    def test_least_latency_prefers_the_fastest_replica(self):
+        selector.observe('replica1', 0.004)
+        selector.observe('replica2', 0.001)
+        self.assertEqual(self.serve('get', [Product, Product]), ['replica2', 'replica2'])
+
+        # The moving average follows a replica that slows down
+        for _ in range(20):
+            selector.observe('replica2', 0.010)
+        self.assertEqual(self.serve('get'), ['replica1'])
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        self.assertEqual(self.serve('get'), ['default'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaLagTests(TransactionTestCase):
+    """
+    End to end against a second SQLite file standing in for a lagging
+    replica: it holds a copy of the primary taken in setUp and sees nothing
+    written afterwards.
+    """
+    def setUp(self):
+        cache.clear()
+        selector.reset()
+        self.buyer = User.objects.create_user(
+            email='buyer@test.com', username='buyer', password='testpass123', role='buyer'
+        )
+        self.seller = User.objects.create_user(
+            email='seller@test.com', username='seller', password='testpass123', role='seller'
+        )
+        self.old = Review.objects.create(user=self.buyer, comment='Old review')
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        primary = connections['default']
+        primary.ensure_connection()
+        path = os.path.join(directory, 'replica.sqlite3')
+        snapshot = sqlite3.connect(path)
+        primary.connection.backup(snapshot)
+        snapshot.close()
+
+        # Not in DATABASES, so the test runner neither creates nor blocks it
+        replica = primary.__class__(
+            {**primary.settings_dict, 'NAME': path, 'OPTIONS': {'timeout': 20}}, alias='replica'
+        )
+        connections['replica'] = replica
+        self.addCleanup(connections.__delitem__, 'replica')
+        self.addCleanup(replica.close)
+
+        self.writer = APIClient()
+        self.writer.force_authenticate(self.seller)
+        self.reader = APIClient()
+
+    def test_reads_come_from_the_replica(self):
+        new = Review.objects.create(user=self.buyer, comment='Written after the snapshot')
+        self.assertEqual(self.reader.get(reverse('review-detail', args=[self.old.pk])).status_code, 200)
+        self.assertEqual(self.reader.get(reverse('review-detail', args=[new.pk])).status_code, 404)
+
+    def test_writers_read_their_own_writes(self):
+        response = self.writer.post(reverse('review-list-create'), {'comment': 'Fresh', 'rating': 4}, format='json')
+        self.assertEqual(response.status_code, 201)
+        url = reverse('review-detail', args=[Review.objects.get(comment='Fresh').pk])
+
+        self.assertEqual(self.writer.get(url).status_code, 200)
+        self.assertEqual(self.writer.get(reverse('user-reviews')).data['count'], 1)
+        # Other users still read the lagging replica
+        self.assertEqual(self.reader.get(url).status_code, 404)
+
+    def test_cached_pages_are_built_from_the_primary(self):
+        response = self.writer.post(reverse('review-list-create'), {'comment': 'Fresh', 'rating': 4}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        # An unpinned reader misses first; the page it caches must hold the write
+        miss = self.reader.get(reverse('review-list-create'))
+        self.assertEqual((miss['X-Cache'], miss.data['count']), ('MISS', 2))
+        hit = self.writer.get(reverse('review-list-create'))
+        self.assertEqual((hit['X-Cache'], hit.data['count']), ('HIT', 2))
+        self.assertEqual(hit['ETag'], miss['ETag'])
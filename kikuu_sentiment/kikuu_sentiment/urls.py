@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.urls import path, include
-from .health_check import health_check, detailed_health_check
+from .health_check import health_check, detailed_health_check, metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -8,6 +8,7 @@ urlpatterns = [
     # Health check endpoints
     path('health/', health_check, name='health-check'),
     path('health/detailed/', detailed_health_check, name='detailed-health-check'),
+    path('health/metrics/', metrics, name='health-metrics'),
 
     # API endpoints
     path('api/accounts/', include('accounts.urls')),
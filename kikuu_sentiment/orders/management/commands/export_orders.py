@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from kikuu_sentiment.export import EXPORT_FORMATS, iter_export
+from orders.models import Order
+from orders.serializers import ORDER_LINE_EXPORT_COLUMNS, order_lines_for_export
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Stream placed order lines to CSV or NDJSON, optionally for one seller."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', dest='export_format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', help="File to write (default: stdout).")
+        parser.add_argument('--seller', help="Only lines for products of the seller with this email.")
+        parser.add_argument('--status', choices=[value for value, _ in Order.STATUS_CHOICES])
+
+    def handle(self, *args, **options):
+        seller = None
+        if options['seller']:
+            try:
+                seller = User.objects.get(email=options['seller'], role='seller')
+            except User.DoesNotExist:
+                raise CommandError(f"No seller with email {options['seller']}.")
+
+        lines = order_lines_for_export(seller=seller, status=options['status'])
+        chunks = iter_export(lines, ORDER_LINE_EXPORT_COLUMNS, options['export_format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as handle:
+                handle.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -1,8 +1,12 @@
 from django.utils import timezone
 from django.db import models
 from django.conf import settings
+from decimal import Decimal
 from store.models import Product
 
+# Flat tax added to every order and cart summary
+TAX_RATE = Decimal('0.10')
+
 
 class Payment(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -16,6 +20,20 @@ class Payment(models.Model):
         return self.payment_id
 
 
+class OrderQuerySet(models.QuerySet):
+    def with_details(self):
+        """
+        Load everything OrderSerializer renders (user, payment, lines and
+        their products) in a fixed number of queries, whatever the page size.
+        """
+        return self.select_related('user', 'payment').prefetch_related(
+            models.Prefetch(
+                'orderproduct_set',
+                queryset=OrderProduct.objects.select_related('product').order_by('id'),
+            )
+        )
+
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -43,6 +61,14 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='orders_order_user_created_idx'),
+            models.Index(fields=['-created_at', '-id'], name='orders_order_created_idx'),
+        ]
+
     def __str__(self):
         return self.order_number or str(self.id)
 
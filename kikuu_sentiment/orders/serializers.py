@@ -1,8 +1,43 @@
 from rest_framework import serializers
-from .models import Order, OrderProduct, Payment
+from .models import TAX_RATE, Order, OrderProduct, Payment
 from store.models import Product
 from accounts.models import User
 from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import F
+from django.db.models.functions import Now
+from kikuu_sentiment.cache import bump_generation_on_commit
+
+# One row per order line: (values_list lookup, column name) pairs for exports
+ORDER_LINE_EXPORT_COLUMNS = [
+    ('order__order_number', 'order_number'),
+    ('order__created_at', 'order_created_at'),
+    ('order__status', 'status'),
+    ('order__first_name', 'first_name'),
+    ('order__last_name', 'last_name'),
+    ('order__email', 'email'),
+    ('order__phone', 'phone'),
+    ('order__district', 'district'),
+    ('order__sector', 'sector'),
+    ('order__cell', 'cell'),
+    ('order__order_total', 'order_total'),
+    ('order__tax', 'tax'),
+    ('product_id', 'product_id'),
+    ('product__product_name', 'product_name'),
+    ('quantity', 'quantity'),
+    ('product_price', 'product_price'),
+]
+
+def order_lines_for_export(seller=None, status=None):
+    """
+    Placed order lines, newest order first; only seller's products if given.
+    """
+    lines = OrderProduct.objects.filter(order__is_ordered=True)
+    if seller is not None:
+        lines = lines.filter(product__user=seller)
+    if status:
+        lines = lines.filter(order__status=status)
+    return lines.order_by('-order__created_at', '-order_id', 'id')
 
 class PaymentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -56,66 +91,100 @@ class OrderCreateSerializer(serializers.ModelSerializer):
     def validate_order_items(self, value):
         if not value:
             raise serializers.ValidationError("Order must contain at least one item.")
-        
+
+        # Merge repeated products so each one is checked and decremented once
+        quantities = {}
         for item in value:
             if 'product_id' not in item or 'quantity' not in item:
                 raise serializers.ValidationError("Each item must have 'product_id' and 'quantity'.")
-            
             try:
-                product = Product.objects.get(id=item['product_id'])
-                if not product.is_available:
-                    raise serializers.ValidationError(f"Product '{product.product_name}' is not available.")
-                if product.stock < item['quantity']:
-                    raise serializers.ValidationError(f"Insufficient stock for '{product.product_name}'.")
-            except Product.DoesNotExist:
-                raise serializers.ValidationError(f"Product with ID {item['product_id']} does not exist.")
-        
-        return value
-    
+                product_id = int(item['product_id'])
+                quantity = int(item['quantity'])
+            except (TypeError, ValueError):
+                raise serializers.ValidationError("'product_id' and 'quantity' must be integers.")
+            if quantity < 1:
+                raise serializers.ValidationError("Quantity must be at least 1.")
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+
+        # One query for every product in the order
+        products = Product.objects.in_bulk(list(quantities))
+        for product_id, quantity in quantities.items():
+            product = products.get(product_id)
+            if product is None:
+                raise serializers.ValidationError(f"Product with ID {product_id} does not exist.")
+            if not product.is_available:
+                raise serializers.ValidationError(f"Product '{product.product_name}' is not available.")
+            if product.stock < quantity:
+                raise serializers.ValidationError(f"Insufficient stock for '{product.product_name}'.")
+
+        self._products = products
+        return [
+            {'product_id': product_id, 'quantity': quantity}
+            for product_id, quantity in quantities.items()
+        ]
+
     def create(self, validated_data):
         order_items = validated_data.pop('order_items')
-        user = self.context['request'].user
-        
-        # Calculate order total
-        total = Decimal('0.00')
-        for item in order_items:
-            product = Product.objects.get(id=item['product_id'])
-            total += product.price * item['quantity']
-
-        # Calculate tax (10%)
-        tax = total * Decimal('0.10')
-        order_total = total + tax
-        
-        # Create order
-        order = Order.objects.create(
-            user=user,
-            order_total=order_total,
-            tax=tax,
-            ip=self.context['request'].META.get('REMOTE_ADDR', ''),
-            **validated_data
-        )
-        
-        # Generate order number
-        order.order_number = f"ORD-{order.id:06d}"
-        order.save()
-        
-        # Create order products
-        for item in order_items:
-            product = Product.objects.get(id=item['product_id'])
-            OrderProduct.objects.create(
-                order=order,
+        request = self.context['request']
+        user = request.user
+        quantities = {item['product_id']: item['quantity'] for item in order_items}
+        product_ids = sorted(quantities)
+
+        with transaction.atomic():
+            products = self._products
+            if connection.features.has_select_for_update:
+                # Lock the rows in primary-key order so concurrent checkouts cannot deadlock
+                products = Product.objects.select_for_update().order_by('pk').in_bulk(product_ids)
+
+            # Conditional decrements: a row only changes if enough stock is left
+            for product_id in product_ids:
+                quantity = quantities[product_id]
+                updated = Product.objects.filter(
+                    pk=product_id, is_available=True, stock__gte=quantity
+                ).update(stock=F('stock') - quantity, updated_at=Now())
+                if not updated:
+                    raise serializers.ValidationError({
+                        'order_items': [f"Insufficient stock for '{products[product_id].product_name}'."]
+                    })
+            Product.objects.filter(pk__in=product_ids, stock=0).update(is_available=False, updated_at=Now())
+            # Queryset updates skip post_save, so invalidate cached product pages explicitly
+            bump_generation_on_commit(Product)
+
+            # Calculate order total
+            total = sum(
+                (products[product_id].price * quantity for product_id, quantity in quantities.items()),
+                Decimal('0.00')
+            )
+
+            # Calculate tax (10%)
+            tax = total * TAX_RATE
+            order_total = total + tax
+
+            # Create order
+            order = Order.objects.create(
                 user=user,
-                product=product,
-                quantity=item['quantity'],
-                product_price=product.price
+                order_total=order_total,
+                tax=tax,
+                ip=request.META.get('REMOTE_ADDR', ''),
+                **validated_data
             )
-            
-            # Update product stock
-            product.stock -= item['quantity']
-            if product.stock <= 0:
-                product.is_available = False
-            product.save()
-        
+
+            # Generate order number
+            order.order_number = f"ORD-{order.id:06d}"
+            order.save(update_fields=['order_number'])
+
+            # Create order products
+            OrderProduct.objects.bulk_create([
+                OrderProduct(
+                    order=order,
+                    user=user,
+                    product=products[product_id],
+                    quantity=quantity,
+                    product_price=products[product_id].price
+                )
+                for product_id, quantity in quantities.items()
+            ])
+
         return order
 
 class OrderUpdateSerializer(serializers.ModelSerializer):
@@ -1,3 +1,244 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+import threading
+from decimal import Decimal
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from accounts.models import User
+from kikuu_sentiment.testing import QueryCountAssertionsMixin
+from store.models import Category, Product
+from .models import Order, OrderProduct, Payment
 
-# Create your tests here.
+
+class OrderTestData:
+    def setUp(self):
+        self.buyer = User.objects.create_user(
+            email='buyer@test.com', username='buyer', password='testpass123', role='buyer'
+        )
+        self.seller = User.objects.create_user(
+            email='seller@test.com', username='seller', password='testpass123', role='seller'
+        )
+        self.category = Category.objects.create(category_name='Phones')
+        self.products = [
+            Product.objects.create(
+                product_name=f'Phone {index}', price=Decimal('100.00'), stock=1000,
+                category=self.category, user=self.seller,
+            )
+            for index in range(3)
+        ]
+
+    def create_order(self, **extra):
+        payment = Payment.objects.create(
+            user=self.buyer, payment_id='pay', payment_method='card',
+            amount_paid='220.00', status='paid',
+        )
+        order = Order.objects.create(
+            user=self.buyer, payment=payment, first_name='Test', last_name='Buyer',
+            email='buyer@test.com', phone='0780000000', district='Gasabo', sector='Remera',
+            cell='Rukiri', order_total=Decimal('220.00'), tax=Decimal('20.00'),
+            ip='127.0.0.1', is_ordered=True, **extra
+        )
+        for product in self.products[:2]:
+            OrderProduct.objects.create(
+                order=order, user=self.buyer, product=product,
+                quantity=1, product_price=product.price,
+            )
+        return order
+
+    def grow_orders(self, size):
+        while Order.objects.count() < size:
+            self.create_order()
+
+
+class OrderListQueryCountTests(OrderTestData, QueryCountAssertionsMixin, TestCase):
+    def fetch(self, user, url_name):
+        client = APIClient()
+        client.force_authenticate(user)
+
+        def fetch():
+            response = client.get(reverse(url_name))
+            self.assertEqual(response.status_code, 200)
+            return response
+        return fetch
+
+    def test_order_list_query_count_is_constant(self):
+        self.assertConstantQueryCount(self.fetch(self.buyer, 'order-list-create'), self.grow_orders)
+
+    def test_order_history_query_count_is_constant(self):
+        self.assertConstantQueryCount(self.fetch(self.buyer, 'user-order-history'), self.grow_orders)
+
+    def test_seller_orders_query_count_is_constant(self):
+        self.assertConstantQueryCount(self.fetch(self.seller, 'seller-orders'), self.grow_orders)
+
+    def test_order_payload_includes_nested_details(self):
+        self.create_order()
+        client = APIClient()
+        client.force_authenticate(self.buyer)
+        order = client.get(reverse('order-list-create')).data['results'][0]
+        self.assertEqual(order['user_email'], 'buyer@test.com')
+        self.assertEqual(order['payment_details']['payment_method'], 'card')
+        self.assertEqual(
+            [line['product_name'] for line in order['order_products']], ['Phone 0', 'Phone 1']
+        )
+
+
+class OrderStatsTests(OrderTestData, TestCase):
+    def test_buyer_totals(self):
+        self.create_order(status='completed')
+        self.create_order(status='completed')
+        self.create_order()
+        client = APIClient()
+        client.force_authenticate(self.buyer)
+        with self.assertNumQueries(1):
+            response = client.get(reverse('order-stats'))
+        self.assertEqual(response.data, {
+            'total_orders': 3,
+            'completed_orders': 2,
+            'pending_orders': 1,
+            'total_spent': 440.0,
+            'average_order_value': 220.0,
+        })
+
+    def test_seller_stats_use_constant_queries(self):
+        other_seller = User.objects.create_user(
+            email='other@test.com', username='other', password='testpass123', role='seller'
+        )
+        foreign = Product.objects.create(
+            product_name='Other phone', price=Decimal('50.00'), stock=10,
+            category=self.category, user=other_seller,
+        )
+        for _ in range(4):
+            order = self.create_order()
+            OrderProduct.objects.create(
+                order=order, user=self.buyer, product=foreign, quantity=3, product_price=foreign.price
+            )
+        OrderProduct.objects.filter(product=self.products[1]).update(quantity=2)
+
+        client = APIClient()
+        client.force_authenticate(self.seller)
+        with self.assertNumQueries(4):
+            response = client.get(reverse('order-stats'))
+        seller_stats = response.data['seller_stats']
+        self.assertEqual(seller_stats['orders_with_my_products'], 4)
+        self.assertEqual(seller_stats['units_sold'], 12)
+        self.assertEqual(seller_stats['total_revenue'], 1200.0)
+        self.assertEqual(
+            [(row['product_name'], row['units_sold'], row['revenue']) for row in seller_stats['top_products']],
+            [('Phone 1', 8, 800.0), ('Phone 0', 4, 400.0)],
+        )
+        self.assertEqual(len(seller_stats['daily_revenue']), 1)
+        self.assertEqual(seller_stats['daily_revenue'][0]['revenue'], 1200.0)
+        self.assertEqual(seller_stats['daily_revenue'][0]['orders'], 4)
+
+
+class ConcurrentOrderPlacementTests(TransactionTestCase):
+    threads = 12
+    initial_stock = 5
+
+    def setUp(self):
+        seller = User.objects.create_user(
+            email='seller@test.com', username='seller', password='testpass123', role='seller'
+        )
+        self.buyers = [
+            User.objects.create_user(
+                email=f'buyer{index}@test.com', username=f'buyer{index}',
+                password='testpass123', role='buyer'
+            )
+            for index in range(self.threads)
+        ]
+        category = Category.objects.create(category_name='Phones')
+        self.product = Product.objects.create(
+            product_name='Limited phone', price=Decimal('100.00'), stock=self.initial_stock,
+            category=category, user=seller,
+        )
+
+    def place_order(self, buyer, barrier, results):
+        client = APIClient()
+        client.force_authenticate(buyer)
+        try:
+            barrier.wait()
+            response = client.post(reverse('order-list-create'), {
+                'first_name': 'Test', 'last_name': 'Buyer', 'email': buyer.email,
+                'phone': '0780000000', 'district': 'Gasabo', 'sector': 'Remera', 'cell': 'Rukiri',
+                'order_items': [{'product_id': self.product.pk, 'quantity': 1}],
+            }, format='json', REMOTE_ADDR='127.0.0.1')
+            results.append(response.status_code)
+        finally:
+            connection.close()
+
+    def test_concurrent_checkouts_never_oversell(self):
+        barrier = threading.Barrier(self.threads)
+        results = []
+        workers = [
+            threading.Thread(target=self.place_order, args=(buyer, barrier, results))
+            for buyer in self.buyers
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.product.refresh_from_db()
+        sold = OrderProduct.objects.filter(product=self.product).aggregate(total=Sum('quantity'))['total']
+        self.assertEqual(sorted(set(results)), [201, 400])
+        self.assertEqual(results.count(201), self.initial_stock)
+        self.assertEqual(sold, self.initial_stock)
+        self.assertEqual(Order.objects.count(), self.initial_stock)
+        self.assertEqual(self.product.stock, 0)
+        self.assertFalse(self.product.is_available)
+
+
+class SellerOrderExportTests(OrderTestData, QueryCountAssertionsMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.seller)
+        other_seller = User.objects.create_user(
+            email='other@test.com', username='other', password='testpass123', role='seller'
+        )
+        # Shares an order with this seller's products but must not be exported
+        self.products[1].user = other_seller
+        self.products[1].save()
+
+    def export(self, export_format, **params):
+        response = self.client.get(reverse('seller-orders-export', args=[export_format]), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_has_one_row_per_own_line(self):
+        order = self.create_order()
+        self.create_order(status='completed')
+        rows = list(csv.DictReader(io.StringIO(self.export('csv', status='pending'))))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['order_number'], order.order_number or '')
+        self.assertEqual(rows[0]['product_name'], 'Phone 0')
+        self.assertEqual(rows[0]['product_price'], '100.00')
+
+    def test_ndjson_streams_in_constant_queries(self):
+        def fetch():
+            return self.export('ndjson')
+        self.assertConstantQueryCount(fetch, self.grow_orders, sizes=(1, 10))
+        lines = [json.loads(line) for line in self.export('ndjson').splitlines()]
+        self.assertEqual(len(lines), 10)
+        self.assertEqual(lines[0]['tax'], '20.00')
+
+    def test_rejects_buyers_and_unknown_formats(self):
+        self.assertEqual(self.client.get(reverse('seller-orders-export', args=['xlsx'])).status_code, 404)
+        self.client.force_authenticate(self.buyer)
+        self.assertEqual(self.client.get(reverse('seller-orders-export', args=['csv'])).status_code, 403)
+
+    def test_command_writes_file(self):
+        self.create_order()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'orders.csv')
+            call_command('export_orders', '--output', path)
+            with open(path, newline='') as handle:
+                rows = list(csv.DictReader(handle))
+        self.assertEqual(sorted(row['product_name'] for row in rows), ['Phone 0', 'Phone 1'])
@@ -4,6 +4,7 @@ from .views import (
     OrderDetailAPIView,
     UserOrderHistoryAPIView,
     SellerOrdersAPIView,
+    SellerOrderExportAPIView,
     OrderStatsAPIView
 )
 
@@ -15,6 +16,7 @@ urlpatterns = [
     # User-specific order views
     path('my-orders/', UserOrderHistoryAPIView.as_view(), name='user-order-history'),
     path('seller-orders/', SellerOrdersAPIView.as_view(), name='seller-orders'),
+    path('seller-orders/export/<str:export_format>/', SellerOrderExportAPIView.as_view(), name='seller-orders-export'),
     
     # Order statistics
     path('orders/stats/', OrderStatsAPIView.as_view(), name='order-stats'),
@@ -1,13 +1,19 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
-from rest_framework.exceptions import PermissionDenied
-from django.db.models import Q
+from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.views import APIView
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
 from .models import Order, OrderProduct, Payment
 from .serializers import (
+    ORDER_LINE_EXPORT_COLUMNS, order_lines_for_export,
     OrderSerializer, OrderCreateSerializer, OrderUpdateSerializer,
     OrderProductSerializer, PaymentSerializer
 )
+from kikuu_sentiment.export import EXPORT_FORMATS, streaming_export_response
 import logging
+from datetime import timedelta
 from decimal import Decimal
 
 logger = logging.getLogger(__name__)
@@ -18,17 +24,18 @@ class OrderListCreateAPIView(generics.ListCreateAPIView):
     Only authenticated users can access.
     """
     permission_classes = [permissions.IsAuthenticated]
+    keyset_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         user = self.request.user
-        queryset = Order.objects.filter(user=user)
+        queryset = Order.objects.with_details().filter(user=user)
 
         # Filter by status if specified
         status_filter = self.request.query_params.get('status', None)
         if status_filter:
             queryset = queryset.filter(status=status_filter)
 
-        return queryset.order_by('-created_at')
+        return queryset.order_by('-created_at', '-id')
 
     def get_serializer_class(self):
         if self.request.method == 'POST':
@@ -48,7 +55,7 @@ class OrderDetailAPIView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return Order.objects.with_details().filter(user=self.request.user)
 
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -61,12 +68,13 @@ class UserOrderHistoryAPIView(generics.ListAPIView):
     """
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    keyset_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
-        return Order.objects.filter(
+        return Order.objects.with_details().filter(
             user=self.request.user,
             is_ordered=True
-        ).order_by('-created_at')
+        ).order_by('-created_at', '-id')
 
 class SellerOrdersAPIView(generics.ListAPIView):
     """
@@ -75,6 +83,7 @@ class SellerOrdersAPIView(generics.ListAPIView):
     """
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    keyset_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         user = self.request.user
@@ -84,59 +93,117 @@ class SellerOrdersAPIView(generics.ListAPIView):
             raise PermissionDenied("Only sellers can access this endpoint.")
 
         # Get orders containing products from this seller
-        return Order.objects.filter(
+        return Order.objects.with_details().filter(
             orderproduct__product__user=user,
             is_ordered=True
-        ).distinct().order_by('-created_at')
+        ).distinct().order_by('-created_at', '-id')
+
+class SellerOrderExportAPIView(APIView):
+    """
+    Stream the authenticated seller's order lines as CSV or NDJSON.
+    Optional ?status= filter. Only accessible by sellers.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, export_format):
+        user = request.user
+        if not hasattr(user, 'role') or user.role != 'seller':
+            raise PermissionDenied("Only sellers can access this endpoint.")
+        if export_format not in EXPORT_FORMATS:
+            raise NotFound("Unknown export format.")
+
+        lines = order_lines_for_export(seller=user, status=request.query_params.get('status'))
+        return streaming_export_response(lines, ORDER_LINE_EXPORT_COLUMNS, export_format, 'seller-orders')
 
 class OrderStatsAPIView(generics.GenericAPIView):
     """
     Get order statistics for the authenticated user.
+    Sellers also get revenue, units sold, top products and a daily revenue
+    series for the last `days` days (default 30, max 365).
     """
     permission_classes = [permissions.IsAuthenticated]
+    top_products_limit = 5
 
     def get(self, request):
         user = request.user
 
-        # Basic order stats
-        total_orders = Order.objects.filter(user=user).count()
-        completed_orders = Order.objects.filter(user=user, status='completed').count()
-        pending_orders = Order.objects.filter(user=user, status='pending').count()
-
-        # Calculate total spent
-        completed_order_totals = Order.objects.filter(
-            user=user,
-            status='completed'
-        ).values_list('order_total', flat=True)
-        total_spent = sum(completed_order_totals) if completed_order_totals else 0
+        # Basic order stats in a single aggregate query
+        totals = Order.objects.filter(user=user).aggregate(
+            total_orders=Count('id'),
+            completed_orders=Count('id', filter=Q(status='completed')),
+            pending_orders=Count('id', filter=Q(status='pending')),
+            total_spent=Sum('order_total', filter=Q(status='completed')),
+        )
+        completed_orders = totals['completed_orders']
+        total_spent = totals['total_spent'] or Decimal('0.00')
 
         stats = {
-            'total_orders': total_orders,
+            'total_orders': totals['total_orders'],
             'completed_orders': completed_orders,
-            'pending_orders': pending_orders,
+            'pending_orders': totals['pending_orders'],
             'total_spent': float(total_spent),
             'average_order_value': float(total_spent / completed_orders) if completed_orders > 0 else 0
         }
 
         # If user is a seller, add seller-specific stats
         if hasattr(user, 'role') and user.role == 'seller':
-            from django.db import models
-
-            seller_orders = Order.objects.filter(
-                orderproduct__product__user=user,
-                is_ordered=True
-            ).distinct()
-
-            seller_revenue = sum([
-                order.orderproduct_set.filter(product__user=user).aggregate(
-                    total=models.Sum(models.F('quantity') * models.F('product_price'))
-                )['total'] or Decimal('0.00')
-                for order in seller_orders
-            ])
-
-            stats['seller_stats'] = {
-                'orders_with_my_products': seller_orders.count(),
-                'total_revenue': float(seller_revenue)
-            }
+            stats['seller_stats'] = self.get_seller_stats(user, self.get_days(request))
 
         return Response(stats)
+
+    def get_days(self, request):
+        days = request.query_params.get('days', '30')
+        if not days.isdigit():
+            return 30
+        return min(max(int(days), 1), 365)
+
+    def get_seller_stats(self, user, days):
+        line_revenue = ExpressionWrapper(
+            F('quantity') * F('product_price'),
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        )
+        lines = OrderProduct.objects.filter(product__user=user, order__is_ordered=True)
+
+        summary = lines.aggregate(
+            orders=Count('order', distinct=True),
+            revenue=Sum(line_revenue),
+            units=Sum('quantity'),
+        )
+
+        top_products = lines.values('product_id', 'product__product_name').annotate(
+            units_sold=Sum('quantity'),
+            revenue=Sum(line_revenue),
+        ).order_by('-revenue', 'product_id')[:self.top_products_limit]
+
+        since = timezone.now() - timedelta(days=days)
+        daily = lines.filter(order__created_at__gte=since).annotate(
+            day=TruncDate('order__created_at')
+        ).values('day').annotate(
+            orders=Count('order', distinct=True),
+            units_sold=Sum('quantity'),
+            revenue=Sum(line_revenue),
+        ).order_by('day')
+
+        return {
+            'orders_with_my_products': summary['orders'],
+            'total_revenue': float(summary['revenue'] or 0),
+            'units_sold': summary['units'] or 0,
+            'top_products': [
+                {
+                    'product_id': row['product_id'],
+                    'product_name': row['product__product_name'],
+                    'units_sold': row['units_sold'],
+                    'revenue': float(row['revenue']),
+                }
+                for row in top_products
+            ],
+            'daily_revenue': [
+                {
+                    'date': row['day'].isoformat(),
+                    'orders': row['orders'],
+                    'units_sold': row['units_sold'],
+                    'revenue': float(row['revenue']),
+                }
+                for row in daily
+            ],
+        }
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class StoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'store'
+
+    def ready(self):
+        from kikuu_sentiment.cache import register_cache_invalidation
+        register_cache_invalidation(self.get_model('Category'), self.get_model('Product'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-17 22:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-created_date', '-id'], name='store_product_created_idx'),
+        ),
+    ]
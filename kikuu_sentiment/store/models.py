@@ -1,4 +1,8 @@
-from django.db import models
+from django.apps import apps
+from django.db import models, transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast, Now
+from django.db.models.lookups import GreaterThan
 from django.utils import timezone
 from kikuu_sentiment import settings
 
@@ -6,11 +10,75 @@ class Category(models.Model):
     category_name = models.CharField(max_length=50, unique=True)
     description = models.TextField(max_length=255, blank=True)
     cat_image_url = models.URLField(max_length=500, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.category_name
 
 
+class ProductQuerySet(models.QuerySet):
+    def bump_review_counters(self, count=0, rating_sum=0, positive=0, neutral=0, negative=0):
+        """
+        Atomically add the deltas to the denormalized review counters in one
+        UPDATE. avg_rating and positive_ratio are recomputed from the new
+        totals in the same statement, so concurrent writers never lose an
+        update or leave the averages out of step with the counts.
+        """
+        new_count = F('review_count') + count
+        has_reviews = GreaterThan(new_count, 0)
+        return self.update(
+            review_count=new_count,
+            rating_sum=F('rating_sum') + rating_sum,
+            positive_count=F('positive_count') + positive,
+            neutral_count=F('neutral_count') + neutral,
+            negative_count=F('negative_count') + negative,
+            avg_rating=Case(
+                When(has_reviews, then=Cast(F('rating_sum') + rating_sum, FloatField()) / new_count),
+                default=Value(0.0),
+            ),
+            positive_ratio=Case(
+                When(has_reviews, then=Cast(F('positive_count') + positive, FloatField()) / new_count),
+                default=Value(0.0),
+            ),
+            updated_at=Now(),
+        )
+
+    def rebuild_review_counters(self):
+        """
+        Recompute the review counters of these products from the Review table.
+        """
+        Review = apps.get_model('kikuu', 'Review')
+        totals = Review.objects.filter(product__in=self).order_by().values('product_id').annotate(
+            count=Count('id'),
+            rating_sum=Sum('rating'),
+            positive=Count('id', filter=Q(sentiment='positive')),
+            neutral=Count('id', filter=Q(sentiment='neutral')),
+            negative=Count('id', filter=Q(sentiment='negative')),
+        )
+        with transaction.atomic():
+            self.update(
+                review_count=0, rating_sum=0, positive_count=0, neutral_count=0,
+                negative_count=0, avg_rating=0.0, positive_ratio=0.0, updated_at=Now(),
+            )
+            products = [
+                Product(
+                    pk=row['product_id'],
+                    review_count=row['count'],
+                    rating_sum=row['rating_sum'],
+                    positive_count=row['positive'],
+                    neutral_count=row['neutral'],
+                    negative_count=row['negative'],
+                    avg_rating=row['rating_sum'] / row['count'],
+                    positive_ratio=row['positive'] / row['count'],
+                )
+                for row in totals
+            ]
+            Product.objects.bulk_update(products, [
+                'review_count', 'rating_sum', 'positive_count', 'neutral_count',
+                'negative_count', 'avg_rating', 'positive_ratio',
+            ], batch_size=500)
+        return len(products)
+
 class Product(models.Model):
     product_name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
@@ -21,6 +89,27 @@ class Product(models.Model):
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     created_date = models.DateTimeField(default=timezone.now) 
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Review aggregates, kept current by the kikuu Review signal handlers so
+    # product lists can sort and filter on them without touching reviews
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    avg_rating = models.FloatField(default=0.0)
+    positive_count = models.PositiveIntegerField(default=0)
+    neutral_count = models.PositiveIntegerField(default=0)
+    negative_count = models.PositiveIntegerField(default=0)
+    positive_ratio = models.FloatField(default=0.0)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_date', '-id'], name='store_product_created_idx'),
+            models.Index(fields=['-avg_rating', '-id'], name='store_product_rating_idx'),
+            models.Index(fields=['-review_count', '-id'], name='store_product_reviews_idx'),
+            models.Index(fields=['-positive_ratio', '-id'], name='store_product_positive_idx'),
+        ]
 
     def get_seller_phone_number(self):
         return self.user.phone_number if self.user else None
@@ -15,9 +15,13 @@ class ProductSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'product_name', 'description', 'price', 'image_url',
             'stock', 'is_available', 'category', 'user', 'created_date',
-            'seller_phone_number'
+            'seller_phone_number', 'review_count', 'avg_rating', 'positive_count',
+            'neutral_count', 'negative_count', 'positive_ratio'
+        ]
+        read_only_fields = [
+            'user', 'created_date', 'seller_phone_number', 'review_count', 'avg_rating',
+            'positive_count', 'neutral_count', 'negative_count', 'positive_ratio'
         ]
-        read_only_fields = ['user', 'created_date', 'seller_phone_number']
 
     def get_seller_phone_number(self, obj):
         return getattr(obj.user, 'phone_number', None)
\ No newline at end of file
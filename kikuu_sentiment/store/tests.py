@@ -1,3 +1,76 @@
+from unittest import mock
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from kikuu_sentiment.pagination import KeysetPagination
+from .models import Category, Product
+
+
+class ProductReviewSortingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        seller = User.objects.create_user(
+            email='seller@test.com', username='seller', password='testpass123', role='seller'
+        )
+        category = Category.objects.create(category_name='Phones')
+        # (name, reviews, rating sum, positive, neutral, negative)
+        for name, count, rating_sum, positive, neutral, negative in [
+            ('Loved', 10, 46, 9, 1, 0),
+            ('Mixed', 4, 12, 1, 2, 1),
+            ('Hated', 5, 7, 0, 1, 4),
+            ('Unreviewed', 0, 0, 0, 0, 0),
+        ]:
+            product = Product.objects.create(
+                product_name=name, price='10.00', stock=1, category=category, user=seller
+            )
+            Product.objects.filter(pk=product.pk).bump_review_counters(
+                count=count, rating_sum=rating_sum, positive=positive, neutral=neutral, negative=negative
+            )
+
+    def names(self, **params):
+        response = self.client.get(reverse('product-list-create'), params)
+        self.assertEqual(response.status_code, 200)
+        return [product['product_name'] for product in response.data['results']]
+
+    def test_sorts_on_stored_aggregates(self):
+        self.assertEqual(self.names(ordering='-avg_rating'), ['Loved', 'Mixed', 'Hated', 'Unreviewed'])
+        self.assertEqual(self.names(ordering='-review_count'), ['Loved', 'Hated', 'Mixed', 'Unreviewed'])
+        self.assertEqual(self.names(ordering='positive_ratio'), ['Hated', 'Unreviewed', 'Mixed', 'Loved'])
+        # Unknown orderings fall back to newest first
+        self.assertEqual(self.names(ordering='price'), ['Unreviewed', 'Hated', 'Mixed', 'Loved'])
+
+    def test_filters_on_stored_aggregates(self):
+        self.assertEqual(self.names(min_rating='3', ordering='-avg_rating'), ['Loved', 'Mixed'])
+        self.assertEqual(self.names(min_reviews='5', ordering='-avg_rating'), ['Loved', 'Hated'])
+        self.assertEqual(self.names(min_positive_ratio='0.8'), ['Loved'])
+        self.assertEqual(self.names(sentiment='negative'), ['Hated'])
+        self.assertEqual(self.names(sentiment='neutral'), ['Mixed'])
+        self.assertEqual(len(self.names(min_rating='abc')), 4)
+
+    def test_keyset_pages_follow_the_requested_order(self):
+        url = reverse('product-list-create') + '?ordering=-avg_rating&cursor='
+        names = []
+        with mock.patch.object(KeysetPagination, 'page_size', 3):
+            while url:
+                response = self.client.get(url)
+                names += [product['product_name'] for product in response.data['results']]
+                url = response.data['next']
+        self.assertEqual(names, ['Loved', 'Mixed', 'Hated', 'Unreviewed'])
 
-# Create your tests here.
+    def test_list_reads_only_the_product_table(self):
+        params = {'ordering': '-positive_ratio', 'min_rating': '2', 'sentiment': 'positive'}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('product-list-create'), params)
+        product_queries = [query['sql'] for query in queries.captured_queries if 'store_product' in query['sql']]
+        # COUNT(*) and the page, both answered from the product rows alone
+        self.assertEqual(len(product_queries), 2)
+        for sql in product_queries:
+            self.assertNotIn('JOIN', sql)
+            self.assertNotIn('kikuu_review', sql)
+        self.assertEqual(response.data['results'][0]['positive_ratio'], 0.9)
+        self.assertEqual(response.data['results'][0]['avg_rating'], 4.6)
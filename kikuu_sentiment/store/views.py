@@ -1,11 +1,17 @@
+import math
+
+from django.db.models import F
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from .models import Category, Product
 from .serializers import CategorySerializer, ProductSerializer
 from rest_framework.exceptions import PermissionDenied
-class CategoryListCreateView(generics.ListCreateAPIView):
+from kikuu_sentiment.cache import CachedListMixin
+from kikuu_sentiment.etags import ConditionalListMixin, ConditionalRetrieveMixin
+class CategoryListCreateView(ConditionalListMixin, CachedListMixin, generics.ListCreateAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    cache_models = (Category,)
 
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -35,7 +41,7 @@ class CategoryListCreateView(generics.ListCreateAPIView):
 
 
 
-class CategoryRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class CategoryRetrieveUpdateDestroyView(ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
@@ -84,9 +90,59 @@ class CategoryRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
 
 
 
-class ProductListCreateView(generics.ListCreateAPIView):
+# ?ordering= values; each sort key is indexed together with the id tiebreaker
+PRODUCT_ORDERING_FIELDS = ('created_date', 'avg_rating', 'review_count', 'positive_ratio')
+
+def _parse_number(value, cast, low, high):
+    try:
+        number = cast(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(number) or not low <= number <= high:
+        return None
+    return number
+
+class ProductListCreateView(ConditionalListMixin, CachedListMixin, generics.ListCreateAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    cache_models = (Product,)
+
+    @property
+    def keyset_ordering(self):
+        ordering = self.request.query_params.get('ordering', '') if self.request else ''
+        field = ordering.lstrip('-')
+        if field not in PRODUCT_ORDERING_FIELDS or ordering.startswith('--'):
+            return ('-created_date', '-id')
+        direction = '-' if ordering.startswith('-') else ''
+        return (f'{direction}{field}', f'{direction}id')
+
+    def get_queryset(self):
+        # Filters and sorts only read the review counters stored on the
+        # product row, so no join or subquery on reviews is needed
+        queryset = super().get_queryset()
+        params = self.request.query_params
+
+        min_rating = _parse_number(params.get('min_rating'), float, 0, 5)
+        if min_rating is not None:
+            queryset = queryset.filter(avg_rating__gte=min_rating, review_count__gt=0)
+
+        min_reviews = _parse_number(params.get('min_reviews'), int, 0, math.inf)
+        if min_reviews is not None:
+            queryset = queryset.filter(review_count__gte=min_reviews)
+
+        min_positive_ratio = _parse_number(params.get('min_positive_ratio'), float, 0, 1)
+        if min_positive_ratio is not None:
+            queryset = queryset.filter(positive_ratio__gte=min_positive_ratio, review_count__gt=0)
+
+        # Products whose most common review sentiment is the one asked for
+        sentiment = params.get('sentiment', None)
+        if sentiment in ['positive', 'negative', 'neutral']:
+            queryset = queryset.filter(**{f'{sentiment}_count__gt': 0})
+            for other in ('positive', 'negative', 'neutral'):
+                if other != sentiment:
+                    queryset = queryset.filter(**{f'{sentiment}_count__gte': F(f'{other}_count')})
+
+        return queryset.order_by(*self.keyset_ordering)
 
     def get_permissions(self):
         if self.request.method == 'POST':
@@ -112,7 +168,7 @@ class ProductListCreateView(generics.ListCreateAPIView):
             return Response({"error": str(e)}, status=status.HTTP_403_FORBIDDEN)
 
 
-class ProductRetrieveUpdateDestroyView(generics.RetrieveUpdateDestroyAPIView):
+class ProductRetrieveUpdateDestroyView(ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
 